@@ -0,0 +1,121 @@
+"""
+动作调度器
+在独立的工作线程中执行动作，避免pyautogui调用和等待阻塞视频处理线程。
+队列有界：同一手势的待执行动作会被合并，过期或溢出的动作会被丢弃。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class ActionJob:
+    key: str  # 合并键，通常为手势码
+    run: Callable[[], Any]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class ActionDispatcher:
+    def __init__(self, max_queue: int = 4, max_age: float = 1.0, workers: int = 1, name: str = 'ActionWorker'):
+        self.max_queue = max(1, max_queue)
+        self.max_age = max_age
+        self.workers = max(1, workers)
+        self.name = name
+
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+
+        # Statistics
+        self.submitted = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped_stale = 0
+        self.dropped_overflow = 0
+        self.failed = 0
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'{self.name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info('Action dispatcher started with %d worker(s), queue size %d', self.workers, self.max_queue)
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, key: str, run: Callable[[], Any]) -> bool:
+        """提交动作，从不阻塞调用线程"""
+        job = ActionJob(key=key, run=run)
+        with self._cond:
+            if not self._running:
+                return False
+            self.submitted += 1
+
+            # 同一手势仍在排队时，用最新的一次替换旧的
+            for i, pending in enumerate(self._pending):
+                if pending.key == key:
+                    del self._pending[i]
+                    self.coalesced += 1
+                    break
+
+            if len(self._pending) >= self.max_queue:
+                dropped = self._pending.popleft()
+                self.dropped_overflow += 1
+                logging.warning('[DISPATCH] Action queue full, dropping oldest action for %s', dropped.key)
+
+            self._pending.append(job)
+            self._cond.notify()
+        return True
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._pending.popleft()
+
+            age = time.perf_counter() - job.enqueued_at
+            if self.max_age > 0 and age > self.max_age:
+                self.dropped_stale += 1
+                logging.warning('[DISPATCH] Dropping stale action for %s (waited %.2fs)', job.key, age)
+                continue
+
+            try:
+                job.run()
+                self.executed += 1
+            except Exception as exc:
+                self.failed += 1
+                logging.exception('[DISPATCH] Action for %s raised: %s', job.key, exc)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'pending': self.pending_count(),
+            'submitted': self.submitted,
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'dropped_stale': self.dropped_stale,
+            'dropped_overflow': self.dropped_overflow,
+            'failed': self.failed,
+        }
@@ -0,0 +1,277 @@
+"""
+审计日志异步上报
+在后台线程中缓冲审计记录，批量发送到 /api/audit/logs；
+后端不可用时写入本地日志文件(journal)，恢复后补发，保证手势检测线程永不被网络阻塞。
+无法解析的journal行（如写入中途崩溃留下的半行）和被后端以4xx永久拒绝的记录移到 .bad 文件，
+不会卡在journal开头阻塞后面的记录
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from logger_config import COMPONENT_LOGGERS, LOG_DIR
+
+logger = logging.getLogger(COMPONENT_LOGGERS["agent"])
+
+DEFAULT_JOURNAL = LOG_DIR / 'audit_journal.jsonl'
+
+# 这些4xx与记录内容无关（鉴权、接口缺失、超时、限流），修复后端或稍后重试即可成功，不视为永久拒绝
+RETRYABLE_CLIENT_ERRORS = (401, 403, 404, 405, 408, 429)
+
+
+def is_rejected(status_code: int) -> bool:
+    """后端因记录本身无效而拒绝，重试也不会成功"""
+    return 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS
+
+
+def create_session(pool_size: int = 4) -> requests.Session:
+    """创建带连接池的keep-alive会话"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class AuditShipper:
+    def __init__(self,
+                 base_url: str,
+                 session: Optional[requests.Session] = None,
+                 batch_size: int = 50,
+                 flush_interval: float = 2.0,
+                 max_buffer: int = 1000,
+                 timeout: float = 5.0,
+                 journal_path: Optional[Path] = None):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or create_session()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.journal_path = Path(journal_path) if journal_path else DEFAULT_JOURNAL
+        self.bad_path = self.journal_path.with_name(self.journal_path.name + '.bad')
+
+        self._buffer: deque = deque(maxlen=max_buffer)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._flush_lock = threading.Lock()
+        self._running = False
+        self._closed = False
+        self._bulk_supported = True
+
+        # Statistics
+        self.shipped = 0
+        self.journaled = 0
+        self.dropped = 0
+        self.rejected = 0  # 移到 .bad 文件的记录（被后端拒绝或无法解析）
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._closed = False
+        self._thread = threading.Thread(target=self._run, name='AuditShipper', daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any]):
+        """缓冲一条审计记录，不做任何网络IO"""
+        with self._cond:
+            closed = self._closed
+        if closed:
+            # 后台线程已停止，缓冲不会再被发送，直接写入journal，下次启动时补发
+            with self._flush_lock:
+                self._write_journal([record])
+            return
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def close(self, timeout: float = 5.0):
+        """停止后台线程并尽力发送剩余记录，失败的写入journal"""
+        with self._cond:
+            was_running = self._running
+            self._running = False
+            self._closed = True
+            self._cond.notify_all()
+        if was_running and self._thread:
+            self._thread.join(timeout=timeout)
+        self._safe_flush()
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._cond:
+                # 上一轮失败时即使缓冲已满也等待一个周期再重试，避免空转
+                if self._running and (failed or len(self._buffer) < self.batch_size):
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            failed = not self._safe_flush()
+
+    def _safe_flush(self) -> bool:
+        # journal读写失败(磁盘满、权限等)不能让后台线程退出，记录错误后下一轮重试
+        try:
+            self._flush()
+            return True
+        except Exception:
+            logger.exception('Failed to flush audit logs')
+            return False
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+            return batch
+
+    def _flush(self):
+        with self._flush_lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        # 先补发journal中积压的记录
+        if self.journal_path.exists() and not self._replay_journal():
+            # 后端仍不可用，新记录直接追加到journal
+            batch = self._take_batch()
+            while batch:
+                self._write_journal(batch)
+                batch = self._take_batch()
+            return
+
+        batch = self._take_batch()
+        while batch:
+            unsent = self._send(batch)
+            if unsent:
+                self._write_journal(unsent)
+            batch = self._take_batch()
+
+    def _send(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """发送一批记录，返回未被后端确认的记录（全部成功时为空）"""
+        sent = 0
+        try:
+            if self._bulk_supported:
+                resp = self.session.post(f'{self.base_url}/api/audit/logs', json=batch, timeout=self.timeout)
+                if resp.status_code in (404, 405):
+                    # 旧版后端没有批量接口，退回逐条发送
+                    logger.warning('Bulk audit endpoint unavailable, falling back to /api/audit/log')
+                    self._bulk_supported = False
+                elif is_rejected(resp.status_code):
+                    # 整批被拒绝时不知道是哪条记录无效，本批逐条发送找出来
+                    logger.warning('Bulk audit upload rejected with HTTP %d, retrying records one by one',
+                                   resp.status_code)
+                else:
+                    resp.raise_for_status()
+                    self.shipped += len(batch)
+                    return []
+            for record in batch:
+                resp = self.session.post(f'{self.base_url}/api/audit/log', json=record, timeout=self.timeout)
+                if is_rejected(resp.status_code):
+                    self._quarantine([json.dumps(record, ensure_ascii=False)], f'rejected with HTTP {resp.status_code}')
+                else:
+                    resp.raise_for_status()
+                    self.shipped += 1
+                sent += 1
+            return []
+        except Exception as exc:
+            # 逐条发送时前面已确认的记录不再重发
+            logger.error('Failed to ship %d audit log(s): %s', len(batch) - sent, exc)
+            return batch[sent:]
+
+    def _write_journal(self, batch: List[Dict[str, Any]]):
+        try:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open('a', encoding='utf-8') as f:
+                if f.tell() and not self._ends_with_newline():
+                    # 上次写入中途崩溃留下半行，先换行，新记录不会和它拼成一行而一起损坏
+                    f.write('\n')
+                for record in batch:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.journaled += len(batch)
+        except Exception as exc:
+            self.dropped += len(batch)
+            logger.error('Failed to write audit journal %s: %s', self.journal_path, exc)
+
+    def _ends_with_newline(self) -> bool:
+        with self.journal_path.open('rb') as f:
+            f.seek(-1, 2)
+            return f.read(1) == b'\n'
+
+    def _replay_journal(self) -> bool:
+        """补发journal，全部成功后删除文件"""
+        records, undecodable = [], []
+        try:
+            with self.journal_path.open('r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        undecodable.append(line)
+        except Exception as exc:
+            logger.error('Failed to read audit journal %s: %s', self.journal_path, exc)
+            return False
+        if undecodable:
+            # 下面重写或删除journal时这些行随之移除
+            self._quarantine(undecodable, 'undecodable journal line')
+
+        for start in range(0, len(records), self.batch_size):
+            end = start + self.batch_size
+            unsent = self._send(records[start:end])
+            if unsent:
+                # 只保留尚未发送的部分
+                self._rewrite_journal(unsent + records[end:])
+                return False
+
+        try:
+            self.journal_path.unlink(missing_ok=True)
+        except OSError as exc:
+            logger.error('Failed to remove audit journal %s: %s', self.journal_path, exc)
+            return False
+        logger.info('Replayed %d journaled audit log(s)', len(records))
+        return True
+
+    def _quarantine(self, lines: List[str], reason: str):
+        """把无法发送的记录原样追加到 .bad 文件，供人工检查，不再重试"""
+        self.rejected += len(lines)
+        logger.error('Moving %d audit log(s) to %s: %s', len(lines), self.bad_path, reason)
+        try:
+            self.bad_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.bad_path.open('a', encoding='utf-8') as f:
+                for line in lines:
+                    f.write(line + '\n')
+        except OSError as exc:
+            logger.error('Failed to write %s: %s', self.bad_path, exc)
+
+    def _rewrite_journal(self, records: List[Dict[str, Any]]):
+        tmp_path = self.journal_path.with_suffix('.tmp')
+        try:
+            with tmp_path.open('w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            tmp_path.replace(self.journal_path)
+        except OSError as exc:
+            # 原journal保持不变，已补发的记录下次可能重复发送，但不会丢失
+            logger.error('Failed to rewrite audit journal %s: %s', self.journal_path, exc)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            pending = len(self._buffer)
+        return {
+            'pending': pending,
+            'shipped': self.shipped,
+            'journaled': self.journaled,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+手势处理热路径微基准
+在合成关键点流上测量每帧调用的代码（手指状态、静态分类、轨迹、动作分发），
+结果与保存的基线比较，超过容差即返回非0，用于在发布前发现性能回退。
+
+用法（在agent目录下运行）:
+    python benchmarks/run_benchmarks.py                  # 与基线比较
+    python benchmarks/run_benchmarks.py --save-baseline  # 在参考机器上更新基线（多次运行取中位数）
+    python benchmarks/run_benchmarks.py -k dynamic       # 只运行名称包含dynamic的用例
+
+看似回退的用例会复测（--confirm 次）并取最快结果，避免单次噪声误报。
+用例被跳过或在基线中没有记录时同样判为失败，新增用例需要在参考机器上重新保存基线。
+没有基线文件、或基线来自不同的机器/环境时返回2（门禁无法判断）；
+加 --allow-missing-baseline / --allow-machine-mismatch 时只打印结果并明确提示门禁已跳过或仅供参考。
+没有安装 mediapipe / pyautogui 时使用 benchmarks/stubs.py 中的替身，被测路径不依赖它们的真实功能。
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from benchmarks.stubs import install_missing
+from benchmarks.synthetic import landmark_stream, to_mediapipe_landmarks
+
+DEFAULT_BASELINE = Path(__file__).parent / 'baseline.json'
+DEFAULT_TOLERANCE = 0.25  # 最快一轮比基线慢25%以上视为回退（最小值受系统噪声影响最小）
+MIN_DELTA_US = 0.5  # 绝对差值低于该值(微秒)不算回退，亚微秒用例的百分比波动主要是计时噪声
+
+STUBBED: List[str] = []  # 本次运行中被替身代替的可选依赖，记录在基线的machine中
+
+
+class SkipCase(Exception):
+    """依赖缺失（如mediapipe、pyautogui）时跳过用例"""
+
+
+@dataclass
+class BenchCase:
+    name: str
+    # setup(stack) 返回每次调用处理一帧的函数，需要清理的资源注册到stack
+    setup: Callable[[contextlib.ExitStack], Callable[[], Any]]
+
+
+CASES: List[BenchCase] = []
+
+
+def bench(name: str):
+    def register(setup):
+        CASES.append(BenchCase(name, setup))
+        return setup
+    return register
+
+
+def _require(module: str):
+    try:
+        return __import__(module, fromlist=['*'])
+    except Exception as exc:
+        raise SkipCase(f'{module} unavailable: {exc}')
+
+
+# 所有用例共用同一段合成数据，保证结果可复现
+STREAM = landmark_stream(n_frames=300, hands=2)
+SINGLE_HANDS = [(hands[0], ts) for hands, ts in STREAM]
+
+
+@bench('landmarks.to_array')
+def _(stack):
+    from gestures.landmarks import landmarks_to_array
+    frames = itertools.cycle([to_mediapipe_landmarks(hands) for hands, _ in STREAM])
+    return lambda: landmarks_to_array(next(frames))
+
+
+@bench('landmarks.finger_states')
+def _(stack):
+    from gestures.landmarks import finger_states
+    frames = itertools.cycle([hands for hands, _ in STREAM])
+    return lambda: finger_states(next(frames))
+
+
+@bench('static.table_classify')
+def _(stack):
+    from gestures.landmarks import finger_states
+    from gestures.static_classifier import DEFAULT_STATIC_TABLE
+    states = itertools.cycle([finger_states(hands) for hands, _ in STREAM])
+    return lambda: DEFAULT_STATIC_TABLE.classify(next(states))
+
+
+def _detector(stack, module: str, cls: str):
+    detector = getattr(_require(module), cls)()
+    stack.callback(detector.close)
+    return detector
+
+
+@bench('mediapipe.get_state_code')
+def _(stack):
+    detector = _detector(stack, 'gestures.mediapipe_detector', 'MediaPipeGestureDetector')
+    hands = itertools.cycle([hand for hand, _ in SINGLE_HANDS])
+    return lambda: detector._get_state_code(next(hands))
+
+
+@bench('mediapipe.recognize_gesture')
+def _(stack):
+    detector = _detector(stack, 'gestures.mediapipe_detector', 'MediaPipeGestureDetector')
+    hands = itertools.cycle([hand for hand, _ in SINGLE_HANDS])
+    return lambda: detector._recognize_gesture(next(hands))
+
+
+@bench('enhanced.recognize_static_gesture')
+def _(stack):
+    detector = _detector(stack, 'gestures.enhanced_detector', 'EnhancedGestureDetector')
+    hands = itertools.cycle([hand for hand, _ in SINGLE_HANDS])
+    return lambda: detector._recognize_static_gesture(next(hands))
+
+
+@bench('hybrid.detect_static_gesture')
+def _(stack):
+    detector = _require('gestures.hybrid_detector').HybridGestureDetector()
+    stack.callback(detector.static_detector.close)
+    frames = itertools.cycle(SINGLE_HANDS)
+
+    def step():
+        hand, ts = next(frames)
+        return detector._detect_static_gesture(hand, ts)
+    return step
+
+
+@bench('enhanced.dynamic.add_hand_position')
+def _(stack):
+    module = _require('gestures.enhanced_detector')
+    detector = module.DynamicGestureDetector()
+    frames = itertools.cycle(SINGLE_HANDS)
+
+    def step():
+        hand, ts = next(frames)
+        return detector.add_hand_position(hand, ts)
+    return step
+
+
+@bench('hybrid.dynamic.add_position')
+def _(stack):
+    module = _require('gestures.hybrid_detector')
+    detector = module.DynamicGestureDetector()
+    frames = itertools.cycle(SINGLE_HANDS)
+
+    def step():
+        hand, ts = next(frames)
+        return detector.add_position(hand, ts)
+    return step
+
+
+def _configurable_detector():
+    from gestures.configurable_detector import ConfigurableGestureDetector
+    # 不读取外部配置文件，使用内置默认定义
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ConfigurableGestureDetector(str(Path(__file__).parent / 'missing_gesture_definitions.yaml'))
+
+
+@bench('configurable.recognize_static_gesture')
+def _(stack):
+    from gestures.landmarks import finger_states, states_to_dict
+    detector = _configurable_detector()
+    states = itertools.cycle([states_to_dict(s) for hand, _ in SINGLE_HANDS for s in finger_states(hand[np.newaxis])])
+    return lambda: detector.recognize_static_gesture(next(states))
+
+
+@bench('configurable.recognize_dynamic_gesture')
+def _(stack):
+    detector = _configurable_detector()
+    palms = [hand[[0, 1, 5, 9, 13, 17], :2].mean(axis=0) for hand, _ in SINGLE_HANDS]
+    deltas = []
+    for start, end in zip(palms, palms[10:]):
+        dx, dy = float(end[0] - start[0]), float(end[1] - start[1])
+        deltas.append((dx, dy, (dx * dx + dy * dy) ** 0.5))
+    deltas = itertools.cycle(deltas)
+    return lambda: detector.recognize_dynamic_gesture(*next(deltas))
+
+
+@bench('templates.match')
+def _(stack):
+    from gestures.landmarks import palm_centers, hand_scales
+    from gestures.trajectory_templates import TrajectoryTemplateRecognizer, builtin_shapes
+    # 内置形状的全部模板（画圈各8个起点），每帧匹配最近20个点的轨迹
+    recognizer = TrajectoryTemplateRecognizer([
+        TrajectoryTemplateRecognizer.prepare(name, path)
+        for name, paths in builtin_shapes().items() for path in paths])
+    hands = np.stack([hand for hand, _ in SINGLE_HANDS])
+    points = np.column_stack([palm_centers(hands), [ts for _, ts in SINGLE_HANDS], hand_scales(hands)])
+    windows = itertools.cycle([points[i:i + 20] for i in range(len(points) - 20)])
+    return lambda: recognizer.match(next(windows))
+
+
+@bench('executor.execute_action')
+def _(stack):
+    executor = _require('actions.executor')
+
+    class NoopExecutor(executor.ActionExecutor):
+        def execute(self, action_value, payload=None):
+            return True, action_value
+
+    # 只测量查找与分发开销，不触发真实的键鼠操作
+    manager = executor.ActionManager()
+    manager.executors = {name: NoopExecutor() for name in manager.executors}
+    actions = itertools.cycle([('hotkey', 'ctrl+c'), ('scroll', '3'), ('click', 'left'), ('unknown', 'x')])
+    return lambda: manager.execute_action(*next(actions))
+
+
+@bench('dispatcher.submit')
+def _(stack):
+    from actions.dispatcher import ActionDispatcher
+    dispatcher = ActionDispatcher(max_queue=8, max_age=1.0, workers=1, name='BenchWorker')
+    dispatcher.start()
+    stack.callback(dispatcher.stop)
+    keys = itertools.cycle(['THUMBS_UP', 'OPEN_PALM', 'SWIPE_LEFT', 'VICTORY', 'POINT_UP'])
+    return lambda: dispatcher.submit(next(keys), lambda: None)
+
+
+def measure(step: Callable[[], Any], repeat: int = 5, min_time: float = 0.05) -> Dict[str, float]:
+    """自动确定每轮调用次数，返回每次调用耗时（微秒）的中位数和最小值"""
+    # 与timeit相同，计时期间关闭GC，前面用例留下的对象不会让后面的用例随机触发回收
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(step, repeat, min_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _measure(step: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            step()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            step()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        'median_us': statistics.median(samples) * 1e6,
+        'min_us': min(samples) * 1e6,
+        'number': number,
+    }
+
+
+def machine_info() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'stubbed': ','.join(STUBBED),
+    }
+
+
+def aggregate(samples: List[Optional[Dict[str, float]]]) -> Optional[Dict[str, float]]:
+    """合并同一用例多次运行的结果，各项取中位数"""
+    if any(sample is None for sample in samples):
+        return None
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def run(selected: List[BenchCase], repeat: int, min_time: float) -> Dict[str, Optional[Dict[str, float]]]:
+    results: Dict[str, Optional[Dict[str, float]]] = {}
+    for case in selected:
+        with contextlib.ExitStack() as stack:
+            try:
+                step = case.setup(stack)
+            except SkipCase as exc:
+                print(f'{case.name:<42} SKIPPED ({exc})')
+                results[case.name] = None
+                continue
+            results[case.name] = measure(step, repeat=repeat, min_time=min_time)
+            print(f'{case.name:<42} {results[case.name]["min_us"]:>10.2f} us/op '
+                  f'(median {results[case.name]["median_us"]:.2f})')
+    return results
+
+
+def compare(results: Dict[str, Optional[Dict[str, float]]], baseline: Dict[str, Any],
+            tolerance: float) -> Dict[str, str]:
+    """返回超过容差的用例名 -> 说明；覆盖缺失（跳过、无基线）由 missing_cases 检查"""
+    regressions = {}
+    print(f'\n{"case":<42} {"baseline":>10} {"current":>10} {"change":>8}')
+    for name, result in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if result is None:
+            print(f'{name:<42} {"-":>10} {"-":>10}   skipped ❌')
+            continue
+        if reference is None:
+            print(f'{name:<42} {"-":>10} {result["min_us"]:>10.2f}   no baseline ❌')
+            continue
+        change = result['min_us'] / reference['min_us'] - 1
+        regressed = change > tolerance and result['min_us'] - reference['min_us'] > MIN_DELTA_US
+        flag = ' ❌' if regressed else ''
+        print(f'{name:<42} {reference["min_us"]:>10.2f} {result["min_us"]:>10.2f} {change:>+7.1%}{flag}')
+        if regressed:
+            regressions[name] = f'{name}: {reference["min_us"]:.2f} -> {result["min_us"]:.2f} us/op ({change:+.1%})'
+    return regressions
+
+
+def missing_cases(results: Dict[str, Optional[Dict[str, float]]], baseline: Dict[str, Any]) -> List[str]:
+    """没有运行或没有基线记录的用例；门禁不能对它们放行，否则这些路径的回退永远发现不了"""
+    missing = []
+    for name, result in results.items():
+        if result is None:
+            missing.append(f'{name}: skipped, not measured')
+        elif name not in baseline.get('results', {}):
+            missing.append(f'{name}: no baseline entry (run --save-baseline on the reference machine)')
+    return missing
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Gesture hot path micro-benchmarks')
+    parser.add_argument('-k', '--filter', help='Only run cases whose name contains this string')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results to the baseline file')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='Exit 0 with "gate skipped" instead of failing when the baseline file is missing')
+    parser.add_argument('--allow-machine-mismatch', action='store_true',
+                        help='Compare anyway (informational only) when the baseline was recorded elsewhere')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='Minimum seconds per timing round')
+    parser.add_argument('--baseline-runs', type=int, default=3,
+                        help='With --save-baseline, run the suite this many times and store the median')
+    parser.add_argument('--confirm', type=int, default=3,
+                        help='Re-run cases that look regressed this many times before failing')
+    parser.add_argument('--confirm-delay', type=float, default=1.0,
+                        help='Seconds to wait before the first re-run (doubles, triples... on later re-runs)')
+    args = parser.parse_args()
+
+    # 识别和队列日志会写文件，基准只测量计算本身
+    logging.disable(logging.WARNING)
+    STUBBED.extend(install_missing())
+    if STUBBED:
+        print(f'Using stubs for missing optional dependencies: {", ".join(STUBBED)}')
+
+    selected = [case for case in CASES if not args.filter or args.filter in case.name]
+    if not selected:
+        print(f'No benchmark matches {args.filter!r}')
+        return 1
+
+    results = run(selected, repeat=args.repeat, min_time=args.min_time)
+
+    if args.save_baseline:
+        # 单次运行的最快值可能恰好落在偶然的快速区间，基线取多次运行的中位数，门禁才不会被噪声误触发
+        runs = [results] + [run(selected, repeat=args.repeat, min_time=args.min_time)
+                            for _ in range(args.baseline_runs - 1)]
+        results = {name: aggregate([r[name] for r in runs]) for name in results}
+        baseline = {'results': {}}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+            if baseline.get('machine') != machine_info():
+                # 不同机器的结果不能混在同一个基线里
+                print('⚠️ 原基线来自不同的机器或环境，已全部替换')
+                baseline = {'results': {}}
+        baseline['machine'] = machine_info()
+        baseline.setdefault('results', {}).update({name: result for name, result in results.items() if result})
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n', encoding='utf-8')
+        print(f'\n✅ 基线已保存到 {args.baseline}')
+        return 0
+
+    if not args.baseline.exists():
+        print(f'\n⚠️ 基线文件 {args.baseline} 不存在，使用 --save-baseline 创建')
+        if args.allow_missing_baseline:
+            print('⏭️ no baseline, gate skipped')
+            return 0
+        print('❌ no baseline, gate cannot run')
+        return 2
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    informational = False
+    if baseline.get('machine') != machine_info():
+        print(f'\n⚠️ 基线来自不同的机器或环境: {baseline.get("machine")} != {machine_info()}')
+        if not args.allow_machine_mismatch:
+            print('❌ baseline machine mismatch, gate cannot run (re-save the baseline on this machine)')
+            return 2
+        informational = True
+
+    regressions = compare(results, baseline, args.tolerance)
+    for attempt in range(args.confirm):
+        if not regressions:
+            break
+        # 微秒级用例单轮受调度噪声影响大，复测超限用例并保留最快结果，连续超限才判定为回退；
+        # 共享主机上常见整机短时变慢，复测前先等待，间隔逐次加长
+        print(f'\n🔁 复测 {len(regressions)} 个超限用例（第{attempt + 1}次）')
+        time.sleep(args.confirm_delay * (attempt + 1))
+        retest = run([case for case in selected if case.name in regressions], repeat=args.repeat,
+                     min_time=args.min_time)
+        for name, result in retest.items():
+            if result and result['min_us'] < results[name]['min_us']:
+                results[name] = result
+        regressions = compare({name: results[name] for name in regressions}, baseline, args.tolerance)
+
+    missing = missing_cases(results, baseline)
+    if missing:
+        print('\n❌ 用例未被基线覆盖:')
+        for line in missing:
+            print(f'  {line}')
+    if regressions:
+        print('\n❌ 性能回退:')
+        for line in regressions.values():
+            print(f'  {line}')
+    if informational:
+        print('\n⏭️ machine mismatch, results are informational only, gate skipped')
+        return 0
+    if missing or regressions:
+        return 1
+
+    print('\n✅ 未发现性能回退')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
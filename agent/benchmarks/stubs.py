@@ -0,0 +1,62 @@
+"""
+可选依赖替身
+基准只测量手指状态、静态分类、轨迹和动作分发等纯计算路径，不调用MediaPipe推理，也不触发真实键鼠操作。
+没有安装 mediapipe / pyautogui 的机器（如CI容器）上用最小替身模块代替，使依赖它们的用例也能导入并记录基线；
+已安装时使用真实模块，两种情况下被测路径的代码完全相同
+"""
+
+import sys
+import types
+from typing import List
+
+
+class _Hands:
+    """mp.solutions.hands.Hands 替身：检测器构造时创建，基准不会调用process"""
+
+    def __init__(self, **kwargs):
+        pass
+
+    def process(self, image):
+        raise RuntimeError('MediaPipe stub cannot run inference')
+
+    def close(self):
+        pass
+
+
+def _mediapipe_stub() -> types.ModuleType:
+    module = types.ModuleType('mediapipe')
+    module.solutions = types.SimpleNamespace(
+        hands=types.SimpleNamespace(Hands=_Hands, HAND_CONNECTIONS=()),
+        drawing_utils=types.SimpleNamespace(draw_landmarks=lambda *args, **kwargs: None),
+        drawing_styles=types.SimpleNamespace(),
+    )
+    return module
+
+
+def _pyautogui_stub() -> types.ModuleType:
+    module = types.ModuleType('pyautogui')
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('pyautogui stub cannot perform input actions')
+
+    # 执行器只在动作执行时才调用这些函数，基准用空执行器替换了它们
+    module.__getattr__ = lambda name: unavailable
+    return module
+
+
+STUBS = {
+    'mediapipe': _mediapipe_stub,
+    'pyautogui': _pyautogui_stub,
+}
+
+
+def install_missing() -> List[str]:
+    """为无法导入的可选依赖安装替身，返回被替换的模块名"""
+    installed = []
+    for name, factory in STUBS.items():
+        try:
+            __import__(name)
+        except Exception:
+            sys.modules[name] = factory()
+            installed.append(name)
+    return installed
@@ -0,0 +1,66 @@
+"""
+合成关键点数据
+按手指状态编码生成确定性的手部关键点，并模拟手在画面中滑动，供基准测试使用
+"""
+
+import types
+from typing import List, Tuple
+
+import numpy as np
+
+from gestures.landmarks import NUM_LANDMARKS
+
+FINGER_COLUMNS = (-0.04, -0.015, 0.01, 0.035)  # 食指到小指的x偏移
+
+
+def hand_pose(code: int, center: Tuple[float, float] = (0.5, 0.5)) -> np.ndarray:
+    """生成手指状态编码为code（拇指为第0位）的 (21, 3) 关键点"""
+    cx, cy = center
+    hand = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+    hand[0] = (cx, cy + 0.15, 0.0)
+
+    # 拇指: 1-4，伸直时指尖在指节右侧
+    thumb_tip_dx = 0.04 if code & 1 else -0.04
+    hand[1] = (cx - 0.06, cy + 0.08, 0.0)
+    hand[2] = (cx - 0.08, cy + 0.05, 0.0)
+    hand[3] = (cx - 0.09, cy + 0.02, 0.0)
+    hand[4] = (cx - 0.09 + thumb_tip_dx, cy + 0.02, 0.0)
+
+    # 其余手指: 根部/中间/末端/指尖，伸直时指尖高于中间关节
+    for finger, dx in enumerate(FINGER_COLUMNS, start=1):
+        base = 1 + finger * 4
+        extended = bool(code & (1 << finger))
+        x = cx + dx
+        hand[base] = (x, cy, 0.0)
+        hand[base + 1] = (x, cy - 0.05, 0.0)
+        hand[base + 2] = (x, cy - 0.08, 0.0)
+        hand[base + 3] = (x, cy - 0.11 if extended else cy - 0.02, 0.0)
+    return hand
+
+
+def landmark_stream(n_frames: int = 300, fps: float = 30.0, seed: int = 0,
+                    hands: int = 1) -> List[Tuple[np.ndarray, float]]:
+    """生成 (hands, 21, 3) 关键点与时间戳序列：手势每半秒变化一次，手心在画面中来回滑动"""
+    rng = np.random.default_rng(seed)
+    hold = max(1, int(fps / 2))
+    codes = rng.integers(0, 32, size=(n_frames // hold + 1, hands))
+    frames = []
+    for i in range(n_frames):
+        phase = (i % int(fps)) / fps
+        direction = 1 if (i // int(fps)) % 2 == 0 else -1
+        cx = 0.5 + direction * (phase - 0.5) * 0.6
+        cy = 0.5 + float(rng.normal(0, 0.005))
+        frame = np.stack([
+            hand_pose(int(codes[i // hold, h]), (cx + 0.2 * h, cy)) for h in range(hands)
+        ])
+        frames.append((frame, i / fps))
+    return frames
+
+
+def to_mediapipe_landmarks(hands: np.ndarray) -> List[types.SimpleNamespace]:
+    """把 (hands, 21, 3) 转换为与MediaPipe multi_hand_landmarks结构相同的对象"""
+    return [
+        types.SimpleNamespace(landmark=[types.SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in hand])
+        for hand in hands
+    ]
+
@@ -0,0 +1,119 @@
+"""
+配置推送订阅
+通过SSE长连接订阅 /api/config/stream，后端在映射变化时推送差异；
+连接断开时自动重连，期间由守护进程的轮询兜底
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+
+from logger_config import COMPONENT_LOGGERS
+
+logger = logging.getLogger(COMPONENT_LOGGERS["agent"])
+
+
+def iter_sse_events(lines: Iterator[str]) -> Iterator[Tuple[str, str]]:
+    """把SSE文本行解析为 (event, data)，忽略注释（心跳）"""
+    event, data = 'message', []
+    for line in lines:
+        if line is None:
+            continue
+        if line == '':
+            if data:
+                yield event, '\n'.join(data)
+            event, data = 'message', []
+        elif line.startswith(':'):
+            continue
+        else:
+            field, _, value = line.partition(':')
+            if value.startswith(' '):
+                value = value[1:]
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+class ConfigSubscriber:
+    def __init__(self,
+                 base_url: str,
+                 params: Dict[str, Any],
+                 on_snapshot: Callable[[Dict[str, Any]], None],
+                 on_diff: Callable[[Dict[str, Any]], None],
+                 reconnect_delay: float = 5.0,
+                 max_reconnect_delay: float = 60.0):
+        self.url = f'{base_url.rstrip("/")}/api/config/stream'
+        self.params = params
+        self.on_snapshot = on_snapshot
+        self.on_diff = on_diff
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        # 长连接单独使用一个会话，不占用请求连接池
+        self.session = requests.Session()
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._response: Optional[requests.Response] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ConfigSubscriber', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.session.close()
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as exc:
+                if self._stop.is_set():
+                    break
+                if self.connected.is_set():
+                    # 曾经订阅成功，重置退避时间
+                    delay = self.reconnect_delay
+                logger.warning('Config stream disconnected: %s (retry in %.0fs)', exc, delay)
+            finally:
+                self.connected.clear()
+                self._response = None
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _listen(self):
+        # 读超时需大于后端心跳间隔，用来发现半开连接
+        with self.session.get(self.url, params=self.params, stream=True, timeout=(10, 90),
+                              headers={'Accept': 'text/event-stream'}) as resp:
+            if resp.status_code == 404:
+                raise RuntimeError('backend does not support config push')
+            resp.raise_for_status()
+            self._response = resp
+            logger.info('Subscribed to config stream %s', self.url)
+            for event, data in iter_sse_events(resp.iter_lines(decode_unicode=True)):
+                if self._stop.is_set():
+                    return
+                payload = json.loads(data)
+                if event == 'config':
+                    self.on_snapshot(payload)
+                    self.connected.set()
+                elif event == 'config-diff':
+                    self.on_diff(payload)
+        raise RuntimeError('stream closed by server')
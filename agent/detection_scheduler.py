@@ -0,0 +1,85 @@
+"""
+自适应检测调度
+画面中没有手时降为低频、低分辨率的存在检测；一旦发现手立即恢复全帧率、全分辨率检测，
+连续一段时间看不到手后再回到空闲模式，从而降低常驻设备空闲时的CPU占用
+"""
+
+import logging
+from typing import Any, Dict
+
+import cv2
+import numpy as np
+
+from logger_config import COMPONENT_LOGGERS
+
+logger = logging.getLogger(COMPONENT_LOGGERS["video"])
+
+MODE_IDLE = 'idle'      # 无手：低频低分辨率存在检测
+MODE_ACTIVE = 'active'  # 有手：按detection_interval全分辨率检测
+
+
+class DetectionScheduler:
+    def __init__(self,
+                 active_interval: float = 0.1,
+                 idle_interval: float = 0.5,
+                 idle_after: float = 2.0,
+                 idle_scale: float = 0.5,
+                 enabled: bool = True):
+        self.active_interval = active_interval
+        self.idle_interval = max(idle_interval, active_interval)
+        self.idle_after = idle_after
+        self.idle_scale = min(max(idle_scale, 0.1), 1.0)
+        self.enabled = enabled
+
+        # 启用时从空闲模式开始，第一只手出现后切换
+        self.mode = MODE_IDLE if enabled else MODE_ACTIVE
+        self.last_run = float('-inf')
+        self.last_hand_seen = float('-inf')
+
+        # Statistics
+        self.transitions = 0
+        self.presence_checks = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.mode == MODE_IDLE
+
+    @property
+    def interval(self) -> float:
+        return self.idle_interval if self.idle else self.active_interval
+
+    def is_due(self, timestamp: float) -> bool:
+        """当前帧是否需要检测"""
+        if timestamp - self.last_run >= self.interval:
+            self.last_run = timestamp
+            return True
+        return False
+
+    def presence_frame(self, frame: np.ndarray) -> np.ndarray:
+        """空闲模式下用于存在检测的缩小帧"""
+        self.presence_checks += 1
+        if self.idle_scale >= 1.0:
+            return frame
+        return cv2.resize(frame, None, fx=self.idle_scale, fy=self.idle_scale, interpolation=cv2.INTER_AREA)
+
+    def observe(self, timestamp: float, hand_count: int):
+        """根据本次检测到的手数更新模式"""
+        if hand_count > 0:
+            self.last_hand_seen = timestamp
+            if self.idle:
+                self._switch(MODE_ACTIVE)
+        elif self.enabled and not self.idle and timestamp - self.last_hand_seen >= self.idle_after:
+            self._switch(MODE_IDLE)
+
+    def _switch(self, mode: str):
+        logger.info('[SCHEDULER] Detection mode %s -> %s', self.mode, mode)
+        self.mode = mode
+        self.transitions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'interval': self.interval,
+            'transitions': self.transitions,
+            'presence_checks': self.presence_checks,
+        }
@@ -0,0 +1,168 @@
+"""
+预分配的帧环形缓冲
+采集、处理、显示线程之间通过固定数量的帧缓冲交换图像：采集线程直接写入空闲缓冲，
+处理线程按序号读取（或只取最新帧），显示线程只拿最新结果。缓冲被读取或显示时会被占用(pin)，不会被覆盖；
+非无损模式下写入从不阻塞，处理跟不上时覆盖最旧的未读帧。
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class FrameSlot:
+    """环形缓冲中的一帧"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.frame: Optional[np.ndarray] = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self.captured_at = 0.0
+        self.consumed = True  # 已被处理线程取走（或从未写入）
+        self.pins = 0  # 正在使用该缓冲的线程数
+
+    def ensure(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """按需分配帧缓冲，只在首帧或分辨率变化时分配"""
+        if self.frame is None or self.frame.shape != shape or self.frame.dtype != dtype:
+            self.frame = np.empty(shape, dtype=dtype)
+        return self.frame
+
+
+class FrameRing:
+    def __init__(self, size: int = 4, lossless: bool = False, latest_only: bool = False):
+        # 写入、处理、显示各占一个，再加一个最新帧
+        self.slots: List[FrameSlot] = [FrameSlot(i) for i in range(max(3, size))]
+        self.lossless = lossless  # 重放时写入等待空闲缓冲，保证不丢帧
+        self.latest_only = latest_only and not lossless  # 处理线程总是取最新帧，跳过积压的旧帧
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._result: Optional[Tuple[FrameSlot, list]] = None
+        self.closed = False
+
+        # Statistics
+        self.written = 0
+        self.overwritten = 0  # 未被处理就被覆盖的帧
+        self.skipped = 0  # 最新帧模式下因已有更新的帧而跳过的帧
+        self.results_dropped = 0  # 显示线程来不及显示的结果
+
+    def acquire_write(self, timeout: float = 0.1) -> Optional[FrameSlot]:
+        """取一个可写缓冲；无损模式下没有空闲缓冲时最多等待timeout"""
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while not self.closed:
+                slot = self._pick_writable()
+                if slot is not None:
+                    if not slot.consumed:
+                        self.overwritten += 1
+                    slot.consumed = True
+                    slot.pins += 1
+                    return slot
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return None
+
+    def _pick_writable(self) -> Optional[FrameSlot]:
+        free = [slot for slot in self.slots if slot.pins == 0]
+        consumed = [slot for slot in free if slot.consumed]
+        if consumed:
+            return min(consumed, key=lambda slot: slot.seq)
+        if free and not self.lossless:
+            return min(free, key=lambda slot: slot.seq)
+        return None
+
+    def commit(self, slot: FrameSlot, timestamp: float, captured_at: float) -> int:
+        """发布写好的帧，返回其序号"""
+        with self._cond:
+            self._seq += 1
+            slot.seq = self._seq
+            slot.timestamp = timestamp
+            slot.captured_at = captured_at
+            slot.consumed = False
+            slot.pins -= 1
+            self.written += 1
+            self._cond.notify_all()
+            return slot.seq
+
+    def abort(self, slot: FrameSlot):
+        """放弃写入（读取失败），缓冲回到空闲状态"""
+        self.release(slot)
+
+    def get(self, timeout: float = 0.1) -> Optional[FrameSlot]:
+        """取下一帧未处理的帧并占用，用完后调用release；最新帧模式下跳过更旧的帧"""
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while not self.closed:
+                pending = [slot for slot in self.slots if not slot.consumed]
+                if pending:
+                    if self.latest_only:
+                        slot = max(pending, key=lambda s: s.seq)
+                        for stale in pending:
+                            stale.consumed = True
+                        self.skipped += len(pending) - 1
+                    else:
+                        slot = min(pending, key=lambda s: s.seq)
+                    slot.consumed = True
+                    slot.pins += 1
+                    return slot
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return None
+
+    def release(self, slot: FrameSlot):
+        with self._cond:
+            slot.pins -= 1
+            self._cond.notify_all()
+
+    def post_result(self, slot: FrameSlot, gestures: list):
+        """把处理结果交给显示线程，只保留最新一份"""
+        with self._cond:
+            slot.pins += 1
+            if self._result is not None:
+                self._result[0].pins -= 1
+                self.results_dropped += 1
+            self._result = (slot, gestures)
+            self._cond.notify_all()
+
+    def take_result(self, timeout: float = 0.1) -> Optional[Tuple[FrameSlot, list]]:
+        """取最新的处理结果，用完后对其缓冲调用release"""
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while self._result is None and not self.closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            result, self._result = self._result, None
+            return result
+
+    def dropped(self) -> int:
+        """采集后未被处理的帧数"""
+        with self._cond:
+            return self.overwritten + self.skipped
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for slot in self.slots if not slot.consumed)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'slots': len(self.slots),
+                'written': self.written,
+                'overwritten': self.overwritten,
+                'skipped': self.skipped,
+                'results_dropped': self.results_dropped,
+            }
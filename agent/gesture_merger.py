@@ -0,0 +1,45 @@
+"""
+多视频源手势合并
+同一个手势被多个摄像头同时看到时只保留最先上报的一次：其他视频源在去重窗口内上报的同名手势被视为重复并丢弃，
+同一视频源的重复触发仍由检测器自身的冷却控制
+"""
+
+import threading
+from typing import Any, Dict, Tuple
+
+
+class GestureMerger:
+    def __init__(self, dedup_window: float = 0.5):
+        self.dedup_window = dedup_window  # 秒，按手势时间戳比较
+
+        self._lock = threading.Lock()
+        self._last: Dict[str, Tuple[str, float]] = {}  # 手势码 -> (视频源, 时间戳)
+
+        # Statistics
+        self.accepted = 0
+        self.duplicates = 0
+        self.per_source: Dict[str, int] = {}
+
+    def accept(self, source: str, gesture_code: str, timestamp: float) -> bool:
+        """返回该手势是否应当触发；其他视频源刚上报过同一手势时返回False"""
+        key = gesture_code.lower()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None:
+                last_source, last_time = last
+                if last_source != source and abs(timestamp - last_time) < self.dedup_window:
+                    self.duplicates += 1
+                    return False
+            self._last[key] = (source, timestamp)
+            self.accepted += 1
+            self.per_source[source] = self.per_source.get(source, 0) + 1
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'dedup_window': self.dedup_window,
+                'accepted': self.accepted,
+                'duplicates': self.duplicates,
+                'per_source': dict(self.per_source),
+            }
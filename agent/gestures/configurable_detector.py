@@ -5,10 +5,14 @@
 
 import yaml
 import math
+import sys
 import time
+from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 
+sys.path.append(str(Path(__file__).parent.parent))
+
 @dataclass
 class FingerConfig:
     """手指状态配置"""
@@ -34,6 +38,11 @@ class GestureConfig:
     direction: Optional[str] = None  # "horizontal", "vertical", "diagonal"
     sign: Optional[str] = None  # "positive", "negative"
 
+    # 轨迹模板配置（画圈、Z字、前推等），设置后按模板匹配而不按方向匹配
+    template: Optional[str] = None  # 内置形状名
+    points: Optional[List[List[float]]] = None  # 自定义路径 [[x, y], ...] 或 [[x, y, z], ...]
+    max_distance: float = 0.2  # 平均每点DTW距离（归一化坐标）小于该值才匹配
+
     # 其他配置
     description: str = ""
 
@@ -44,8 +53,12 @@ class ConfigurableGestureDetector:
         self.config_file = config_file
         self.static_gestures: Dict[str, GestureConfig] = {}
         self.dynamic_gestures: Dict[str, GestureConfig] = {}
+        self.static_table = None
+        self.trajectory_recognizer = None
 
         self.load_config()
+        self._build_static_table()
+        self._build_trajectory_recognizer()
 
     def load_config(self):
         """加载手势配置"""
@@ -70,17 +83,7 @@ class ConfigurableGestureDetector:
             # 加载动态手势配置
             if 'dynamic_gestures' in config_data:
                 for gesture_code, gesture_data in config_data['dynamic_gestures'].items():
-
-                    self.dynamic_gestures[gesture_code] = GestureConfig(
-                        code=gesture_code,
-                        name=gesture_data.get('name', ''),
-                        type='dynamic',
-                        confidence=gesture_data.get('confidence', 0.8),
-                        min_distance=gesture_data.get('min_distance', 0.1),
-                        direction=gesture_data.get('direction', 'horizontal'),
-                        sign=gesture_data.get('sign', 'positive'),
-                        description=gesture_data.get('description', '')
-                    )
+                    self.dynamic_gestures[gesture_code] = self._dynamic_config(gesture_code, gesture_data)
 
             print(f"✅ 加载了 {len(self.static_gestures)} 个静态手势，{len(self.dynamic_gestures)} 个动态手势")
 
@@ -209,27 +212,55 @@ class ConfigurableGestureDetector:
             )
 
         for code, data in default_dynamic_gestures.items():
-            self.dynamic_gestures[code] = GestureConfig(
-                code=code,
-                name=data.get('name', ''),
-                type='dynamic',
-                confidence=data.get('confidence', 0.8),
-                min_distance=data.get('min_distance', 0.1),
-                direction=data.get('direction', 'horizontal'),
-                sign=data.get('sign', 'positive'),
-                description=data.get('description', '')
-            )
+            self.dynamic_gestures[code] = self._dynamic_config(code, data)
+
+    @staticmethod
+    def _dynamic_config(code: str, data: Dict[str, Any]) -> GestureConfig:
+        """由配置字典创建动态手势配置"""
+        return GestureConfig(
+            code=code,
+            name=data.get('name', ''),
+            type='dynamic',
+            confidence=data.get('confidence', 0.8),
+            min_distance=data.get('min_distance', 0.1),
+            direction=data.get('direction', 'horizontal'),
+            sign=data.get('sign', 'positive'),
+            template=data.get('template'),
+            points=data.get('points'),
+            max_distance=data.get('max_distance', 0.2),
+            description=data.get('description', '')
+        )
+
+    def _build_static_table(self):
+        """把静态手势定义编译为按手指状态编码索引的查找表"""
+        # 延迟导入，static_classifier 依赖本模块的配置类
+        from gestures.static_classifier import StaticGestureTable
+        self.static_table = StaticGestureTable(self.static_gestures.values())
+
+    def _build_trajectory_recognizer(self):
+        """把带轨迹模板的动态手势预处理为模板库（重采样、归一化、计算LB_Keogh包络）"""
+        from gestures.trajectory_templates import TrajectoryTemplateRecognizer, builtin_shapes
+        shapes = builtin_shapes()
+        templates = []
+        for code, config in self.dynamic_gestures.items():
+            if config.points:
+                paths = [config.points]
+            elif config.template:
+                if config.template not in shapes:
+                    print(f"⚠️ 手势 {code} 的轨迹模板 {config.template} 不存在，可用: {', '.join(shapes)}")
+                    continue
+                paths = shapes[config.template]
+            else:
+                continue
+            for path in paths:
+                template = TrajectoryTemplateRecognizer.prepare(code, path, config.confidence, config.max_distance)
+                if template is not None:
+                    templates.append(template)
+        self.trajectory_recognizer = TrajectoryTemplateRecognizer(templates) if templates else None
 
     def recognize_static_gesture(self, finger_states: Dict[str, bool]) -> Optional[Tuple[str, float]]:
-        """识别静态手势"""
-        best_match = None
-        best_confidence = 0.0
-
-        for gesture_code, config in self.static_gestures.items():
-            if self._match_finger_states(finger_states, config.fingers):
-                if config.confidence > best_confidence:
-                    best_match = gesture_code
-                    best_confidence = config.confidence
+        """识别静态手势（查表）"""
+        best_match, best_confidence = self.static_table.lookup_states(finger_states)
 
         if best_match:
             return best_match, best_confidence
@@ -253,21 +284,21 @@ class ConfigurableGestureDetector:
             return best_match, best_confidence
         return None
 
-    def _match_finger_states(self, current_states: Dict[str, bool], config_states: Optional[FingerConfig]) -> bool:
-        """匹配手指状态"""
-        if config_states is None:
-            return False
-
-        # 检查每个手指的状态
-        for finger, state in config_states.__dict__.items():
-            if state is not None:  # 只检查配置中指定的手指
-                if current_states.get(finger, False) != state:
-                    return False
-
-        return True
+    def recognize_trajectory(self, points) -> Optional[Tuple[str, float]]:
+        """用轨迹模板识别 (n, 4) 的 (x, y, t, 手掌尺寸) 手心轨迹"""
+        if self.trajectory_recognizer is None:
+            return None
+        matched = self.trajectory_recognizer.match(points)
+        if matched:
+            return matched[0], matched[1]
+        return None
 
     def _match_dynamic_pattern(self, dx: float, dy: float, distance: float, config: GestureConfig) -> bool:
         """匹配动态模式"""
+        # 轨迹模板手势只由recognize_trajectory识别
+        if config.template or config.points:
+            return False
+
         # 检查距离
         if config.min_distance and distance < config.min_distance:
             return False
@@ -326,6 +357,13 @@ class ConfigurableGestureDetector:
                     'direction': 'horizontal',
                     'sign': 'negative',
                     'description': '自定义动态手势描述'
+                },
+                'CUSTOM_TRAJECTORY': {
+                    'name': '自定义轨迹手势',
+                    'confidence': 0.75,
+                    'points': [[0, 0], [1, 0], [0, 1], [1, 1]],
+                    'max_distance': 0.15,
+                    'description': '按给定路径（图像坐标，x向右、y向下）匹配'
                 }
             }
         }
@@ -0,0 +1,232 @@
+"""
+多进程MediaPipe推理池
+帧通过共享内存传给N个工作进程，每个进程持有自己的MediaPipeGestureDetector，只做推理并返回关键点；
+结果按提交序号重新排序后交给调用方，手势分类和轨迹分析仍在主进程中按帧顺序进行。
+多个视频源可以通过register()共用一个推理池，每个源的结果单独排序。
+每个视频源固定由一个工作进程处理（调用方编号 % 进程数），该进程中的检测器能看到这个源的每一帧，
+ROI跟踪和MediaPipe的帧间跟踪保持连续；代价是单个视频源的推理不会分摊到多个进程，
+推理池只在推理与采集、分类之间形成流水线，多进程并行的收益来自多个视频源
+"""
+
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from logger_config import COMPONENT_LOGGERS
+
+logger = logging.getLogger(COMPONENT_LOGGERS["video"])
+
+
+@dataclass
+class PoolResult:
+    seq: int
+    hands: np.ndarray  # (hands, 21, 3) 整帧归一化关键点
+    inference: float  # 工作进程内的推理耗时(秒)
+    meta: Any  # 提交时附带的调用方数据
+    handedness: Optional[np.ndarray] = None  # (hands,) 左右手编码
+
+
+def _worker_main(tasks, results, detector_kwargs: Dict[str, Any]):
+    """工作进程：从共享内存读取帧，推理后返回关键点"""
+    from gestures.landmarks import NUM_LANDMARKS
+    from gestures.mediapipe_detector import MediaPipeGestureDetector
+
+    # 每个视频源一个检测器，ROI跟踪和MediaPipe的帧间跟踪不会在不同摄像头之间串用
+    detectors: Dict[int, MediaPipeGestureDetector] = {}
+    # 槽号 -> 已映射的共享内存；主进程扩容某个槽时会换成新名字的共享内存
+    attached: Dict[int, shared_memory.SharedMemory] = {}
+    failures = 0
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, client, slot, shm_name, shape = task
+            start = time.perf_counter()
+            try:
+                detector = detectors.get(client)
+                if detector is None:
+                    detector = detectors[client] = MediaPipeGestureDetector(**detector_kwargs)
+                shm = attached.get(slot)
+                if shm is None or shm.name != shm_name:
+                    if shm is not None:
+                        shm.close()
+                    shm = attached[slot] = shared_memory.SharedMemory(name=shm_name)
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                hands = detector._infer_landmarks(frame)
+                handedness = detector.last_handedness
+            except Exception:
+                # 单帧失败按无手处理，保证序号连续；首次和之后每100次记录异常，避免刷屏
+                failures += 1
+                if failures == 1 or failures % 100 == 0:
+                    logger.exception('Detector worker failed on frame %d (%d failure(s) so far)', seq, failures)
+                hands = np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32)
+                handedness = None
+            results.put((seq, slot, hands, handedness, time.perf_counter() - start))
+    finally:
+        for detector in detectors.values():
+            detector.close()
+        for shm in attached.values():
+            shm.close()
+
+
+class DetectorPool:
+    def __init__(self, workers: int = 2, slots: Optional[int] = None,
+                 detector_kwargs: Optional[Dict[str, Any]] = None, frame_bytes: int = 0):
+        self.workers = max(1, workers)
+        self.slot_count = max(self.workers, slots or self.workers * 2)
+        self.detector_kwargs = detector_kwargs or {}
+
+        # spawn在Windows/macOS/Linux上行为一致，且不会把线程状态fork到子进程
+        self._ctx = mp.get_context('spawn')
+        # 每个工作进程一个任务队列，同一调用方的帧总是进入同一个队列
+        self._tasks = [self._ctx.Queue() for _ in range(self.workers)]
+        self._results = self._ctx.Queue()
+        self._processes: List[mp.Process] = []
+
+        # 每个槽的共享内存按frame_bytes预分配（未指定时在首次使用时分配），
+        # 之后遇到更大的帧（如空闲模式的缩小帧之后的整帧）时单独扩容该槽
+        self._shm: List[Optional[shared_memory.SharedMemory]] = [None] * self.slot_count
+        self._free: deque = deque(range(self.slot_count))
+        if frame_bytes > 0:
+            for slot in range(self.slot_count):
+                self._ensure_slot(slot, frame_bytes)
+
+        # 多个处理线程共用推理池时保护以下状态
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self._meta: Dict[int, Any] = {}
+        self._done: Dict[int, PoolResult] = {}
+        # 每个调用方按提交顺序排列的未取走序号
+        self._order: Dict[int, deque] = {0: deque()}
+        self._clients: Dict[str, int] = {}  # 视频源名称 -> 调用方编号
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        for i in range(self.workers):
+            process = self._ctx.Process(target=_worker_main, name=f'DetectorWorker-{i}',
+                                        args=(self._tasks[i], self._results, self.detector_kwargs), daemon=True)
+            process.start()
+            self._processes.append(process)
+        logger.info('Detector pool started with %d worker process(es), %d frame slots',
+                    self.workers, self.slot_count)
+
+    def close(self, timeout: float = 2.0):
+        for tasks in self._tasks[:len(self._processes)]:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        for shm in self._shm:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._shm = [None] * self.slot_count
+
+    def register(self, source: str) -> int:
+        """返回视频源的调用方编号，submit/collect时传入；同一视频源重新启动时沿用原编号（和工作进程中的检测器）。
+        单一调用方可直接使用默认编号0"""
+        with self._lock:
+            client = self._clients.get(source)
+            if client is None:
+                client = self._clients[source] = len(self._order)
+                self._order[client] = deque()
+            return client
+
+    def _ensure_slot(self, slot: int, nbytes: int) -> shared_memory.SharedMemory:
+        """保证槽至少有nbytes，不够时换成新的共享内存（工作进程按名字重新映射）"""
+        shm = self._shm[slot]
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+                logger.info('Growing detector pool slot %d from %d to %d bytes', slot, shm.size, nbytes)
+            shm = self._shm[slot] = shared_memory.SharedMemory(create=True, size=nbytes)
+        return shm
+
+    def submit(self, frame: np.ndarray, meta: Any = None, timeout: float = 0.0, client: int = 0) -> bool:
+        """把帧复制到空闲的共享内存槽并提交；timeout内没有空闲槽时返回False"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            with self._lock:
+                if self._free:
+                    slot = self._free.popleft()
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self.rejected += 1
+                    return False
+                # 短暂等待，不长时间占用锁，其他视频源仍可取结果
+                self._drain(min(remaining, 0.005))
+
+        # 槽已从空闲队列取出，不在任何工作进程手中，扩容和复制时无需持锁
+        shm = self._ensure_slot(slot, frame.nbytes)
+        np.copyto(np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf), frame)
+
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._meta[seq] = meta
+            self._order[client].append(seq)
+            self._tasks[client % self.workers].put((seq, client, slot, shm.name, frame.shape))
+            self.submitted += 1
+        return True
+
+    def _drain(self, timeout: float):
+        """接收已完成的结果并归还共享内存槽，调用方需持有锁"""
+        try:
+            item = self._results.get(timeout=timeout) if timeout > 0 else self._results.get_nowait()
+        except queue.Empty:
+            if self._processes and not any(p.is_alive() for p in self._processes):
+                raise RuntimeError('All detector pool workers have exited')
+            return
+        while True:
+            seq, slot, hands, handedness, inference = item
+            self._free.append(slot)
+            self._done[seq] = PoolResult(seq, hands, inference, self._meta.pop(seq, None), handedness)
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                return
+
+    def collect(self, timeout: float = 0.0, client: int = 0) -> List[PoolResult]:
+        """按提交顺序返回该调用方已完成的结果；后提交的帧先完成时会等待前面的帧"""
+        with self._lock:
+            self._drain(timeout)
+            order = self._order[client]
+            ordered = []
+            while order and order[0] in self._done:
+                ordered.append(self._done.pop(order.popleft()))
+            self.completed += len(ordered)
+            return ordered
+
+    def pending(self, client: Optional[int] = None) -> int:
+        """已提交未取走的帧数，不指定调用方时为全部"""
+        with self._lock:
+            if client is not None:
+                return len(self._order[client])
+            return sum(len(order) for order in self._order.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'workers': self.workers,
+            'clients': len(self._order),
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'pending': self.pending(),
+        }
@@ -8,64 +8,54 @@ import mediapipe as mp
 import numpy as np
 import logging
 import math
+import sys
 import time
-from collections import deque
+from pathlib import Path
 from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
 
+sys.path.append(str(Path(__file__).parent.parent))
+from gestures.landmarks import (
+    landmarks_to_array, as_hands, finger_states as compute_finger_states,
+    palm_centers, bounding_boxes, ok_sign_distances, handedness_to_array, OK_SIGN_THRESHOLD, NUM_LANDMARKS,
+)
+from gestures.hand_tracker import HandTrack, HandTracker
+from gestures.trajectory import TrajectoryBuffer
+from gestures.static_classifier import StaticGestureTable, DEFAULT_STATIC_TABLE, encode_finger_states
+
 # 从原有的MediaPipe检测器导入
 try:
-    from mediapipe_detector import GestureResult, HandPoint
+    from gestures.mediapipe_detector import GestureResult
 except ImportError:
     # 如果导入失败，自己定义
     @dataclass
     class GestureResult:
         gesture_code: str
         confidence: float
-        landmarks: List[Tuple[float, float, float]]
+        landmarks: np.ndarray  # (21, 3) float32
         timestamp: float
         bbox: Optional[Tuple[int, int, int, int]] = None
 
-    @dataclass
-    class HandPoint:
-        x: float
-        y: float
-        z: float = 0.0
-
-class TrajectoryPoint:
-    def __init__(self, position: Tuple[float, float], velocity: Tuple[float, float], timestamp: float):
-        self.position = position
-        self.velocity = velocity
-        self.timestamp = timestamp
-
 class DynamicGestureDetector:
     """动态手势检测器"""
 
     def __init__(self, history_size=20, min_swipe_distance=0.1):
         self.history_size = history_size
         self.min_swipe_distance = min_swipe_distance
-        self.trajectory_history = deque(maxlen=history_size)
+        # 固定容量的 (x, y, t) 数组，识别只需要首尾两点的位移
+        self.trajectory_history = TrajectoryBuffer(history_size)
         self.last_gesture_time = 0
         self.gesture_cooldown = 0.5  # 避免重复识别
 
-    def add_hand_position(self, landmarks: List[Tuple[float, float, float]], timestamp: float) -> Optional[str]:
+    def add_hand_position(self, landmarks: np.ndarray, timestamp: float) -> Optional[str]:
         """添加手部位置，检测动态手势"""
         # 计算手心位置
-        palm_center = self._calculate_palm_center(landmarks)
-
-        # 计算速度
-        velocity = (0, 0)
-        if self.trajectory_history:
-            last_point = self.trajectory_history[-1]
-            dt = timestamp - last_point.timestamp
-            if dt > 0:
-                dx = palm_center[0] - last_point.position[0]
-                dy = palm_center[1] - last_point.position[1]
-                velocity = (dx / dt, dy / dt)
+        return self.add_palm_position(self._calculate_palm_center(landmarks), timestamp)
 
+    def add_palm_position(self, palm_center: Tuple[float, float], timestamp: float) -> Optional[str]:
+        """添加已计算好的手心位置，检测动态手势"""
         # 添加到轨迹历史
-        trajectory_point = TrajectoryPoint(palm_center, velocity, timestamp)
-        self.trajectory_history.append(trajectory_point)
+        self.trajectory_history.append(palm_center[0], palm_center[1], timestamp)
 
         # 尝试识别手势
         gesture = self._recognize_dynamic_gesture(timestamp)
@@ -77,12 +67,10 @@ class DynamicGestureDetector:
 
         return None
 
-    def _calculate_palm_center(self, landmarks: List[Tuple[float, float, float]]) -> Tuple[float, float]:
+    def _calculate_palm_center(self, landmarks: np.ndarray) -> Tuple[float, float]:
         """计算手心位置"""
-        palm_indices = [0, 1, 5, 9, 13, 17]  # 手腕 + 各手指根部
-        palm_x = sum(landmarks[i][0] for i in palm_indices) / len(palm_indices)
-        palm_y = sum(landmarks[i][1] for i in palm_indices) / len(palm_indices)
-        return (palm_x, palm_y)
+        palm_x, palm_y = palm_centers(as_hands(landmarks))[0]
+        return (float(palm_x), float(palm_y))
 
     def _recognize_dynamic_gesture(self, timestamp: float) -> Optional[str]:
         """识别动态手势"""
@@ -99,14 +87,9 @@ class DynamicGestureDetector:
 
     def _analyze_trajectory(self) -> Optional[str]:
         """分析轨迹模式"""
-        points = list(self.trajectory_history)
-        start_pos = points[0].position
-        end_pos = points[-1].position
-
-        # 计算位移
-        dx = end_pos[0] - start_pos[0]
-        dy = end_pos[1] - start_pos[1]
-        distance = math.sqrt(dx**2 + dy**2)
+        # 计算位移（首尾两点）
+        dx, dy = self.trajectory_history.displacement()
+        distance = math.hypot(dx, dy)
 
         # 检查最小距离
         if distance < self.min_swipe_distance:
@@ -130,7 +113,8 @@ class EnhancedGestureDetector:
     def __init__(self,
                  min_detection_confidence: float = 0.5,
                  min_tracking_confidence: float = 0.5,
-                 max_hands: int = 2):
+                 max_hands: int = 2,
+                 static_table: Optional[StaticGestureTable] = None):
         # 保持原有的MediaPipe设置
         self.mp_hands = mp.solutions.hands
         self.mp_drawing = mp.solutions.drawing_utils
@@ -143,8 +127,14 @@ class EnhancedGestureDetector:
             min_tracking_confidence=min_tracking_confidence
         )
 
+        # 静态手势查找表
+        self.static_table = static_table or DEFAULT_STATIC_TABLE
+
         # 添加动态手势检测器
         self.dynamic_detector = DynamicGestureDetector()
+        # 多只手时每只手一个动态检测器，按跟踪编号区分
+        self.hand_tracker = HandTracker()
+        self.dynamic_detectors: Dict[int, DynamicGestureDetector] = {}
 
         # 手势状态控制
         self.last_gesture_time = 0
@@ -167,120 +157,78 @@ class EnhancedGestureDetector:
         gesture_results = []
         current_time = time.time()
 
-        for hand_landmarks in results.multi_hand_landmarks:
-            # 转换landmarks格式
-            landmarks = [
-                (landmark.x, landmark.y, landmark.z if hasattr(landmark, 'z') else 0)
-                for landmark in hand_landmarks.landmark
-            ]
+        # 共用 (hands, 21, 3) 数组路径，特征一次性计算
+        hands = landmarks_to_array(results.multi_hand_landmarks)
+        h, w = image.shape[:2]
+        state_codes = encode_finger_states(compute_finger_states(hands))
+        bboxes = bounding_boxes(hands, w, h)
+        palms = palm_centers(hands)
+        ok_signs = ok_sign_distances(hands) < OK_SIGN_THRESHOLD
+        tracks = self.hand_tracker.update(
+            palms, handedness_to_array(results.multi_handedness, len(hands)), current_time)
+
+        for hand_idx in range(len(hands)):
+            landmarks = hands[hand_idx]
 
             # 1. 静态手势检测（原有逻辑）
-            static_gesture = self._recognize_static_gesture(landmarks)
+            static_gesture = self._recognize_static_gesture(
+                landmarks, int(state_codes[hand_idx]), bool(ok_signs[hand_idx]))
 
             # 2. 动态手势检测（新增功能）
-            dynamic_gesture = self.dynamic_detector.add_hand_position(landmarks, current_time)
+            dynamic_gesture = self._dynamic_detector_for(tracks[hand_idx]).add_palm_position(
+                (float(palms[hand_idx, 0]), float(palms[hand_idx, 1])), current_time)
 
             # 3. 融合结果 - 优先动态手势
             final_gesture = dynamic_gesture if dynamic_gesture else static_gesture
 
             if final_gesture:
-                # 计算边界框
-                xs = [landmark[0] for landmark in landmarks]
-                ys = [landmark[1] for landmark in landmarks]
-                bbox = (min(xs), min(ys), max(xs), max(ys))
-
                 gesture_results.append(GestureResult(
                     gesture_code=final_gesture,
                     confidence=0.85,
                     landmarks=landmarks,
                     timestamp=current_time,
-                    bbox=bbox
+                    bbox=tuple(int(v) for v in bboxes[hand_idx])
                 ))
 
         return gesture_results if gesture_results else None
 
-    def _recognize_static_gesture(self, landmarks: List[Tuple[float, float, float]]) -> Optional[str]:
-        """静态手势检测 - 保留原有逻辑"""
-        if not landmarks or len(landmarks) < 21:
+    def _dynamic_detector_for(self, track: HandTrack) -> DynamicGestureDetector:
+        """返回该手的动态检测器，同时移除已离开画面的手"""
+        for track_id in [tid for tid in self.dynamic_detectors if tid not in self.hand_tracker.tracks]:
+            del self.dynamic_detectors[track_id]
+        detector = self.dynamic_detectors.get(track.track_id)
+        if detector is None:
+            detector = self.dynamic_detectors[track.track_id] = DynamicGestureDetector()
+        return detector
+
+    def _recognize_static_gesture(self, landmarks: np.ndarray,
+                                  state_code: Optional[int] = None,
+                                  is_ok_sign: Optional[bool] = None) -> Optional[str]:
+        """静态手势检测 - 按手指状态编码查表"""
+        if landmarks is None or len(landmarks) < NUM_LANDMARKS:
             return None
 
-        # 获取手指状态
-        finger_states = self._get_finger_states(landmarks)
-
-        # 定义手势
-        if self._is_pointing_up(finger_states):
-            return 'POINT_UP'
-        elif self._is_pointing_index(finger_states):
-            return 'POINT_INDEX'
-        elif self._is_thumbs_up(finger_states):
-            return 'THUMBS_UP'
-        elif self._is_thumbs_down(finger_states):
-            return 'THUMBS_DOWN'
-        elif self._is_open_palm(finger_states):
-            return 'OPEN_PALM'
-        elif self._is_closed_fist(finger_states):
-            return 'CLOSED_FIST'
-        elif self._is_victory(finger_states):
-            return 'VICTORY'
-        elif self._is_ok_sign(landmarks):
-            return 'OK_SIGN'
+        # 获取手指状态编码
+        if state_code is None:
+            state_code = self._get_state_code(landmarks)
 
-        return None
+        gesture_code, _ = self.static_table.lookup(state_code)
+        if gesture_code:
+            return gesture_code
 
-    # 以下方法保持原有实现
-    def _get_finger_states(self, landmarks: List[Tuple[float, float, float]]) -> Dict[str, bool]:
-        finger_tips = [4, 8, 12, 16, 20]
-        finger_bases = [3, 6, 10, 14, 18]
-        finger_names = ['thumb', 'index', 'middle', 'ring', 'pinky']
-
-        finger_states = {}
-        for i, name in enumerate(finger_names):
-            tip_y = landmarks[finger_tips[i]][1]
-            base_y = landmarks[finger_bases[i]][1]
-
-            if name == 'thumb':
-                tip_x = landmarks[finger_tips[i]][0]
-                base_x = landmarks[finger_bases[i]][0]
-                finger_states[name] = tip_x > base_x
-            else:
-                finger_states[name] = tip_y < base_y
-
-        return finger_states
-
-    def _is_pointing_up(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and not finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'] and
-                not finger_states['thumb'])
-
-    def _is_pointing_index(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and not finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'])
-
-    def _is_thumbs_up(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['thumb'] and not finger_states['index'] and
-                not finger_states['middle'] and not finger_states['ring'] and
-                not finger_states['pinky'])
-
-    def _is_thumbs_down(self, finger_states: Dict[str, bool]) -> bool:
-        return (not finger_states['thumb'] and not finger_states['index'] and
-                not finger_states['middle'] and not finger_states['ring'] and
-                not finger_states['pinky'])
-
-    def _is_open_palm(self, finger_states: Dict[str, bool]) -> bool:
-        return all(finger_states.values())
+        # OK手势依赖指尖距离
+        if is_ok_sign is None:
+            is_ok_sign = self._is_ok_sign(landmarks)
+        if is_ok_sign:
+            return 'OK_SIGN'
 
-    def _is_closed_fist(self, finger_states: Dict[str, bool]) -> bool:
-        return not any(finger_states.values())
+        return None
 
-    def _is_victory(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'])
+    def _get_state_code(self, landmarks: np.ndarray) -> int:
+        return int(encode_finger_states(compute_finger_states(as_hands(landmarks)))[0])
 
-    def _is_ok_sign(self, landmarks: List[Tuple[float, float, float]]) -> bool:
-        thumb_tip = landmarks[4]
-        index_tip = landmarks[8]
-        distance = np.sqrt((thumb_tip[0] - index_tip[0])**2 + (thumb_tip[1] - index_tip[1])**2)
-        return distance < 0.05
+    def _is_ok_sign(self, landmarks: np.ndarray) -> bool:
+        return bool(ok_sign_distances(as_hands(landmarks))[0] < OK_SIGN_THRESHOLD)
 
     def draw_landmarks(self, image: np.ndarray, hand_landmarks) -> np.ndarray:
         """绘制手部关键点 - 保持原有功能"""
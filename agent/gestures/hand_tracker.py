@@ -0,0 +1,96 @@
+"""
+多手身份跟踪
+按左右手标签和手心最近距离把每帧检测到的手与已有的手匹配，给每只手稳定的编号和独立的轨迹缓冲，
+避免两只手的位置混入同一条轨迹而产生虚假的挥动手势
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from gestures.landmarks import HAND_UNKNOWN
+
+
+@dataclass
+class HandTrack:
+    track_id: int
+    handedness: int = HAND_UNKNOWN
+    center: np.ndarray = field(default_factory=lambda: np.zeros(2, dtype=np.float32))
+    last_seen: float = 0.0
+    history: deque = field(default_factory=lambda: deque(maxlen=20))  # (x, y, t, 手掌尺寸) 手心轨迹，由检测器写入
+    last_dynamic_time: float = 0.0  # 该手上次识别出动态手势的时间
+
+
+class HandTracker:
+    def __init__(self, max_distance: float = 0.25, max_age: float = 0.5, history_size: int = 20):
+        self.max_distance = max_distance  # 帧间手心移动超过该距离(归一化)视为另一只手
+        self.max_age = max_age  # 超过该时长(秒)未出现的手被移除
+        self.history_size = history_size
+
+        self.tracks: Dict[int, HandTrack] = {}
+        self._next_id = 1
+
+        # Statistics
+        self.created = 0
+        self.expired = 0
+
+    def update(self, palms: np.ndarray, handedness: Optional[np.ndarray], timestamp: float) -> List[HandTrack]:
+        """用本帧 (n, 2) 手心位置更新跟踪，返回与输入顺序对应的HandTrack"""
+        self._expire(timestamp)
+        count = len(palms)
+        if handedness is None:
+            handedness = np.full(count, HAND_UNKNOWN, dtype=np.int8)
+
+        assigned: List[Optional[HandTrack]] = [None] * count
+        tracks = list(self.tracks.values())
+        if count and tracks:
+            centers = np.stack([track.center for track in tracks])
+            distances = np.linalg.norm(palms[:, np.newaxis, :] - centers[np.newaxis, :, :], axis=2)
+            # 左右手标签都已知且不同的组合不能匹配
+            labels = np.array([track.handedness for track in tracks], dtype=np.int8)
+            conflict = ((handedness[:, np.newaxis] != labels[np.newaxis, :])
+                        & (handedness[:, np.newaxis] != HAND_UNKNOWN) & (labels[np.newaxis, :] != HAND_UNKNOWN))
+            distances[conflict | (distances > self.max_distance)] = np.inf
+
+            # 贪心地按距离从近到远配对，手数很少时与最优匹配一致
+            for _ in range(min(count, len(tracks))):
+                hand_idx, track_idx = np.unravel_index(np.argmin(distances), distances.shape)
+                if not np.isfinite(distances[hand_idx, track_idx]):
+                    break
+                assigned[hand_idx] = tracks[track_idx]
+                distances[hand_idx, :] = np.inf
+                distances[:, track_idx] = np.inf
+
+        for hand_idx in range(count):
+            track = assigned[hand_idx]
+            if track is None:
+                track = assigned[hand_idx] = self._create()
+            track.center = palms[hand_idx].astype(np.float32)
+            track.last_seen = timestamp
+            if handedness[hand_idx] != HAND_UNKNOWN:
+                track.handedness = int(handedness[hand_idx])
+        return assigned
+
+    def _create(self) -> HandTrack:
+        track = HandTrack(track_id=self._next_id, history=deque(maxlen=self.history_size))
+        self.tracks[track.track_id] = track
+        self._next_id += 1
+        self.created += 1
+        return track
+
+    def _expire(self, timestamp: float):
+        for track_id in [tid for tid, track in self.tracks.items() if timestamp - track.last_seen > self.max_age]:
+            del self.tracks[track_id]
+            self.expired += 1
+
+    def reset(self):
+        self.tracks.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'active': len(self.tracks),
+            'created': self.created,
+            'expired': self.expired,
+        }
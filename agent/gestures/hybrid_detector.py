@@ -8,19 +8,23 @@ import mediapipe as mp
 import numpy as np
 import logging
 import math
+import sys
 import time
-from collections import deque
+from pathlib import Path
 from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
 
-# 导入现有的静态检测器
-from mediapipe_detector import GestureResult, MediaPipeGestureDetector, HandPoint
+sys.path.append(str(Path(__file__).parent.parent))
+from gestures.landmarks import (
+    landmarks_to_array, as_hands, finger_states as compute_finger_states,
+    palm_centers, bounding_boxes, ok_sign_distances, handedness_to_array, OK_SIGN_THRESHOLD,
+)
 
-@dataclass
-class TrajectoryPoint:
-    position: Tuple[float, float]  # (x, y)
-    velocity: Tuple[float, float]  # (vx, vy)
-    timestamp: float
+# 导入现有的静态检测器
+from gestures.mediapipe_detector import GestureResult, MediaPipeGestureDetector
+from gestures.hand_tracker import HandTrack, HandTracker
+from gestures.trajectory import TrajectoryBuffer
+from gestures.static_classifier import StaticGestureTable, encode_finger_states
 
 class DynamicGestureDetector:
     """动态手势检测器 - 基于轨迹分析"""
@@ -28,39 +32,29 @@ class DynamicGestureDetector:
     def __init__(self, history_size=20, min_swipe_distance=0.1):
         self.history_size = history_size
         self.min_swipe_distance = min_swipe_distance
-        self.trajectory_history = deque(maxlen=history_size)
+        # 固定容量的 (x, y, t) 数组，识别只需要首尾两点的位移
+        self.trajectory_history = TrajectoryBuffer(history_size)
         self.last_gesture_time = 0
         self.gesture_cooldown = 0.5  # 避免重复识别
 
-    def add_position(self, landmarks: List[HandPoint], timestamp: float) -> Optional[str]:
+    def add_position(self, landmarks: np.ndarray, timestamp: float) -> Optional[str]:
         """添加手部位置，检测动态手势"""
         # 计算手心位置
-        palm_center = self._calculate_palm_center(landmarks)
-
-        # 计算速度（如果有历史数据）
-        velocity = (0, 0)
-        if self.trajectory_history:
-            last_point = self.trajectory_history[-1]
-            dt = timestamp - last_point.timestamp
-            if dt > 0:
-                dx = palm_center[0] - last_point.position[0]
-                dy = palm_center[1] - last_point.position[1]
-                velocity = (dx / dt, dy / dt)
+        return self.add_palm_position(self._calculate_palm_center(landmarks), timestamp)
 
+    def add_palm_position(self, palm_center: Tuple[float, float], timestamp: float) -> Optional[str]:
+        """添加已计算好的手心位置，检测动态手势"""
         # 添加到轨迹历史
-        trajectory_point = TrajectoryPoint(palm_center, velocity, timestamp)
-        self.trajectory_history.append(trajectory_point)
+        self.trajectory_history.append(palm_center[0], palm_center[1], timestamp)
 
         # 尝试识别手势
         return self._recognize_dynamic_gesture(timestamp)
 
-    def _calculate_palm_center(self, landmarks: List[HandPoint]) -> Tuple[float, float]:
+    def _calculate_palm_center(self, landmarks: np.ndarray) -> Tuple[float, float]:
         """计算手心位置"""
         # 使用手腕和多个手指根部的平均值
-        palm_indices = [0, 1, 5, 9, 13, 17]  # 手腕 + 各手指根部
-        palm_x = sum(landmarks[i].x for i in palm_indices) / len(palm_indices)
-        palm_y = sum(landmarks[i].y for i in palm_indices) / len(palm_indices)
-        return (palm_x, palm_y)
+        palm_x, palm_y = palm_centers(as_hands(landmarks))[0]
+        return (float(palm_x), float(palm_y))
 
     def _recognize_dynamic_gesture(self, timestamp: float) -> Optional[str]:
         """识别动态手势"""
@@ -82,23 +76,14 @@ class DynamicGestureDetector:
 
     def _analyze_trajectory(self) -> Optional[str]:
         """分析轨迹模式"""
-        points = list(self.trajectory_history)
-
-        # 计算总位移
-        start_pos = points[0].position
-        end_pos = points[-1].position
-        dx = end_pos[0] - start_pos[0]
-        dy = end_pos[1] - start_pos[1]
-        distance = math.sqrt(dx**2 + dy**2)
+        # 计算总位移（首尾两点）
+        dx, dy = self.trajectory_history.displacement()
+        distance = math.hypot(dx, dy)
 
         # 检查最小距离
         if distance < self.min_swipe_distance:
             return None
 
-        # 计算平均速度
-        total_velocity = sum(math.sqrt(v[0]**2 + v[1]**2) for v in [p.velocity for p in points])
-        avg_speed = total_velocity / len(points)
-
         # 计算主要方向
         if abs(dx) > abs(dy):  # 水平主导
             if dx > 0:
@@ -117,13 +102,18 @@ class HybridGestureDetector:
     def __init__(self,
                  static_min_confidence=0.5,
                  dynamic_min_confidence=0.3,
-                 max_hands=2):
+                 max_hands=2,
+                 static_table: Optional[StaticGestureTable] = None):
         self.static_detector = MediaPipeGestureDetector(
             min_detection_confidence=static_min_confidence,
             min_tracking_confidence=static_min_confidence,
-            max_hands=max_hands
+            max_hands=max_hands,
+            static_table=static_table
         )
         self.dynamic_detector = DynamicGestureDetector()
+        # 多只手时每只手一个动态检测器，按跟踪编号区分
+        self.hand_tracker = HandTracker()
+        self.dynamic_detectors: Dict[int, DynamicGestureDetector] = {}
 
         # 模式切换阈值
         self.mode = "hybrid"  # "static", "dynamic", "hybrid"
@@ -149,65 +139,65 @@ class HybridGestureDetector:
         gesture_results = []
         current_time = time.time()
 
-        for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-            # 转换landmarks格式
-            landmarks = [
-                (landmark.x, landmark.y, landmark.z if hasattr(landmark, 'z') else 0)
-                for landmark in hand_landmarks.landmark
-            ]
+        # 共用 (hands, 21, 3) 数组路径，不再为每个关键点构建HandPoint对象
+        hands = landmarks_to_array(results.multi_hand_landmarks)
+        h, w = image.shape[:2]
+        state_codes = encode_finger_states(compute_finger_states(hands))
+        bboxes = bounding_boxes(hands, w, h)
+        palms = palm_centers(hands)
+        ok_signs = ok_sign_distances(hands) < OK_SIGN_THRESHOLD
+        tracks = self.hand_tracker.update(
+            palms, handedness_to_array(results.multi_handedness, len(hands)), current_time)
+
+        for hand_idx in range(len(hands)):
+            landmarks = hands[hand_idx]
 
             # 静态手势检测
-            static_gesture = self._detect_static_gesture(landmarks, current_time)
+            static_gesture = self._detect_static_gesture(
+                landmarks, current_time, int(state_codes[hand_idx]), bool(ok_signs[hand_idx]))
 
             # 动态手势检测
-            dynamic_gesture = self.dynamic_detector.add_position(
-                [HandPoint(x, y, z) for x, y, z in landmarks],
-                current_time
-            )
+            dynamic_gesture = self._dynamic_detector_for(tracks[hand_idx]).add_palm_position(
+                (float(palms[hand_idx, 0]), float(palms[hand_idx, 1])), current_time)
 
             # 融合结果
             fused_gesture = self._fuse_gesture_results(static_gesture, dynamic_gesture)
 
             if fused_gesture:
-                # 创建边界框（使用MediaPipe的边界框）
-                if hasattr(results.multi_hand_landmarks[hand_idx], 'bounding_box'):
-                    bbox = results.multi_hand_landmarks[hand_idx].bounding_box
-                else:
-                    # 手动计算边界框
-                    xs = [landmark.x for landmark in landmarks]
-                    ys = [landmark.y for landmark in landmarks]
-                    bbox = (min(xs), min(ys), max(xs), max(ys))
-
                 gesture_results.append(GestureResult(
                     gesture_code=fused_gesture,
                     confidence=0.85,  # 混合手势的置信度
                     landmarks=landmarks,
                     timestamp=current_time,
-                    bbox=bbox
+                    bbox=tuple(int(v) for v in bboxes[hand_idx])
                 ))
 
         return gesture_results if gesture_results else None
 
-    def _detect_static_gesture(self, landmarks: List[Tuple[float, float, float]], timestamp: float) -> Optional[str]:
+    def _dynamic_detector_for(self, track: HandTrack) -> DynamicGestureDetector:
+        """返回该手的动态检测器，同时移除已离开画面的手"""
+        for track_id in [tid for tid in self.dynamic_detectors if tid not in self.hand_tracker.tracks]:
+            del self.dynamic_detectors[track_id]
+        detector = self.dynamic_detectors.get(track.track_id)
+        if detector is None:
+            detector = self.dynamic_detectors[track.track_id] = DynamicGestureDetector()
+        return detector
+
+    def _detect_static_gesture(self, landmarks: np.ndarray, timestamp: float,
+                               state_code: Optional[int] = None,
+                               is_ok_sign: Optional[bool] = None) -> Optional[str]:
         """检测静态手势"""
-        finger_states = self.static_detector._get_finger_states(landmarks)
-
-        # 静态手势检测逻辑
-        if self.static_detector._is_pointing_up(finger_states):
-            return 'POINT_UP'
-        elif self.static_detector._is_pointing_index(finger_states):
-            return 'POINT_INDEX'
-        elif self.static_detector._is_thumbs_up(finger_states):
-            return 'THUMBS_UP'
-        elif self.static_detector._is_thumbs_down(finger_states):
-            return 'THUMBS_DOWN'
-        elif self.static_detector._is_open_palm(finger_states):
-            return 'OPEN_PALM'
-        elif self.static_detector._is_closed_fist(finger_states):
-            return 'CLOSED_FIST'
-        elif self.static_detector._is_victory(finger_states):
-            return 'VICTORY'
-        elif self.static_detector._is_ok_sign(landmarks):
+        if state_code is None:
+            state_code = self.static_detector._get_state_code(landmarks)
+
+        # 与静态检测器共用同一张查找表
+        gesture_code, _ = self.static_detector.static_table.lookup(state_code)
+        if gesture_code:
+            return gesture_code
+
+        if is_ok_sign is None:
+            is_ok_sign = self.static_detector._is_ok_sign(landmarks)
+        if is_ok_sign:
             return 'OK_SIGN'
 
         return None
@@ -251,15 +241,6 @@ class HybridGestureDetector:
         else:
             logging.warning(f'Invalid gesture detection mode: {mode}')
 
-# 为了兼容性，重新定义GestureResult
-@dataclass
-class GestureResult:
-    gesture_code: str
-    confidence: float
-    landmarks: List[Tuple[float, float, float]]
-    timestamp: float
-    bbox: Optional[Tuple[int, int, int, int]] = None
-
 # 为了兼容性，定义HandPoint
 @dataclass
 class HandPoint:
@@ -304,11 +285,8 @@ def test_hybrid_detector():
             point.x = x + (j % 5 - 2) * 0.01
             point.y = y + (j // 5 - 1) * 0.01
 
-        landmarks = [(p.x, p.y, p.z) for p in test_landmarks]
-        dynamic_result = detector.dynamic_detector.add_position(
-            [HandPoint(x, y, z) for x, y, z in landmarks],
-            timestamp
-        )
+        landmarks = np.array([(p.x, p.y, p.z) for p in test_landmarks], dtype=np.float32)
+        dynamic_result = detector.dynamic_detector.add_position(landmarks, timestamp)
 
         if dynamic_result:
             print(f"动态检测结果: {dynamic_result}")
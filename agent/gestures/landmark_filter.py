@@ -0,0 +1,79 @@
+"""
+关键点平滑
+对每只手的 (21, 3) 关键点数组整体做One Euro滤波：静止时截止频率低、抖动被压住，
+快速移动时截止频率随速度升高、延迟很小。静态手势和挥动轨迹都基于平滑后的坐标，
+较低的检测频率下也能用更少的采样点稳定识别
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+def _alpha(dt: float, cutoff):
+    """一阶低通滤波系数，cutoff可以是标量或数组"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """对任意形状的数组逐元素做One Euro滤波"""
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.0, d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff  # 静止时的截止频率(Hz)，越小越平滑
+        self.beta = beta  # 截止频率随速度增加的系数，越大快速移动时延迟越小
+        self.d_cutoff = d_cutoff  # 速度估计的截止频率(Hz)
+
+        self._value: Optional[np.ndarray] = None
+        self._derivative: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+
+    def __call__(self, value: np.ndarray, timestamp: float) -> np.ndarray:
+        if self._value is None:
+            self._value = value.astype(np.float32, copy=True)
+            self._derivative = np.zeros_like(self._value)
+            self._timestamp = timestamp
+            return self._value.copy()
+
+        dt = timestamp - self._timestamp
+        if dt <= 0:
+            # 同一时间戳重复调用时不更新状态
+            return self._value.copy()
+
+        derivative = (value - self._value) / dt
+        self._derivative += _alpha(dt, self.d_cutoff) * (derivative - self._derivative)
+        cutoff = self.min_cutoff + self.beta * np.abs(self._derivative)
+        self._value += _alpha(dt, cutoff) * (value - self._value)
+        self._timestamp = timestamp
+        return self._value.copy()
+
+    def reset(self):
+        self._value = None
+        self._derivative = None
+
+
+class LandmarkFilter:
+    """按手的跟踪编号维护各自的滤波状态"""
+
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 5.0, d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._filters: Dict[int, OneEuroFilter] = {}
+
+    def filter(self, hand_id: int, landmarks: np.ndarray, timestamp: float) -> np.ndarray:
+        """返回平滑后的 (21, 3) 关键点"""
+        one_euro = self._filters.get(hand_id)
+        if one_euro is None:
+            one_euro = self._filters[hand_id] = OneEuroFilter(self.min_cutoff, self.beta, self.d_cutoff)
+        return one_euro(landmarks, timestamp)
+
+    def retain(self, hand_ids: Iterable[int]):
+        """丢弃已不在画面中的手的滤波状态"""
+        keep = set(hand_ids)
+        for hand_id in [hid for hid in self._filters if hid not in keep]:
+            del self._filters[hand_id]
+
+    def reset(self):
+        self._filters.clear()
@@ -0,0 +1,88 @@
+"""
+手部关键点的向量化表示
+所有检测器共用 (hands, 21, 3) float32 数组，手指状态、边界框、手心位置和OK手势距离
+都以数组运算一次性计算，避免每帧为每只手创建大量Python对象
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+
+FINGER_NAMES = ('thumb', 'index', 'middle', 'ring', 'pinky')
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+FINGER_BASES = np.array([3, 6, 10, 14, 18])
+PALM_INDICES = np.array([0, 1, 5, 9, 13, 17])  # 手腕 + 各手指根部
+
+THUMB_TIP = 4
+INDEX_TIP = 8
+OK_SIGN_THRESHOLD = 0.05
+
+# 左右手编码，与MediaPipe的handedness标签对应
+HAND_UNKNOWN = -1
+HAND_LEFT = 0
+HAND_RIGHT = 1
+
+
+def landmarks_to_array(multi_hand_landmarks: Sequence[Any]) -> np.ndarray:
+    """把MediaPipe的multi_hand_landmarks转换为 (hands, 21, 3) float32 数组"""
+    hands = np.empty((len(multi_hand_landmarks), NUM_LANDMARKS, 3), dtype=np.float32)
+    for hand_idx, hand_landmarks in enumerate(multi_hand_landmarks):
+        hands[hand_idx] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+    return hands
+
+
+def handedness_to_array(multi_handedness: Optional[Sequence[Any]], count: int) -> np.ndarray:
+    """把MediaPipe的multi_handedness转换为 (count,) int8 左右手编码，缺失时为HAND_UNKNOWN"""
+    handedness = np.full(count, HAND_UNKNOWN, dtype=np.int8)
+    for hand_idx, classification in enumerate((multi_handedness or [])[:count]):
+        label = classification.classification[0].label
+        handedness[hand_idx] = HAND_RIGHT if label == 'Right' else HAND_LEFT
+    return handedness
+
+
+def as_hands(landmarks: Any) -> np.ndarray:
+    """接受单只手 (21, 3)、多只手 (n, 21, 3) 或 (x, y, z) 元组列表，统一为 (n, 21, 3)"""
+    hands = np.asarray(landmarks, dtype=np.float32)
+    if hands.ndim == 2:
+        hands = hands[np.newaxis]
+    return hands
+
+
+def finger_states(hands: np.ndarray) -> np.ndarray:
+    """返回 (n, 5) bool，顺序同 FINGER_NAMES；拇指比较x方向，其余手指比较y方向"""
+    tips = hands[:, FINGER_TIPS]
+    bases = hands[:, FINGER_BASES]
+    states = tips[:, :, 1] < bases[:, :, 1]
+    states[:, 0] = tips[:, 0, 0] > bases[:, 0, 0]
+    return states
+
+
+def states_to_dict(states: np.ndarray) -> Dict[str, bool]:
+    """把单只手的 (5,) 手指状态转换为 {finger: bool}"""
+    return {name: bool(state) for name, state in zip(FINGER_NAMES, states)}
+
+
+def palm_centers(hands: np.ndarray) -> np.ndarray:
+    """返回 (n, 2) 手心位置（归一化坐标）"""
+    return hands[:, PALM_INDICES, :2].mean(axis=1)
+
+
+def hand_scales(hands: np.ndarray) -> np.ndarray:
+    """返回 (n,) 手腕到中指根部的距离，手靠近摄像头时变大，可作为深度的近似"""
+    return np.linalg.norm(hands[:, 9, :2] - hands[:, 0, :2], axis=1)
+
+
+def bounding_boxes(hands: np.ndarray, width: int, height: int) -> np.ndarray:
+    """返回 (n, 4) int32 像素边界框 (x, y, w, h)"""
+    pixels = (hands[:, :, :2] * np.array([width, height], dtype=np.float32)).astype(np.int32)
+    mins = pixels.min(axis=1)
+    maxs = pixels.max(axis=1)
+    return np.concatenate([mins, maxs - mins], axis=1)
+
+
+def ok_sign_distances(hands: np.ndarray) -> np.ndarray:
+    """返回 (n,) 拇指尖与食指尖的平面距离"""
+    delta = hands[:, THUMB_TIP, :2] - hands[:, INDEX_TIP, :2]
+    return np.sqrt((delta * delta).sum(axis=1))
@@ -5,13 +5,22 @@ from typing import List, Optional, Tuple, Dict, Any
 from dataclasses import dataclass
 import time
 import math
-from collections import deque
 from pathlib import Path
 import sys
 
 # 添加父目录到路径以导入logger_config
 sys.path.append(str(Path(__file__).parent.parent))
 from logger_config import setup_component_logger
+from gestures.landmarks import (
+    landmarks_to_array, as_hands, finger_states as compute_finger_states,
+    palm_centers, hand_scales, bounding_boxes, ok_sign_distances, handedness_to_array, OK_SIGN_THRESHOLD, NUM_LANDMARKS,
+)
+from gestures.static_classifier import StaticGestureTable, DEFAULT_STATIC_TABLE, encode_finger_states
+from gestures.roi_tracker import RoiTracker
+from gestures.hand_tracker import HandTrack, HandTracker
+from gestures.temporal_filter import GestureVoteFilter
+from gestures.landmark_filter import LandmarkFilter
+from gestures.trajectory_templates import TrajectoryTemplateRecognizer
 
 # 设置手势检测模块的日志
 logger = setup_component_logger("detector")
@@ -21,7 +30,7 @@ logger = setup_component_logger("detector")
 class GestureResult:
     gesture_code: str
     confidence: float
-    landmarks: List[Tuple[float, float, float]]
+    landmarks: np.ndarray  # (21, 3) float32, 归一化 (x, y, z)
     timestamp: float
     bbox: Optional[Tuple[int, int, int, int]] = None  # (x, y, w, h)
 
@@ -30,7 +39,14 @@ class MediaPipeGestureDetector:
     def __init__(self,
                  min_detection_confidence: float = 0.5,
                  min_tracking_confidence: float = 0.5,
-                 max_hands: int = 2):
+                 max_hands: int = 2,
+                 static_table: Optional[StaticGestureTable] = None,
+                 roi_tracking: bool = False,
+                 gesture_filter: Optional[GestureVoteFilter] = None,
+                 gesture_cooldown: float = 1.0,
+                 landmark_filter: Optional[LandmarkFilter] = None,
+                 min_swipe_points: int = 10,
+                 trajectory_recognizer: Optional[TrajectoryTemplateRecognizer] = None):
         self.mp_hands = mp.solutions.hands
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
@@ -42,51 +58,114 @@ class MediaPipeGestureDetector:
             min_tracking_confidence=min_tracking_confidence
         )
 
-        # 动态手势检测器
-        self.hand_history = deque(maxlen=20)
+        # 根据上一帧的手部位置只对局部区域推理，丢失时回退整帧
+        self.roi_tracker = RoiTracker() if roi_tracking else None
+
+        # 静态手势查找表（手指状态编码 -> 手势）
+        self.static_table = static_table or DEFAULT_STATIC_TABLE
+
+        # 动态手势检测器：每只手有独立编号和轨迹
+        self.hand_tracker = HandTracker(history_size=20)
+        # 不经过跟踪器直接调用_update_hand_history时使用的单手轨迹
+        self._single_track = HandTrack(track_id=0)
+        self.hand_history = self._single_track.history
         self.min_swipe_distance = 0.1
+        self.min_swipe_points = min_swipe_points  # 识别挥动所需的最少轨迹点数
+        # 画圈、Z字、前推/后拉等模板手势，先于挥动识别
+        self.trajectory_recognizer = trajectory_recognizer
+        # 有模板时挥动轨迹须接近直线（位移/路径长度），弯曲的轨迹留给模板识别
+        self.min_swipe_straightness = 0.9
+        self.last_dynamic_confidence = 0.85
+        # 关键点平滑，设置后静态和动态识别都使用平滑后的坐标
+        self.landmark_filter = landmark_filter
         self.last_dynamic_gesture_time = 0
         self.dynamic_gesture_cooldown = 0.5
 
         self.last_gesture_time = 0
-        self.gesture_cooldown = 1.0  # seconds between gestures
+        self.gesture_cooldown = gesture_cooldown  # seconds between gestures
+
+        # 静态手势的多帧投票滤波，未设置时单帧识别结果直接输出
+        self.gesture_filter = gesture_filter
+
+        # 最近一次detect_hands的分阶段耗时（秒）: inference / classify
+        self.last_timings: Dict[str, float] = {}
+        # 按图像尺寸复用的RGB转换缓冲
+        self._rgb_buffers: Dict[Tuple[int, ...], np.ndarray] = {}
+        # 最近一次检测到的手数（不论是否识别出手势），用于自适应调度
+        self.last_hand_count = 0
+        # 最近一次推理的左右手编码 (hands,)
+        self.last_handedness = np.empty(0, dtype=np.int8)
 
         logger.info('MediaPipe gesture detector initialized with dynamic gesture support')
     
-    def detect_hands(self, image: np.ndarray) -> Optional[List[GestureResult]]:
+    def detect_hands(self, image: np.ndarray, timestamp: Optional[float] = None) -> Optional[List[GestureResult]]:
         if image is None:
             return None
             
-        # Convert BGR to RGB
-        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_image)
+        inference_start = time.perf_counter()
+        hands = self._infer_landmarks(image)
+        inference_end = time.perf_counter()
+        self.last_timings = {'inference': inference_end - inference_start}
         
-        if not results.multi_hand_landmarks:
+        h, w = image.shape[:2]
+        gestures = self.classify_landmarks(hands, w, h, timestamp, self.last_handedness)
+        if len(hands):
+            self.last_timings['classify'] = time.perf_counter() - inference_end
+        return gestures
+    
+    def classify_landmarks(self, hands: np.ndarray, width: int, height: int,
+                           timestamp: Optional[float] = None,
+                           handedness: Optional[np.ndarray] = None) -> Optional[List[GestureResult]]:
+        """对已推理出的 (hands, 21, 3) 整帧归一化关键点做静态/动态手势识别"""
+        self.last_hand_count = len(hands)
+        # 允许调用方注入帧时间戳（离线重放），否则使用当前时间
+        current_time = timestamp if timestamp is not None else time.time()
+        if not len(hands):
+            # 仍需更新跟踪器，让离开画面的手过期
+            self.hand_tracker.update(np.empty((0, 2), dtype=np.float32), None, current_time)
             return None
             
         gestures = []
-        current_time = time.time()
         
-        for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-            # Extract landmark coordinates
-            landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
-            
-            # Calculate bounding box
-            h, w = image.shape[:2]
-            x_coords = [int(lm.x * w) for lm in hand_landmarks.landmark]
-            y_coords = [int(lm.y * h) for lm in hand_landmarks.landmark]
-            bbox = (min(x_coords), min(y_coords), max(x_coords) - min(x_coords), max(y_coords) - min(y_coords))
-            
-            # Add hand position to dynamic gesture tracking
-            self._update_hand_history(landmarks, current_time)
+        # 按左右手和位置把每只手对应到自己的轨迹
+        palms = palm_centers(hands)
+        tracks = self.hand_tracker.update(palms, handedness, current_time)
+        if self.gesture_filter is not None:
+            self.gesture_filter.retain(self.hand_tracker.tracks)
+        if self.landmark_filter is not None:
+            self.landmark_filter.retain(self.hand_tracker.tracks)
+            hands = np.stack([self.landmark_filter.filter(track.track_id, hands[hand_idx], current_time)
+                              for hand_idx, track in enumerate(tracks)])
+            palms = palm_centers(hands)
+        scales = hand_scales(hands)
+        for hand_idx, track in enumerate(tracks):
+            track.history.append((float(palms[hand_idx, 0]), float(palms[hand_idx, 1]), current_time,
+                                  float(scales[hand_idx])))
+        
+        # 所有手的关键点放入一个 (hands, 21, 3) 数组，特征一次性向量化计算
+        w, h = width, height
+        state_codes = encode_finger_states(compute_finger_states(hands))
+        bboxes = bounding_boxes(hands, w, h)
+        ok_signs = ok_sign_distances(hands) < OK_SIGN_THRESHOLD
+        
+        for hand_idx in range(len(hands)):
+            landmarks = hands[hand_idx]
+            bbox = tuple(int(v) for v in bboxes[hand_idx])
 
             # Try to recognize dynamic gesture first (higher priority)
-            dynamic_gesture = self._recognize_dynamic_gesture()
+            dynamic_gesture = self._recognize_dynamic_gesture(current_time, tracks[hand_idx])
+            filtered = False
             if dynamic_gesture:
-                gesture_code, confidence = dynamic_gesture, 0.85
+                gesture_code, confidence = dynamic_gesture, self.last_dynamic_confidence
             else:
                 # Fall back to static gesture recognition
-                gesture_code, confidence = self._recognize_gesture(landmarks)
+                gesture_code, confidence = self._recognize_gesture(
+                    landmarks, int(state_codes[hand_idx]), bool(ok_signs[hand_idx]))
+                if self.gesture_filter is not None:
+                    # 连续多帧得票确认后才输出，单帧闪烁不会触发
+                    gesture_code = self.gesture_filter.update(
+                        tracks[hand_idx].track_id, gesture_code if confidence > 0.6 else None, current_time)
+                    filtered = True
 
             if gesture_code and confidence > 0.6:
                 # Check cooldown to avoid repeated gestures
@@ -99,102 +178,89 @@ class MediaPipeGestureDetector:
                         bbox=bbox
                     ))
                     self.last_gesture_time = current_time
+                    if filtered:
+                        # 只有真正输出的手势才计入滤波器的触发，被冷却拦下的手势冷却结束后仍可输出
+                        self.gesture_filter.mark_fired(tracks[hand_idx].track_id, current_time)
         
         return gestures if gestures else None
     
-    def _recognize_gesture(self, landmarks: List[Tuple[float, float, float]]) -> Tuple[Optional[str], float]:
-        if not landmarks or len(landmarks) < 21:
-            return None, 0.0
-            
-        # Get fingertip and base positions for each finger
-        finger_states = self._get_finger_states(landmarks)
-        
-        # Define gestures based on finger states
-        if self._is_pointing_up(finger_states):
-            logger.info('[DETECTOR] Recognized POINT_UP')
-            return 'POINT_UP', 0.9
-        elif self._is_pointing_index(finger_states):
-            logger.info('[DETECTOR] Recognized POINT_INDEX')
-            return 'POINT_INDEX', 0.9
-        elif self._is_thumbs_up(finger_states):
-            logger.info('[DETECTOR] Recognized THUMBS_UP')
-            return 'THUMBS_UP', 0.9
-        elif self._is_thumbs_down(finger_states):
-            logger.info('[DETECTOR] Recognized THUMBS_DOWN')
-            return 'THUMBS_DOWN', 0.9
-        elif self._is_open_palm(finger_states):
-            logger.info('[DETECTOR] Recognized OPEN_PALM')
-            return 'OPEN_PALM', 0.8
-        elif self._is_closed_fist(finger_states):
-            logger.info('[DETECTOR] Recognized CLOSED_FIST')
-            return 'CLOSED_FIST', 0.9
-        elif self._is_victory(finger_states):
-            logger.info('[DETECTOR] Recognized VICTORY')
-            return 'VICTORY', 0.9
-        elif self._is_ok_sign(landmarks):
-            logger.info('[DETECTOR] Recognized OK_SIGN')
-            return 'OK_SIGN', 0.8
-        else:
-            # 不记录每个识别失败，避免日志过多
-            return None, 0.0
+    def _to_rgb(self, image: np.ndarray) -> np.ndarray:
+        """BGR转RGB，写入按尺寸复用的缓冲，避免每帧分配"""
+        buffer = self._rgb_buffers.get(image.shape)
+        if buffer is None:
+            if len(self._rgb_buffers) >= 4:
+                # ROI尺寸变化频繁时不无限增长
+                self._rgb_buffers.clear()
+            buffer = self._rgb_buffers[image.shape] = np.empty(image.shape, dtype=np.uint8)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=buffer)
     
-    def _get_finger_states(self, landmarks: List[Tuple[float, float, float]]) -> Dict[str, bool]:
-        # Finger tip and base indices
-        finger_tips = [4, 8, 12, 16, 20]  # thumb, index, middle, ring, pinky
-        finger_bases = [3, 6, 10, 14, 18]
+    def _infer_landmarks(self, image: np.ndarray) -> np.ndarray:
+        """运行MediaPipe推理，返回相对整帧归一化的 (hands, 21, 3) 关键点"""
+        if self.roi_tracker is None:
+            results = self.hands.process(self._to_rgb(image))
+            return self._landmarks_from(results)
         
-        finger_states = {}
-        finger_names = ['thumb', 'index', 'middle', 'ring', 'pinky']
+        h, w = image.shape[:2]
+        crop, roi = self.roi_tracker.crop(image)
+        results = self.hands.process(self._to_rgb(crop))
+        if roi is not None and not results.multi_hand_landmarks:
+            # 跟踪丢失，回退到整帧搜索
+            self.roi_tracker.miss()
+            crop, roi = self.roi_tracker.crop(image)
+            results = self.hands.process(self._to_rgb(crop))
         
-        for i, name in enumerate(finger_names):
-            tip_y = landmarks[finger_tips[i]][1]
-            base_y = landmarks[finger_bases[i]][1]
-            
-            # For thumb, check x direction instead of y
-            if name == 'thumb':
-                tip_x = landmarks[finger_tips[i]][0]
-                base_x = landmarks[finger_bases[i]][0]
-                finger_states[name] = tip_x > base_x
-            else:
-                finger_states[name] = tip_y < base_y
-        
-        return finger_states
-    
-    def _is_pointing_up(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and not finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'] and
-                not finger_states['thumb'])
-    
-    def _is_pointing_index(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and not finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'])
+        hands = self._landmarks_from(results)
+        if roi is not None:
+            hands = RoiTracker.remap(hands, roi, w, h)
+        self.roi_tracker.update(bounding_boxes(hands, w, h), w, h)
+        return hands
     
-    def _is_thumbs_up(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['thumb'] and not finger_states['index'] and
-                not finger_states['middle'] and not finger_states['ring'] and
-                not finger_states['pinky'])
+    def _landmarks_from(self, results) -> np.ndarray:
+        """转换推理结果为关键点数组，同时记录左右手"""
+        hands = landmarks_to_array(results.multi_hand_landmarks or [])
+        self.last_handedness = handedness_to_array(results.multi_handedness, len(hands))
+        return hands
     
-    def _is_thumbs_down(self, finger_states: Dict[str, bool]) -> bool:
-        return (not finger_states['thumb'] and not finger_states['index'] and
-                not finger_states['middle'] and not finger_states['ring'] and
-                not finger_states['pinky'])
-    
-    def _is_open_palm(self, finger_states: Dict[str, bool]) -> bool:
-        return all(finger_states.values())
+    def count_hands(self, image: np.ndarray) -> int:
+        """只运行推理并返回手数，不做手势分类，用于无手时的低成本存在检测"""
+        if image is None:
+            return 0
+        inference_start = time.perf_counter()
+        results = self.hands.process(self._to_rgb(image))
+        self.last_timings = {'inference': time.perf_counter() - inference_start}
+        self.last_hand_count = len(results.multi_hand_landmarks or [])
+        return self.last_hand_count
     
-    def _is_closed_fist(self, finger_states: Dict[str, bool]) -> bool:
-        return not any(finger_states.values())
+    def _recognize_gesture(self, landmarks: np.ndarray,
+                           state_code: Optional[int] = None,
+                           is_ok_sign: Optional[bool] = None) -> Tuple[Optional[str], float]:
+        if landmarks is None or len(landmarks) < NUM_LANDMARKS:
+            return None, 0.0
+            
+        # 手指状态编码后直接查表
+        if state_code is None:
+            state_code = self._get_state_code(landmarks)
+        gesture_code, confidence = self.static_table.lookup(state_code)
+        if gesture_code:
+            logger.info('[DETECTOR] Recognized %s', gesture_code)
+            return gesture_code, confidence
+
+        # OK手势依赖指尖距离，不能由手指状态表示
+        if is_ok_sign is None:
+            is_ok_sign = self._is_ok_sign(landmarks)
+        if is_ok_sign:
+            logger.info('[DETECTOR] Recognized OK_SIGN')
+            return 'OK_SIGN', 0.8
+
+        # 不记录每个识别失败，避免日志过多
+        return None, 0.0
     
-    def _is_victory(self, finger_states: Dict[str, bool]) -> bool:
-        return (finger_states['index'] and finger_states['middle'] and
-                not finger_states['ring'] and not finger_states['pinky'])
+    def _get_state_code(self, landmarks: np.ndarray) -> int:
+        return int(encode_finger_states(compute_finger_states(as_hands(landmarks)))[0])
     
-    def _is_ok_sign(self, landmarks: List[Tuple[float, float, float]]) -> bool:
+    def _is_ok_sign(self, landmarks: np.ndarray) -> bool:
         # Check if thumb and index finger form a circle (OK sign)
-        thumb_tip = landmarks[4]
-        index_tip = landmarks[8]
-        distance = np.sqrt((thumb_tip[0] - index_tip[0])**2 + (thumb_tip[1] - index_tip[1])**2)
-        return distance < 0.05
+        return bool(ok_sign_distances(as_hands(landmarks))[0] < OK_SIGN_THRESHOLD)
     
     def draw_landmarks(self, image: np.ndarray, hand_landmarks) -> np.ndarray:
         if hand_landmarks:
@@ -218,67 +284,74 @@ class MediaPipeGestureDetector:
         except:
             pass
 
-    def _update_hand_history(self, landmarks: List[Tuple[float, float, float]], timestamp: float):
+    def _update_hand_history(self, landmarks: np.ndarray, timestamp: float):
         """更新手部历史轨迹"""
         # 计算手心位置作为追踪点
-        palm_indices = [0, 1, 5, 9, 13, 17]  # 手腕 + 各手指根部
-        palm_x = sum(landmarks[i][0] for i in palm_indices) / len(palm_indices)
-        palm_y = sum(landmarks[i][1] for i in palm_indices) / len(palm_indices)
+        hands = as_hands(landmarks)
+        palm_x, palm_y = palm_centers(hands)[0]
+        self.hand_history.append((float(palm_x), float(palm_y), timestamp, float(hand_scales(hands)[0])))
 
-        self.hand_history.append((palm_x, palm_y, timestamp))
+    def _recognize_dynamic_gesture(self, current_time: Optional[float] = None,
+                                   track: Optional[HandTrack] = None) -> Optional[str]:
+        """识别某只手的动态手势，未指定时使用单手轨迹"""
+        if current_time is None:
+            current_time = time.time()
+        if track is None:
+            track = self._single_track
+        history = track.history
 
-    def _recognize_dynamic_gesture(self) -> Optional[str]:
-        """识别动态手势"""
-        import logging
-        current_time = time.time()
-
-        # 手势冷却
-        if current_time - self.last_dynamic_gesture_time < self.dynamic_gesture_cooldown:
+        # 手势冷却（每只手独立）
+        if current_time - track.last_dynamic_time < self.dynamic_gesture_cooldown:
             return None
 
-        if len(self.hand_history) < 10:
+        recognizer = self.trajectory_recognizer
+        if recognizer is not None and len(history) >= recognizer.min_points:
+            matched = recognizer.match(np.array(history))
+            if matched is not None:
+                gesture, confidence, distance = matched
+                track.last_dynamic_time = current_time
+                self.last_dynamic_gesture_time = current_time
+                self.last_dynamic_confidence = confidence
+                history.clear()
+                logger.info('[DETECTOR] Recognized template %s on hand %d (distance=%.3f)',
+                            gesture, track.track_id, distance)
+                return gesture
+
+        if len(history) < self.min_swipe_points:
             return None  # 轨迹数据不足
 
-        # 分析轨迹
-        points = list(self.hand_history)
-        start_pos = points[0]
-        end_pos = points[-1]
+        # 分析轨迹：位移只需首尾两点，deque两端取值为O(1)，不复制整段轨迹
+        start_pos = history[0]
+        end_pos = history[-1]
 
         # 计算位移
         dx = end_pos[0] - start_pos[0]
         dy = end_pos[1] - start_pos[1]
         distance = math.sqrt(dx**2 + dy**2)
 
-        logger.info('[DETECTOR] Dynamic gesture analysis: history_len=%d, dx=%.3f, dy=%.3f, distance=%.3f',
-                    len(self.hand_history), dx, dy, distance)
+        logger.info('[DETECTOR] Dynamic gesture analysis: hand=%d, history_len=%d, dx=%.3f, dy=%.3f, distance=%.3f',
+                    track.track_id, len(history), dx, dy, distance)
 
         # 检查最小距离
         if distance < self.min_swipe_distance:
             logger.info('[DETECTOR] Distance too small: %.3f < %.3f', distance, self.min_swipe_distance)
             return None
 
+        if recognizer is not None:
+            # 只在已通过距离检查时计算路径长度，一次向量化求和
+            steps = np.diff(np.array(history)[:, :2], axis=0)
+            path_length = float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+            if distance < self.min_swipe_straightness * path_length:
+                return None  # 可能是正在画的圈或Z字
+
         # 计算主要方向
         if abs(dx) > abs(dy):  # 水平主导
-            if dx > 0:
-                self.last_dynamic_gesture_time = current_time
-                self.hand_history.clear()  # 清空历史，准备下一次手势
-                logger.info('[DETECTOR] Recognized SWIPE_RIGHT (dx=%.3f > 0)', dx)
-                return "SWIPE_RIGHT"
-            else:
-                self.last_dynamic_gesture_time = current_time
-                self.hand_history.clear()
-                logger.info('[DETECTOR] Recognized SWIPE_LEFT (dx=%.3f < 0)', dx)
-                return "SWIPE_LEFT"
+            gesture = "SWIPE_RIGHT" if dx > 0 else "SWIPE_LEFT"
         else:  # 垂直主导
-            if dy > 0:
-                self.last_dynamic_gesture_time = current_time
-                self.hand_history.clear()
-                logger.info('[DETECTOR] Recognized SWIPE_DOWN (dy=%.3f > 0)', dy)
-                return "SWIPE_DOWN"
-            else:
-                self.last_dynamic_gesture_time = current_time
-                self.hand_history.clear()
-                logger.info('[DETECTOR] Recognized SWIPE_UP (dy=%.3f < 0)', dy)
-                return "SWIPE_UP"
-
-
+            gesture = "SWIPE_DOWN" if dy > 0 else "SWIPE_UP"
+        track.last_dynamic_time = current_time
+        self.last_dynamic_gesture_time = current_time
+        self.last_dynamic_confidence = 0.85
+        history.clear()  # 清空历史，准备下一次手势
+        logger.info('[DETECTOR] Recognized %s on hand %d (dx=%.3f, dy=%.3f)', gesture, track.track_id, dx, dy)
+        return gesture
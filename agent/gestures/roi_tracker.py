@@ -0,0 +1,98 @@
+"""
+手部感兴趣区域(ROI)跟踪
+用上一帧的手部边界框裁剪出带边距的区域送入MediaPipe推理，再把关键点映射回整帧坐标；
+手接近区域边缘时重新计算区域，区域内丢失手时回退到整帧搜索
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+Roi = Tuple[int, int, int, int]  # (x, y, w, h) 像素
+
+
+class RoiTracker:
+    def __init__(self,
+                 padding: float = 0.6,
+                 edge_margin: float = 0.1,
+                 min_size: int = 160,
+                 max_coverage: float = 0.7):
+        self.padding = padding  # 区域在边界框每侧扩展的比例（相对边界框长边）
+        self.edge_margin = edge_margin  # 手进入区域边缘该比例范围内时重新计算
+        self.min_size = min_size
+        self.max_coverage = max_coverage  # 区域超过整帧该比例时直接整帧推理
+
+        self.roi: Optional[Roi] = None
+
+        # Statistics
+        self.cropped_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def crop(self, image: np.ndarray) -> Tuple[np.ndarray, Optional[Roi]]:
+        """返回用于推理的图像及其在整帧中的区域，未跟踪时返回整帧和None"""
+        if self.roi is None:
+            self.full_frames += 1
+            return image, None
+        x, y, w, h = self.roi
+        self.cropped_frames += 1
+        return image[y:y + h, x:x + w], self.roi
+
+    def miss(self):
+        """区域内没有找到手，放弃跟踪"""
+        if self.roi is not None:
+            self.roi = None
+            self.lost += 1
+
+    def update(self, boxes: np.ndarray, frame_width: int, frame_height: int):
+        """用本帧 (n, 4) 像素边界框更新区域"""
+        if len(boxes) == 0:
+            self.miss()
+            return
+
+        x0, y0 = boxes[:, 0].min(), boxes[:, 1].min()
+        x1, y1 = (boxes[:, 0] + boxes[:, 2]).max(), (boxes[:, 1] + boxes[:, 3]).max()
+
+        # 手仍在当前区域内部时保持区域不变，让MediaPipe的帧间跟踪看到稳定的输入
+        if self.roi is not None and self._inside(x0, y0, x1, y1):
+            return
+
+        pad = int(max(x1 - x0, y1 - y0) * self.padding)
+        x0, y0, x1, y1 = x0 - pad, y0 - pad, x1 + pad, y1 + pad
+        x0, x1 = self._fit(x0, x1, frame_width)
+        y0, y1 = self._fit(y0, y1, frame_height)
+
+        if (x1 - x0) * (y1 - y0) >= self.max_coverage * frame_width * frame_height:
+            self.roi = None
+        else:
+            self.roi = (int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+
+    def _inside(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        rx, ry, rw, rh = self.roi
+        mx, my = rw * self.edge_margin, rh * self.edge_margin
+        return x0 >= rx + mx and y0 >= ry + my and x1 <= rx + rw - mx and y1 <= ry + rh - my
+
+    def _fit(self, start: int, end: int, limit: int) -> Tuple[int, int]:
+        """扩展到最小尺寸并限制在画面内"""
+        size = min(max(end - start, self.min_size), limit)
+        center = (start + end) // 2
+        start = min(max(center - size // 2, 0), limit - size)
+        return start, start + size
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'roi': self.roi,
+            'cropped_frames': self.cropped_frames,
+            'full_frames': self.full_frames,
+            'lost': self.lost,
+        }
+
+    @staticmethod
+    def remap(hands: np.ndarray, roi: Roi, frame_width: int, frame_height: int) -> np.ndarray:
+        """把相对裁剪区域归一化的关键点映射为相对整帧归一化的坐标"""
+        x, y, w, h = roi
+        hands[:, :, 0] = (hands[:, :, 0] * w + x) / frame_width
+        hands[:, :, 1] = (hands[:, :, 1] * h + y) / frame_height
+        # MediaPipe的z与图像宽度同尺度
+        hands[:, :, 2] *= w / frame_width
+        return hands
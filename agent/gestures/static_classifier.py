@@ -0,0 +1,93 @@
+"""
+查表式静态手势分类器
+把五根手指的伸直状态打包成5位编码(拇指为第0位)，在预先计算好的32项表中直接查出手势。
+表由 FingerConfig 定义生成，"不关心"(None)的手指在加载时展开为所有组合，
+因此分类是O(1)的，新增手势只需要修改配置
+"""
+
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from gestures.configurable_detector import FingerConfig, GestureConfig
+from gestures.landmarks import FINGER_NAMES
+
+NUM_CODES = 1 << len(FINGER_NAMES)
+FINGER_BITS = 1 << np.arange(len(FINGER_NAMES))
+
+
+def encode_finger_states(states: np.ndarray) -> np.ndarray:
+    """(n, 5) bool -> (n,) int 编码"""
+    return states.astype(np.int64) @ FINGER_BITS
+
+
+def encode_finger_dict(finger_states: Dict[str, bool]) -> int:
+    """{finger: bool} -> int 编码"""
+    code = 0
+    for bit, name in enumerate(FINGER_NAMES):
+        if finger_states.get(name, False):
+            code |= 1 << bit
+    return code
+
+
+def expand_finger_config(fingers: FingerConfig) -> List[int]:
+    """把含"不关心"手指的配置展开为所有匹配的编码"""
+    choices = []
+    for name in FINGER_NAMES:
+        state = getattr(fingers, name)
+        choices.append((False, True) if state is None else (bool(state),))
+    codes = []
+    for combo in product(*choices):
+        codes.append(sum(1 << bit for bit, extended in enumerate(combo) if extended))
+    return codes
+
+
+class StaticGestureTable:
+    """32项静态手势查找表；同一编码匹配多个手势时取置信度最高者，相同则先定义者优先"""
+
+    def __init__(self, gestures: Iterable[GestureConfig]):
+        self.gestures: List[Optional[str]] = [None] * NUM_CODES
+        self.confidences: List[float] = [0.0] * NUM_CODES
+
+        for config in gestures:
+            fingers = config.fingers
+            # 没有任何手指约束的手势（如OK_SIGN）需要基于关键点的专门检测，不进入表
+            if fingers is None or all(getattr(fingers, name) is None for name in FINGER_NAMES):
+                continue
+            for code in expand_finger_config(fingers):
+                if self.gestures[code] is None or config.confidence > self.confidences[code]:
+                    self.gestures[code] = config.code
+                    self.confidences[code] = config.confidence
+
+    def lookup(self, code: int) -> Tuple[Optional[str], float]:
+        gesture = self.gestures[code]
+        if gesture is None:
+            return None, 0.0
+        return gesture, self.confidences[code]
+
+    def lookup_states(self, finger_states: Dict[str, bool]) -> Tuple[Optional[str], float]:
+        return self.lookup(encode_finger_dict(finger_states))
+
+    def classify(self, states: np.ndarray) -> List[Tuple[Optional[str], float]]:
+        """对 (n, 5) 手指状态批量分类"""
+        return [self.lookup(int(code)) for code in encode_finger_states(states)]
+
+
+def _static(code: str, confidence: float, **fingers) -> GestureConfig:
+    return GestureConfig(code=code, name=code, type='static', confidence=confidence,
+                         fingers=FingerConfig(**fingers))
+
+
+# 检测器内置的静态手势，与原先 _is_* 判断链的顺序和结果一致
+DEFAULT_STATIC_GESTURES = [
+    _static('POINT_UP', 0.9, thumb=False, index=True, middle=False, ring=False, pinky=False),
+    _static('POINT_INDEX', 0.9, index=True, middle=False, ring=False, pinky=False),
+    _static('THUMBS_UP', 0.9, thumb=True, index=False, middle=False, ring=False, pinky=False),
+    _static('THUMBS_DOWN', 0.9, thumb=False, index=False, middle=False, ring=False, pinky=False),
+    _static('OPEN_PALM', 0.8, thumb=True, index=True, middle=True, ring=True, pinky=True),
+    _static('CLOSED_FIST', 0.9, thumb=False, index=False, middle=False, ring=False, pinky=False),
+    _static('VICTORY', 0.9, index=True, middle=True, ring=False, pinky=False),
+]
+
+DEFAULT_STATIC_TABLE = StaticGestureTable(DEFAULT_STATIC_GESTURES)
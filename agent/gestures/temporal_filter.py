@@ -0,0 +1,90 @@
+"""
+静态手势时间滤波
+每只手保留最近M次检测的静态手势，某个手势在窗口内得票达到N次才被确认并触发；
+已确认的手势在得票低于释放阈值前保持不变（滞回），单帧误识别不会打断或触发动作。
+保持同一手势时按hold_repeat间隔重复触发，松开后重新做出同一手势可立即再次触发。
+update只给出本帧可以触发的手势，调用方实际输出后（例如通过了全局冷却）再调用mark_fired记录，
+被冷却拦下的手势不计为已触发，冷却结束后仍保持该手势即可输出
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+
+@dataclass
+class _VoteState:
+    votes: deque
+    held: Optional[str] = None  # 当前确认的手势
+    held_fired: bool = False  # 当前确认的手势是否已经输出过
+    last_fired: float = field(default=float('-inf'))
+
+
+class GestureVoteFilter:
+    def __init__(self,
+                 window: int = 5,
+                 min_votes: int = 3,
+                 release_votes: Optional[int] = None,
+                 hold_repeat: float = 1.0):
+        self.window = max(1, window)
+        self.min_votes = min(max(1, min_votes), self.window)
+        # 默认比确认阈值低一票，形成滞回区间
+        self.release_votes = release_votes if release_votes is not None else max(1, self.min_votes - 1)
+        self.hold_repeat = hold_repeat  # 保持手势时重复触发的间隔(秒)，0表示只触发一次
+
+        self._states: Dict[int, _VoteState] = {}
+
+        # Statistics
+        self.fired = 0
+        self.suppressed = 0  # 原始识别出手势但未被确认触发的帧
+
+    def update(self, hand_id: int, gesture_code: Optional[str], timestamp: float) -> Optional[str]:
+        """加入一帧的识别结果（无手势为None），返回本帧可以触发的手势；实际输出后需调用mark_fired"""
+        state = self._states.get(hand_id)
+        if state is None:
+            state = self._states[hand_id] = _VoteState(votes=deque(maxlen=self.window))
+        state.votes.append(gesture_code)
+
+        if state.held is not None and state.votes.count(state.held) < self.release_votes:
+            state.held = None
+
+        if gesture_code is not None and gesture_code != state.held \
+                and state.votes.count(gesture_code) >= self.min_votes:
+            state.held = gesture_code
+            state.held_fired = False
+
+        fire = None
+        if gesture_code is not None and gesture_code == state.held:
+            if not state.held_fired:
+                fire = gesture_code
+            elif self.hold_repeat > 0 and timestamp - state.last_fired >= self.hold_repeat:
+                fire = gesture_code
+
+        if fire is None and gesture_code is not None:
+            self.suppressed += 1
+        return fire
+
+    def mark_fired(self, hand_id: int, timestamp: float):
+        """记录update给出的手势已经实际输出，从此按hold_repeat计算重复触发"""
+        state = self._states.get(hand_id)
+        if state is None:
+            return
+        state.held_fired = True
+        state.last_fired = timestamp
+        self.fired += 1
+
+    def retain(self, hand_ids: Iterable[int]):
+        """丢弃已不在画面中的手的投票状态"""
+        keep = set(hand_ids)
+        for hand_id in [hid for hid in self._states if hid not in keep]:
+            del self._states[hand_id]
+
+    def reset(self):
+        self._states.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'hands': len(self._states),
+            'fired': self.fired,
+            'suppressed': self.suppressed,
+        }
@@ -0,0 +1,60 @@
+"""
+手心轨迹环形缓冲
+固定容量的 (x, y, t) NumPy数组，写入新点时覆盖最旧的点，
+位移只需比较首尾两点，每帧分析都是O(1)，不为每个点创建对象
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+class TrajectoryBuffer:
+    def __init__(self, capacity: int = 20):
+        self.capacity = max(2, capacity)
+        self._points = np.zeros((self.capacity, 3), dtype=np.float64)  # (x, y, t)
+        self._head = 0  # 下一次写入的位置
+        self._count = 0
+        self._last = (0.0, 0.0, 0.0)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, x: float, y: float, timestamp: float):
+        """写入新点，缓冲已满时覆盖最旧的点"""
+        head = self._head
+        if self._count < self.capacity:
+            self._count += 1
+
+        # 标量逐个写入比整行赋值更快，最新点另存为Python浮点数，避免读回numpy标量
+        points = self._points
+        points[head, 0] = x
+        points[head, 1] = y
+        points[head, 2] = timestamp
+        self._last = (x, y, timestamp)
+        self._head = head + 1 if head + 1 < self.capacity else 0
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    @property
+    def first(self) -> np.ndarray:
+        return self._points[(self._head - self._count) % self.capacity]
+
+    @property
+    def last(self) -> np.ndarray:
+        return self._points[self._head - 1]
+
+    def displacement(self) -> Tuple[float, float]:
+        """最旧点到最新点的位移 (dx, dy)"""
+        if not self._count:
+            return 0.0, 0.0
+        oldest = (self._head - self._count) % self.capacity
+        last_x, last_y, _ = self._last
+        return last_x - self._points.item(oldest, 0), last_y - self._points.item(oldest, 1)
+
+    def points(self) -> np.ndarray:
+        """按时间顺序返回 (n, 3) 副本，用于调试或可视化"""
+        start = (self._head - self._count) % self.capacity
+        return np.roll(self._points, -start, axis=0)[:self._count].copy()
@@ -0,0 +1,179 @@
+"""
+基于模板的动态手势识别
+手心轨迹 (x, y, 深度) 按弧长重采样为固定点数并归一化（平移到质心、按最大跨度等比缩放），
+与预先同样处理过的模板库做DTW匹配。所有模板先用向量化的LB_Keogh下界和逐点欧氏距离上界筛选，
+只对下界不超过当前最好结果的模板批量计算带Sakoe-Chiba窗口的DTW，并在整行都超过上界时提前放弃。
+深度用手掌尺寸的对数近似（手靠近摄像头时变大），用于识别前推/后拉
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RESAMPLE_POINTS = 32
+DEPTH_WEIGHT = 0.5  # log(手掌尺寸) 变化折算为平面位移的比例
+
+
+def resample(path: np.ndarray, n_points: int = RESAMPLE_POINTS) -> Optional[np.ndarray]:
+    """按弧长把 (n, d) 路径重采样为 (n_points, d)，路径长度为0时返回None"""
+    segments = np.sqrt((np.diff(path, axis=0) ** 2).sum(axis=1))
+    cumulative = np.concatenate([[0.0], np.cumsum(segments)])
+    if cumulative[-1] <= 0:
+        return None
+    targets = np.linspace(0.0, cumulative[-1], n_points)
+    return np.stack([np.interp(targets, cumulative, path[:, d]) for d in range(path.shape[1])], axis=1)
+
+
+def normalize(path: np.ndarray) -> Tuple[np.ndarray, float]:
+    """平移到质心并按最大跨度等比缩放，返回 (归一化路径, 原始最大跨度)"""
+    centered = path - path.mean(axis=0)
+    extent = float((path.max(axis=0) - path.min(axis=0)).max())
+    if extent <= 0:
+        return centered, 0.0
+    return centered / extent, extent
+
+
+def trajectory_features(points: np.ndarray) -> np.ndarray:
+    """把 (n, 4) 的 (x, y, t, 手掌尺寸) 轨迹转换为 (n, 3) 的 (x, y, 深度)"""
+    depth = DEPTH_WEIGHT * np.log(np.maximum(points[:, 3], 1e-6))
+    return np.column_stack([points[:, 0], points[:, 1], depth])
+
+
+# 内置形状，均为图像坐标（x向右，y向下）下的 (n, 3) 路径
+
+def _circle(clockwise: bool, start: float, n: int = 64) -> np.ndarray:
+    angles = start + np.linspace(0, 2 * math.pi, n) * (1 if clockwise else -1)
+    return np.column_stack([np.cos(angles), np.sin(angles), np.zeros(n)])
+
+
+def _zigzag(teeth: int = 3, n: int = 64) -> np.ndarray:
+    x = np.linspace(0, 1, n)
+    y = np.abs(((x * teeth * 2) % 2) - 1) * 0.5
+    return np.column_stack([x, y, np.zeros(n)])
+
+
+def _line(dx: float, dy: float, dz: float, n: int = 16) -> np.ndarray:
+    steps = np.linspace(0, 1, n)[:, np.newaxis]
+    return steps * np.array([[dx, dy, dz]])
+
+
+def builtin_shapes() -> Dict[str, List[np.ndarray]]:
+    """形状名 -> 模板路径列表；画圈从不同起点开始、Z字按不同折数和方向各生成一个模板"""
+    starts = [i * math.pi / 4 for i in range(8)]
+    return {
+        'circle_clockwise': [_circle(True, s) for s in starts],
+        'circle_counterclockwise': [_circle(False, s) for s in starts],
+        'zigzag': [path for teeth in (2, 3, 4) for path in (_zigzag(teeth), _zigzag(teeth)[::-1])],
+        'push': [_line(0, 0, 1)],
+        'pull': [_line(0, 0, -1)],
+    }
+
+
+@dataclass
+class TrajectoryTemplate:
+    code: str
+    confidence: float
+    max_distance: float  # 平均每点DTW距离（归一化坐标）小于该值才匹配
+    path: np.ndarray  # (RESAMPLE_POINTS, 3) 已重采样、归一化
+
+
+class TrajectoryTemplateRecognizer:
+    def __init__(self, templates: Sequence[TrajectoryTemplate] = (),
+                 band: int = 4, min_extent: float = 0.08, min_points: int = 8):
+        self.band = band  # Sakoe-Chiba窗口半径（点数）
+        self.min_extent = min_extent  # 轨迹跨度小于该值（归一化坐标）视为静止，不做匹配
+        self.min_points = min_points
+        self.templates: List[TrajectoryTemplate] = []
+        self._paths = np.empty((0, RESAMPLE_POINTS, 3))
+        self._upper = self._lower = self._paths
+        self._max_distance = np.empty(0)
+        self.add_templates(templates)
+
+        # Statistics
+        self.matches = 0
+        self.dtw_evaluations = 0
+        self.pruned = 0
+
+    @staticmethod
+    def prepare(code: str, path: np.ndarray, confidence: float = 0.8,
+                max_distance: float = 0.2) -> Optional[TrajectoryTemplate]:
+        """把原始 (n, 2) 或 (n, 3) 路径处理为模板"""
+        path = np.asarray(path, dtype=np.float64)
+        if path.shape[1] == 2:
+            path = np.column_stack([path, np.zeros(len(path))])
+        resampled = resample(path)
+        if resampled is None:
+            return None
+        return TrajectoryTemplate(code, confidence, max_distance, normalize(resampled)[0])
+
+    def add_templates(self, templates: Iterable[TrajectoryTemplate]):
+        self.templates.extend(templates)
+        if not self.templates:
+            return
+        self._paths = np.stack([t.path for t in self.templates])
+        self._max_distance = np.array([t.max_distance for t in self.templates])
+        # LB_Keogh包络：每个点在窗口内各维度的最大/最小值
+        n = RESAMPLE_POINTS
+        windows = [self._paths[:, max(0, i - self.band):min(n, i + self.band + 1)] for i in range(n)]
+        self._upper = np.stack([w.max(axis=1) for w in windows], axis=1)
+        self._lower = np.stack([w.min(axis=1) for w in windows], axis=1)
+
+    def match(self, points: np.ndarray) -> Optional[Tuple[str, float, float]]:
+        """匹配 (n, 4) 的 (x, y, t, 手掌尺寸) 轨迹，返回 (手势码, 置信度, 距离)"""
+        if not self.templates or len(points) < self.min_points:
+            return None
+        resampled = resample(trajectory_features(points))
+        if resampled is None:
+            return None
+        candidate, extent = normalize(resampled)
+        if extent < self.min_extent:
+            return None
+
+        # 上界：逐点欧氏距离（对角线路径是一条合法的DTW路径）
+        euclidean = np.sqrt(((self._paths - candidate) ** 2).sum(axis=2)).mean(axis=1)
+        # 下界：候选点落在模板包络之外的距离
+        over = np.maximum(candidate - self._upper, 0) + np.maximum(self._lower - candidate, 0)
+        lower_bound = np.sqrt((over ** 2).sum(axis=2)).mean(axis=1)
+
+        best = float(np.minimum(euclidean, self._max_distance).min())
+        survivors = np.flatnonzero((lower_bound <= best) & (lower_bound < self._max_distance))
+        self.pruned += len(self.templates) - len(survivors)
+        if not len(survivors):
+            return None
+
+        distances = self._dtw(candidate, self._paths[survivors], best)
+        self.dtw_evaluations += len(survivors)
+        distances = np.minimum(distances, euclidean[survivors])
+        within = distances < self._max_distance[survivors]
+        if not within.any():
+            return None
+        pick = int(np.argmin(np.where(within, distances, np.inf)))
+        template = self.templates[survivors[pick]]
+        self.matches += 1
+        return template.code, template.confidence, float(distances[pick])
+
+    def _dtw(self, candidate: np.ndarray, paths: np.ndarray, abandon: float) -> np.ndarray:
+        """批量计算带窗口的DTW，返回平均每点距离；所有模板都超过abandon时提前放弃"""
+        n, count = RESAMPLE_POINTS, len(paths)
+        # cost[k, i, j]: 候选第i点与模板k第j点的距离
+        cost = np.sqrt(((candidate[np.newaxis, :, np.newaxis, :] - paths[:, np.newaxis, :, :]) ** 2).sum(axis=3))
+        # 累积距离按行滚动计算，第0列是虚拟起点，第j+1列对应模板第j点
+        previous = np.full((count, n + 1), np.inf)
+        previous[:, 0] = 0.0
+        for i in range(n):
+            lo, hi = max(0, i - self.band), min(n, i + self.band + 1)
+            row_cost = cost[:, i, lo:hi]
+            # 先取斜向和纵向前驱，再处理横向：D[j] = min_k<=j(base[k] + cost[k+1..j])，
+            # 用前缀和改写为 S[j] + 前缀最小值(base - S)，整行向量化
+            base = row_cost + np.minimum(previous[:, lo:hi], previous[:, lo + 1:hi + 1])
+            prefix = np.cumsum(row_cost, axis=1)
+            row = prefix + np.minimum.accumulate(base - prefix, axis=1)
+            current = np.full((count, n + 1), np.inf)
+            current[:, lo + 1:hi + 1] = row
+            previous = current
+            # 后续累积距离只增不减，整行最小值已超过上界的模板不可能更好
+            if (row.min(axis=1) / n > abandon).all():
+                return np.full(count, np.inf)
+        return previous[:, n] / n
@@ -5,12 +5,14 @@ import signal
 import threading
 import time
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 
-import requests
 import yaml
 
 from video_processor import VideoProcessor, VideoConfig
+from multi_source import MultiSourceProcessor, source_configs
+from audit_shipper import AuditShipper, create_session
+from config_stream import ConfigSubscriber
 from gestures.mediapipe_detector import GestureResult
 from actions.executor import get_supported_actions
 from logger_config import setup_component_logger
@@ -35,6 +37,12 @@ class AgentConfig:
         self.os_type: str = backend.get('os', 'windows').lower()
         self.source: str = agent.get('source', 'python-agent')
         self.poll_interval: int = int(agent.get('poll_interval', 60))
+        # 订阅后端配置推送(SSE)，不可用时回退到轮询
+        self.config_push: bool = bool(agent.get('config_push', True))
+        # 审计日志批量上报
+        self.audit_batch_size: int = int(agent.get('audit_batch_size', 50))
+        self.audit_flush_interval: float = float(agent.get('audit_flush_interval', 2.0))
+        self.audit_journal: Optional[str] = agent.get('audit_journal')
         # Video configuration
         self.video_config = VideoConfig(
             camera_id=video.get('camera_id', 0),
@@ -43,18 +51,61 @@ class AgentConfig:
             fps=video.get('fps', 30),
             show_preview=video.get('show_preview', True),
             flip_horizontal=video.get('flip_horizontal', True),
-            detection_interval=video.get('detection_interval', 0.1)
+            detection_interval=video.get('detection_interval', 0.1),
+            adaptive_detection=video.get('adaptive_detection', True),
+            idle_detection_interval=video.get('idle_detection_interval', 0.5),
+            idle_detection_scale=video.get('idle_detection_scale', 0.5),
+            idle_after=video.get('idle_after', 2.0),
+            roi_tracking=video.get('roi_tracking', True),
+            frame_buffers=video.get('frame_buffers', 4),
+            latest_frame_only=video.get('latest_frame_only', False),
+            detection_workers=video.get('detection_workers', 0),
+            gesture_vote_window=video.get('gesture_vote_window', 5),
+            gesture_min_votes=video.get('gesture_min_votes', 3),
+            gesture_hold_repeat=video.get('gesture_hold_repeat', 1.0),
+            gesture_cooldown=video.get('gesture_cooldown', 0.4),
+            landmark_smoothing=video.get('landmark_smoothing', True),
+            smoothing_min_cutoff=video.get('smoothing_min_cutoff', 1.0),
+            smoothing_beta=video.get('smoothing_beta', 5.0),
+            swipe_min_points=video.get('swipe_min_points', 6),
+            gesture_definitions=video.get('gesture_definitions'),
+            definition_static_gestures=video.get('definition_static_gestures', False),
+            replay_path=video.get('replay_path'),
+            replay_pacing=video.get('replay_pacing', 'recorded'),
+            replay_loop=video.get('replay_loop', False),
+            dry_run=video.get('dry_run', False),
+            latency_log_interval=video.get('latency_log_interval', 30.0),
+            action_queue_size=video.get('action_queue_size', 4),
+            action_max_age=video.get('action_max_age', 1.0),
+            action_workers=video.get('action_workers', 1)
         )
+        # 多摄像头：每项覆盖上面的公共视频配置（camera_id/replay_path/flip_horizontal等），为空时只用camera_id
+        self.video_sources: List[Dict[str, Any]] = list(video.get('sources') or [])
+        # 不同摄像头在该时间窗(秒)内上报的同一手势只执行一次
+        self.dedup_window: float = float(video.get('dedup_window', 0.5))
 
 
 class GestureAgent:
     def __init__(self, config: AgentConfig):
         self.config = config
         self.mapping: Dict[str, Dict] = {}
-        self.video_processor: Optional[VideoProcessor] = None
+        self.video_processor: Optional[Union[VideoProcessor, MultiSourceProcessor]] = None
         self.running = False
         self.should_stop = threading.Event()
         
+        # 复用keep-alive连接；审计日志在后台线程批量发送
+        self.session = create_session()
+        self.config_etag: Optional[str] = None
+        self.config_subscriber: Optional[ConfigSubscriber] = None
+        self.audit_shipper = AuditShipper(
+            config.base_url,
+            session=self.session,
+            batch_size=config.audit_batch_size,
+            flush_interval=config.audit_flush_interval,
+            journal_path=Path(config.audit_journal) if config.audit_journal else None,
+        )
+        self.audit_shipper.start()
+        
         # Setup signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -65,37 +116,81 @@ class GestureAgent:
         logger.info('Received signal %d, shutting down...', signum)
         self.stop()
     
-    def sync_config(self) -> None:
-        params = {
+    def _config_params(self) -> Dict[str, Any]:
+        return {
             'username': self.config.username,
             'application': self.config.application,
             'os': self.config.os_type,
         }
-        logger.info('Fetching config from %s', self.config.base_url)
+    
+    @staticmethod
+    def _mapping_entry(item: Dict[str, Any]) -> Dict[str, Any]:
+        action = item.get('action') or {}
+        return {
+            'type': action.get('type'),
+            'value': action.get('value'),
+            'os': action.get('osType'),
+            'description': action.get('description'),
+            'payload': action.get('payloadJson'),
+        }
+    
+    def sync_config(self) -> bool:
+        """同步配置，返回映射是否发生变化"""
+        params = self._config_params()
+        headers = {}
+        if self.config_etag:
+            # 条件请求：配置未变化时后端返回304
+            headers['If-None-Match'] = self.config_etag
+        logger.debug('Fetching config from %s', self.config.base_url)
         try:
-            resp = requests.get(f'{self.config.base_url}/api/config', params=params, timeout=10)
+            resp = self.session.get(f'{self.config.base_url}/api/config', params=params,
+                                    headers=headers, timeout=10)
+            if resp.status_code == 304:
+                logger.debug('Config not modified (%s)', self.config_etag)
+                return False
             resp.raise_for_status()
             data = resp.json()
-            mappings = data.get('mappings', [])
-            self.mapping = {}
-            for item in mappings:
-                action = item.get('action') or {}
-                self.mapping[item.get('code')] = {
-                    'type': action.get('type'),
-                    'value': action.get('value'),
-                    'os': action.get('osType'),
-                    'description': action.get('description'),
-                    'payload': action.get('payloadJson'),
-                }
-            logger.info('Loaded %d gesture mappings', len(self.mapping))
-            
-            # Update video processor mapping if it exists
-            if self.video_processor:
-                self.video_processor.update_mapping(self.mapping)
+            return self._apply_config(data, resp.headers.get('ETag'))
         except Exception as exc:
             logger.error('Failed to sync config: %s', exc)
             raise
     
+    def _apply_config(self, data: Dict[str, Any], etag: Optional[str] = None) -> bool:
+        new_mapping: Dict[str, Dict] = {}
+        for item in data.get('mappings', []):
+            new_mapping[item.get('code')] = self._mapping_entry(item)
+        self.config_etag = etag or self._version_etag(data.get('version'))
+
+        if new_mapping == self.mapping:
+            logger.debug('Config unchanged (%d gesture mappings)', len(new_mapping))
+            return False
+
+        # 整体替换引用，其他线程不会看到半构建的映射
+        self.mapping = new_mapping
+        logger.info('Loaded %d gesture mappings', len(self.mapping))
+        
+        # Update video processor mapping if it exists
+        if self.video_processor:
+            self.video_processor.update_mapping(self.mapping)
+        return True
+    
+    def _apply_config_diff(self, diff: Dict[str, Any]):
+        upserts = {item.get('code'): self._mapping_entry(item) for item in diff.get('upserts') or []}
+        removed = list(diff.get('removed') or [])
+        new_mapping = {code: action for code, action in self.mapping.items() if code not in removed}
+        new_mapping.update(upserts)
+        self.mapping = new_mapping
+        self.config_etag = self._version_etag(diff.get('version'))
+        logger.info('Config pushed: %d updated, %d removed', len(upserts), len(removed))
+        
+        if self.video_processor:
+            self.video_processor.apply_mapping_diff(upserts, removed)
+    
+    @staticmethod
+    def _version_etag(version: Optional[str]) -> Optional[str]:
+        # 与后端ETag格式一致，推送后的轮询兜底仍能命中304
+        return f'"{version}"' if version else None
+    
     def perform_action(self, gesture_code: str) -> bool:
         logger.info('🎯 检测到手势: %s', gesture_code)  # 显示所有检测到的手势
         action = self.mapping.get(gesture_code)
@@ -143,16 +238,9 @@ class GestureAgent:
             'message': message,
             'sourceAgent': self.config.source,
         }
-        try:
-            resp = requests.post(
-                f'{self.config.base_url}/api/audit/log',
-                json=payload,
-                timeout=10,
-            )
-            resp.raise_for_status()
-            logger.info('Log posted: %s', resp.json())
-        except Exception as exc:
-            logger.error('Failed to post log: %s', exc)
+        # 只入缓冲区，不在调用线程上做网络请求
+        self.audit_shipper.submit(payload)
+        logger.debug('Audit log queued for %s', gesture_code)
     
     def send_event(self, event_type: str, payload: Optional[dict] = None) -> None:
         body = {
@@ -162,12 +250,36 @@ class GestureAgent:
             'payload': json.dumps(payload or {}),
         }
         try:
-            resp = requests.post(f'{self.config.base_url}/api/event', json=body, timeout=10)
+            resp = self.session.post(f'{self.config.base_url}/api/event', json=body, timeout=10)
             resp.raise_for_status()
             logger.info('Event acknowledged: %s', resp.json())
         except Exception as exc:
             logger.error('Failed to send event: %s', exc)
     
+    def _create_video_processor(self) -> Union[VideoProcessor, MultiSourceProcessor]:
+        # 配置了多个视频源时由一个处理器统一管理，共用推理池和动作队列
+        sources = self.config.video_sources
+        if len(sources) > 1:
+            logger.info('[AGENT] Using %d video sources', len(sources))
+            return MultiSourceProcessor(self.config.video_config, sources, self.mapping,
+                                        dedup_window=self.config.dedup_window)
+        if sources:
+            name, video_config = next(iter(source_configs(self.config.video_config, sources).items()))
+            return VideoProcessor(video_config, self.mapping, source=name)
+        return VideoProcessor(self.config.video_config, self.mapping)
+    
+    def _wait(self, timeout: float) -> bool:
+        """等待timeout秒或直到收到停止信号；多视频源的预览窗口在等待期间由主线程刷新"""
+        if not isinstance(self.video_processor, MultiSourceProcessor):
+            return self.should_stop.wait(timeout)
+        deadline = time.monotonic() + timeout
+        while not self.should_stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.video_processor.pump_display(min(0.05, remaining))
+        return self.should_stop.is_set()
+    
     def start_realtime(self):
         logger.info('[AGENT] Starting real-time gesture detection...')
         self.running = True
@@ -181,7 +293,7 @@ class GestureAgent:
 
             # Initialize and start video processor
             logger.info('[AGENT] Initializing video processor...')
-            self.video_processor = VideoProcessor(self.config.video_config, self.mapping)
+            self.video_processor = self._create_video_processor()
 
             # Set callbacks
             logger.info('[AGENT] Setting up callbacks...')
@@ -197,7 +309,7 @@ class GestureAgent:
             
             # Keep the main thread alive
             while self.running and not self.should_stop.is_set():
-                time.sleep(0.5)
+                self._wait(0.5)
                 
         except KeyboardInterrupt:
             logger.info('User interrupted, stopping...')
@@ -206,6 +318,37 @@ class GestureAgent:
         finally:
             self.stop()
     
+    def start_replay(self) -> Dict[str, Any]:
+        logger.info('[AGENT] Starting offline replay of %s (pacing=%s)...',
+                    self.config.video_config.replay_path, self.config.video_config.replay_pacing)
+        self.running = True
+        stats: Dict[str, Any] = {}
+
+        try:
+            # 重放可在无后端的CI环境运行，配置同步失败时使用空映射
+            try:
+                self.sync_config()
+            except Exception as exc:
+                logger.warning('[AGENT] Config sync failed, replaying without mappings: %s', exc)
+
+            self.video_processor = self._create_video_processor()
+            self.video_processor.on_gesture_detected = self._on_gesture_detected
+            self.video_processor.start()
+
+            while self.running and not self.should_stop.is_set() and self.video_processor.running:
+                self._wait(0.1)
+
+            self.video_processor.stop()
+            stats = self.video_processor.get_stats()
+            logger.info('[AGENT] Replay finished: frames=%d, gestures=%d, stage fps=%s',
+                        stats['frame_count'], stats['gesture_count'], stats['stage_fps'])
+            logger.info('[AGENT] Replay latency p50/p95/p99: %s', self.video_processor.latency.format_line())
+        except KeyboardInterrupt:
+            logger.info('User interrupted, stopping replay...')
+        finally:
+            self.stop()
+        return stats
+    
     def start_daemon(self):
         logger.info('Starting daemon mode...')
         self.running = True
@@ -215,20 +358,34 @@ class GestureAgent:
             
             # Start video processor if gestures are mapped
             if self.mapping:
-                self.video_processor = VideoProcessor(self.config.video_config, self.mapping)
+                self.video_processor = self._create_video_processor()
                 self.video_processor.on_gesture_detected = self._on_gesture_detected
                 self.video_processor.on_action_executed = self._on_action_executed
                 self.video_processor.start()
             
-            # Config polling loop
+            if self.config.config_push:
+                self.config_subscriber = ConfigSubscriber(
+                    self.config.base_url,
+                    self._config_params(),
+                    on_snapshot=self._apply_config,
+                    on_diff=self._apply_config_diff,
+                )
+                self.config_subscriber.start()
+            
+            # Config polling loop (推送连接正常时跳过轮询)
             while self.running and not self.should_stop.is_set():
                 try:
-                    self.sync_config()
-                    logger.info('Daemon running, checked config at %s', time.strftime('%H:%M:%S'))
-                    self.should_stop.wait(self.config.poll_interval)
+                    if self.config_subscriber and self.config_subscriber.connected.is_set():
+                        logger.debug('Config push active, skipping poll')
+                        self._wait(self.config.poll_interval)
+                        continue
+                    changed = self.sync_config()
+                    logger.info('Daemon running, checked config at %s (%s)', time.strftime('%H:%M:%S'),
+                                'updated' if changed else 'unchanged')
+                    self._wait(self.config.poll_interval)
                 except Exception as exc:
                     logger.error('Error in daemon loop: %s', exc)
-                    self.should_stop.wait(5)  # Wait before retry
+                    self._wait(5)  # Wait before retry
         except KeyboardInterrupt:
             logger.info('User interrupted, stopping daemon...')
         finally:
@@ -278,6 +435,8 @@ class GestureAgent:
         )
     
     def stop(self):
+        # 无论处于哪种模式都要把剩余审计日志发出或写入journal
+        self.audit_shipper.close()
         if not self.running:
             return
         
@@ -285,6 +444,10 @@ class GestureAgent:
         self.running = False
         self.should_stop.set()
         
+        if self.config_subscriber:
+            self.config_subscriber.stop()
+            self.config_subscriber = None
+        
         if self.video_processor:
             self.video_processor.stop()
             self.video_processor = None
@@ -340,10 +503,14 @@ def main():
     parser.add_argument('--gesture', help='Single gesture code to execute once')
     parser.add_argument('--event', help='Send an eventType to /api/event')
     parser.add_argument('--actions', action='store_true', help='List supported action types')
+    parser.add_argument('--replay', help='Replay a recorded video file or frame directory instead of the camera')
+    parser.add_argument('--replay-pacing', choices=['recorded', 'max'], default='recorded',
+                        help='Replay at recorded frame rate or as fast as possible')
+    parser.add_argument('--replay-loop', action='store_true', help='Loop the replay source')
     args = parser.parse_args()
     
     # Default to realtime if no mode specified
-    if not any([args.sync, args.watch, args.realtime, args.daemon, args.gesture, args.event, args.actions]):
+    if not any([args.sync, args.watch, args.realtime, args.daemon, args.gesture, args.event, args.actions, args.replay]):
         args.realtime = True
     
     cfg = load_config(Path(args.config))
@@ -354,6 +521,18 @@ def main():
             agent.list_supported_actions()
             return
 
+        if args.replay:
+            # 离线重放：无预览窗口，不执行真实动作
+            cfg.video_config.replay_path = args.replay
+            cfg.video_config.replay_pacing = args.replay_pacing
+            cfg.video_config.replay_loop = args.replay_loop
+            cfg.video_config.show_preview = False
+            cfg.video_config.dry_run = True
+            # 命令行重放只针对单个录制文件
+            cfg.video_sources = []
+            agent.start_replay()
+            return
+
         # Sync config for all modes except pure actions list
             try:
                 agent.sync_config()
@@ -0,0 +1,83 @@
+"""
+延迟统计工具
+按阶段记录耗时样本，计算p50/p95/p99，用于定位从采集到动作执行的延迟来源
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """单个阶段的耗时样本窗口（秒），输出毫秒百分位"""
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        if seconds < 0:
+            return
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @staticmethod
+    def _pick(ordered, pct: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[int(round(pct / 100.0 * (len(ordered) - 1)))]
+
+    def percentile(self, pct: float) -> float:
+        return self._pick(sorted(self.samples), pct)
+
+    def summary(self) -> Dict[str, float]:
+        result = {'count': self.count}
+        ordered = sorted(self.samples)
+        for pct in PERCENTILES:
+            result[f'p{pct}_ms'] = round(self._pick(ordered, pct) * 1000, 2)
+        result['mean_ms'] = round(self.total / self.count * 1000, 2) if self.count else 0.0
+        result['max_ms'] = round(self.max * 1000, 2)
+        return result
+
+
+class LatencyTracker:
+    """多阶段延迟统计，线程安全"""
+
+    def __init__(self, stages: Iterable[str], window: int = 1000):
+        self._lock = threading.Lock()
+        self.window = window
+        self.histograms: Dict[str, LatencyHistogram] = {stage: LatencyHistogram(window) for stage in stages}
+
+    def record(self, stage: str, seconds: Optional[float]):
+        if seconds is None:
+            return
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram(self.window)
+            histogram.record(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def format_line(self) -> str:
+        """生成单行日志: stage=p50/p95/p99ms"""
+        parts = []
+        for stage, data in self.summary().items():
+            if not data['count']:
+                continue
+            parts.append(f"{stage}={data['p50_ms']:.1f}/{data['p95_ms']:.1f}/{data['p99_ms']:.1f}ms")
+        return ' '.join(parts) if parts else 'no samples'
+
+    def reset(self):
+        with self._lock:
+            for stage in list(self.histograms):
+                self.histograms[stage] = LatencyHistogram(self.window)
@@ -0,0 +1,175 @@
+"""
+多视频源处理
+一个Agent同时运行多个摄像头（或重放文件）：每个视频源有自己的采集/处理线程和检测器（独立的轨迹与冷却状态），
+共用MediaPipe推理进程池和动作调度器，不同视频源的手势经GestureMerger合并去重后再执行动作。
+OpenCV HighGUI不是线程安全的，各视频源的预览画面由调用方在主线程通过pump_display统一显示
+"""
+
+import dataclasses
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+
+from actions.dispatcher import ActionDispatcher
+from gesture_merger import GestureMerger
+from gestures.detector_pool import DetectorPool
+from gestures.mediapipe_detector import GestureResult
+from logger_config import setup_component_logger
+from metrics import LatencyTracker
+from video_processor import LATENCY_STAGES, VideoConfig, VideoProcessor
+
+logger = setup_component_logger("video")
+
+VIDEO_FIELDS = {f.name for f in dataclasses.fields(VideoConfig)}
+
+
+def source_configs(base: VideoConfig, sources: List[Dict[str, Any]]) -> Dict[str, VideoConfig]:
+    """把video.sources中每一项覆盖到公共视频配置上，返回 名称 -> VideoConfig"""
+    configs: Dict[str, VideoConfig] = {}
+    for i, source in enumerate(sources):
+        overrides = {key: value for key, value in source.items() if key in VIDEO_FIELDS}
+        unknown = set(source) - VIDEO_FIELDS - {'name'}
+        if unknown:
+            logger.warning('Ignoring unknown keys in video source #%d: %s', i, sorted(unknown))
+        name = str(source.get('name') or (f'replay{i}' if overrides.get('replay_path')
+                                          else f"camera{overrides.get('camera_id', i)}"))
+        if name in configs:
+            name = f'{name}-{i}'
+        configs[name] = dataclasses.replace(base, **overrides)
+    return configs
+
+
+class MultiSourceProcessor:
+    def __init__(self, config: VideoConfig, sources: List[Dict[str, Any]],
+                 gesture_mapping: Dict[str, Dict], dedup_window: float = 0.5):
+        self.config = config
+        self.gesture_mapping = gesture_mapping
+
+        configs = source_configs(config, sources)
+
+        # 共用组件：推理池按公共配置的detection_workers创建，动作在同一个调度器中排队
+        self.detector_pool: Optional[DetectorPool] = None
+        if config.detection_workers > 0:
+            self.detector_pool = DetectorPool(
+                workers=config.detection_workers,
+                detector_kwargs={'roi_tracking': config.roi_tracking},
+                # 共享内存槽按各视频源中最大的采集分辨率预分配
+                frame_bytes=max(c.width * c.height * 3 for c in configs.values()) if configs else 0,
+            )
+        self.action_dispatcher = ActionDispatcher(
+            max_queue=config.action_queue_size,
+            max_age=config.action_max_age,
+            workers=config.action_workers,
+        )
+        self.gesture_merger = GestureMerger(dedup_window)
+        self.latency = LatencyTracker(LATENCY_STAGES)  # 所有视频源合并统计
+
+        self.processors: Dict[str, VideoProcessor] = {
+            name: VideoProcessor(source_config, gesture_mapping, source=name,
+                                 detector_pool=self.detector_pool,
+                                 action_dispatcher=self.action_dispatcher,
+                                 gesture_merger=self.gesture_merger,
+                                 latency=self.latency,
+                                 external_display=True)
+            for name, source_config in configs.items()
+        }
+        self.started = False
+
+        # Callbacks
+        self.on_gesture_detected: Optional[Callable[[GestureResult], None]] = None
+        self.on_action_executed: Optional[Callable[[str, bool, str], None]] = None
+
+    @property
+    def running(self) -> bool:
+        return any(processor.running for processor in self.processors.values())
+
+    def start(self):
+        if self.started:
+            logger.warning('Multi-source processor already running')
+            return
+        self.started = True
+        if self.detector_pool:
+            self.detector_pool.start()
+        self.action_dispatcher.start()
+        for processor in self.processors.values():
+            processor.on_gesture_detected = self.on_gesture_detected
+            processor.on_action_executed = self.on_action_executed
+            processor.start()
+        failed = [name for name, processor in self.processors.items() if processor.started_at is None]
+        if failed:
+            logger.error('Video sources failed to start: %s', failed)
+        logger.info('Multi-source processor started %d/%d source(s): %s',
+                    len(self.processors) - len(failed), len(self.processors), list(self.processors))
+
+    def stop(self):
+        if not self.started:
+            return
+        self.started = False
+        for processor in self.processors.values():
+            processor.stop()
+        if any(processor.config.show_preview for processor in self.processors.values()):
+            cv2.destroyAllWindows()
+        self.action_dispatcher.stop()
+        if self.detector_pool:
+            self.detector_pool.close()
+        logger.info('Multi-source processor stopped, merged gestures: %s', self.gesture_merger.get_stats())
+
+    def pump_display(self, timeout: float = 0.05):
+        """在主线程显示各视频源的最新画面并处理按键，没有预览时只等待timeout秒"""
+        previews = [p for p in self.processors.values() if p.running and p.config.show_preview]
+        if not previews:
+            time.sleep(timeout)
+            return
+        for processor in previews:
+            try:
+                frame = processor.render_preview(timeout=0)
+                if frame is not None:
+                    cv2.imshow(processor.window_title(), frame)
+            except Exception as exc:
+                logger.error('[%s] Error displaying results: %s', processor.source, exc)
+        # waitKey同时刷新窗口事件并控制刷新节奏；按键作用于所有视频源
+        key = cv2.waitKey(max(1, int(timeout * 1000))) & 0xFF
+        for processor in previews:
+            processor.handle_key(key)
+
+    def pause(self):
+        for processor in self.processors.values():
+            processor.pause()
+
+    def resume(self):
+        for processor in self.processors.values():
+            processor.resume()
+
+    def update_mapping(self, new_mapping: Dict[str, Dict]):
+        self.gesture_mapping = new_mapping
+        for processor in self.processors.values():
+            processor.update_mapping(new_mapping)
+
+    def apply_mapping_diff(self, upserts: Dict[str, Dict], removed: List[str]):
+        # 各视频源共用同一个映射字典，重复应用是幂等的
+        for processor in self.processors.values():
+            processor.apply_mapping_diff(upserts, removed)
+
+    def get_stage_fps(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for processor in self.processors.values():
+            for stage, fps in processor.get_stage_fps().items():
+                totals[stage] = round(totals.get(stage, 0.0) + fps, 2)
+        return totals
+
+    def get_stats(self) -> Dict[str, Any]:
+        sources = {name: processor.get_stats() for name, processor in self.processors.items()}
+        return {
+            'frame_count': sum(stats['frame_count'] for stats in sources.values()),
+            'gesture_count': sum(stats['gesture_count'] for stats in sources.values()),
+            'duplicate_count': sum(stats['duplicate_count'] for stats in sources.values()),
+            'running': self.running,
+            'mapping_count': len(self.gesture_mapping),
+            'stage_fps': self.get_stage_fps(),
+            'latency': self.latency.summary(),
+            'actions': self.action_dispatcher.get_stats(),
+            'detector_pool': self.detector_pool.get_stats() if self.detector_pool else None,
+            'merger': self.gesture_merger.get_stats(),
+            'sources': sources,
+        }
@@ -0,0 +1,134 @@
+"""
+离线重放视频源
+用录制好的视频文件或帧目录替代摄像头，接口与cv2.VideoCapture保持一致，
+并为每一帧提供确定性的时间戳，便于在无摄像头的CI机器上做回归和吞吐测试
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logger_config import COMPONENT_LOGGERS
+
+# 复用VideoProcessor的日志，避免重复创建日志文件
+logger = logging.getLogger(COMPONENT_LOGGERS["video"])
+
+# 固定的时间起点，保证重放时间戳可复现，且大于各冷却计时器的初始值0
+REPLAY_EPOCH = 1_000_000.0
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+PACING_RECORDED = 'recorded'  # 按录制时的帧间隔播放
+PACING_MAX = 'max'            # 不等待，尽可能快地播放
+
+
+class ReplaySource:
+    """录制视频/帧目录重放源，兼容VideoCapture的 isOpened/read/set/get/release"""
+
+    def __init__(self, path: str, fps: float = 30.0, pacing: str = PACING_RECORDED, loop: bool = False):
+        if pacing not in (PACING_RECORDED, PACING_MAX):
+            raise ValueError(f'Unsupported replay pacing: {pacing}')
+
+        self.path = Path(path)
+        self.fps = float(fps)
+        self.pacing = pacing
+        self.loop = loop
+
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._frame_files: List[Path] = []
+        self._index = 0
+        self._wall_start: Optional[float] = None
+        self._media_offset = 0.0
+
+        # 最近一次read()返回帧的时间戳
+        self.last_timestamp = REPLAY_EPOCH
+
+        if self.path.is_dir():
+            self._frame_files = sorted(p for p in self.path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+            logger.info('Replay source: %d frames from directory %s', len(self._frame_files), self.path)
+        else:
+            self._cap = cv2.VideoCapture(str(self.path))
+            recorded_fps = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0
+            if recorded_fps and recorded_fps > 0:
+                self.fps = float(recorded_fps)
+            logger.info('Replay source: video %s @ %.1ffps', self.path, self.fps)
+
+    def isOpened(self) -> bool:
+        if self._cap is not None:
+            return self._cap.isOpened()
+        return bool(self._frame_files)
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame, media_time = self._read_next(image)
+        if not ret and self.loop and self._index > 0:
+            self._rewind()
+            ret, frame, media_time = self._read_next(image)
+        if not ret:
+            return False, None
+
+        media_time += self._media_offset
+        self.last_timestamp = REPLAY_EPOCH + media_time
+        self._pace(media_time)
+        return True, frame
+
+    def set(self, prop_id: int, value: float) -> bool:
+        # 录制源的分辨率和帧率是固定的，忽略摄像头属性设置
+        return False
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._index)
+        if self._cap is not None:
+            return self._cap.get(prop_id)
+        return 0.0
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def _read_next(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray], float]:
+        if self._cap is not None:
+            ret, frame = self._cap.read(image)
+            if not ret:
+                return False, None, 0.0
+            media_time = self._index / self.fps
+            self._index += 1
+            return True, frame, media_time
+
+        while self._index < len(self._frame_files):
+            frame_file = self._frame_files[self._index]
+            media_time = self._index / self.fps
+            self._index += 1
+            frame = cv2.imread(str(frame_file))
+            if frame is not None:
+                # 与VideoCapture.read(image)一致，尽量写入调用方提供的缓冲
+                if image is not None and image.shape == frame.shape:
+                    np.copyto(image, frame)
+                    frame = image
+                return True, frame, media_time
+            logger.warning('Skipping unreadable replay frame: %s', frame_file)
+        return False, None, 0.0
+
+    def _rewind(self):
+        self._media_offset += self._index / self.fps
+        self._index = 0
+        if self._cap is not None:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _pace(self, media_time: float):
+        if self.pacing != PACING_RECORDED:
+            return
+        now = time.perf_counter()
+        if self._wall_start is None:
+            self._wall_start = now - media_time
+            return
+        delay = self._wall_start + media_time - now
+        if delay > 0:
+            time.sleep(delay)
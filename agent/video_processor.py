@@ -1,19 +1,37 @@
 ﻿import cv2
 import threading
 import time
-from typing import Optional, Callable, Dict, Any
-from queue import Queue, Empty
+from pathlib import Path
+from typing import Optional, Callable, Dict, Any, List
 import numpy as np
 from dataclasses import dataclass
 
 from gestures.mediapipe_detector import MediaPipeGestureDetector, GestureResult
+from gestures.detector_pool import DetectorPool
+from gestures.temporal_filter import GestureVoteFilter
+from gestures.landmark_filter import LandmarkFilter
+from gestures.trajectory_templates import TrajectoryTemplateRecognizer
+from gestures.static_classifier import StaticGestureTable
 from actions.executor import execute_action
+from actions.dispatcher import ActionDispatcher
 from logger_config import setup_component_logger
+from replay_source import ReplaySource, PACING_RECORDED
+from metrics import LatencyTracker
+from detection_scheduler import DetectionScheduler
+from frame_ring import FrameRing, FrameSlot
+from gesture_merger import GestureMerger
 
 # 设置VideoProcessor的日志
 logger = setup_component_logger("video")
 
 
+# 延迟统计阶段
+# queue_wait: 采集到出队; inference: 颜色转换+MediaPipe推理; classify: 手势分类
+# dispatch: 分类完成到开始执行动作; action: execute_action耗时; end_to_end: 采集到动作返回
+# handle: _handle_gesture阻塞处理线程的时长（动作已移至工作线程，应接近0）
+LATENCY_STAGES = ('queue_wait', 'inference', 'classify', 'dispatch', 'action', 'end_to_end', 'handle')
+
+
 @dataclass
 class VideoConfig:
     camera_id: int = 0
@@ -23,32 +41,98 @@ class VideoConfig:
     show_preview: bool = True
     flip_horizontal: bool = True
     detection_interval: float = 0.1  # seconds between gesture detections
+    adaptive_detection: bool = True  # 无手时降为低频低分辨率存在检测
+    idle_detection_interval: float = 0.5  # 空闲模式存在检测间隔(秒)
+    idle_detection_scale: float = 0.5  # 空闲模式检测帧的缩放比例
+    idle_after: float = 2.0  # 连续多久(秒)看不到手后进入空闲模式
+    roi_tracking: bool = True  # 只对上一帧手部周围的区域推理，丢失时回退整帧
+    frame_buffers: int = 4  # 采集/处理/显示线程共享的预分配帧缓冲数量
+    latest_frame_only: bool = False  # 总是处理最新帧，丢弃积压的旧帧（重放时无效）
+    detection_workers: int = 0  # >0 时在独立进程中运行MediaPipe推理（每个视频源固定一个进程），0为在处理线程中推理
+    gesture_vote_window: int = 5  # 静态手势投票窗口（最近几次检测）
+    gesture_min_votes: int = 3  # 窗口内得票达到该数才触发，<=1 关闭投票滤波
+    gesture_hold_repeat: float = 1.0  # 保持同一手势时重复触发的间隔(秒)，0为只触发一次
+    gesture_cooldown: float = 0.4  # 任意两次手势触发之间的最短间隔(秒)
+    landmark_smoothing: bool = True  # 识别前对关键点做One Euro平滑
+    smoothing_min_cutoff: float = 1.0  # 静止时的截止频率(Hz)，越小越平滑
+    smoothing_beta: float = 5.0  # 截止频率随速度升高的系数，越大快速移动时延迟越小
+    swipe_min_points: int = 6  # 识别挥动所需的最少轨迹点数（平滑后可以少于原来的10个）
+    gesture_definitions: Optional[str] = None  # 手势定义YAML（相对agent目录），其中的轨迹模板手势参与识别
+    definition_static_gestures: bool = False  # 用定义文件中的静态手势替换内置查找表（默认使用内置表）
+    replay_path: Optional[str] = None  # 录制视频文件或帧目录，设置后替代摄像头
+    replay_pacing: str = PACING_RECORDED  # 'recorded' 按录制帧率, 'max' 全速
+    replay_loop: bool = False
+    dry_run: bool = False  # 只匹配映射不执行动作（用于重放/基准测试）
+    latency_log_interval: float = 30.0  # 周期性输出延迟统计的间隔(秒)，0表示关闭
+    action_queue_size: int = 4  # 待执行动作队列上限，满时丢弃最旧的动作
+    action_max_age: float = 1.0  # 动作排队超过该时长(秒)视为过期并丢弃，0表示不过期
+    action_workers: int = 1  # 动作工作线程数（pyautogui按顺序执行，通常保持1）
 
 
 class VideoProcessor:
-    def __init__(self, config: VideoConfig, gesture_mapping: Dict[str, Dict]):
+    def __init__(self, config: VideoConfig, gesture_mapping: Dict[str, Dict],
+                 source: str = 'camera',
+                 detector_pool: Optional[DetectorPool] = None,
+                 action_dispatcher: Optional[ActionDispatcher] = None,
+                 gesture_merger: Optional[GestureMerger] = None,
+                 latency: Optional[LatencyTracker] = None,
+                 external_display: bool = False):
         self.config = config
         self.gesture_mapping = gesture_mapping
+        self.source = source  # 视频源名称，多摄像头时用于区分日志和合并手势
         self.running = False
         self.paused = False
         
         # Initialize components
+        # 推理池、动作调度器可由多个视频源共用，由创建方负责启动和关闭
         self.detector = None
+        self.detector_pool: Optional[DetectorPool] = detector_pool
+        self._owns_pool = detector_pool is None
+        self._pool_client = 0
+        self._pooled_gestures: list = []  # 进程池模式下最近一次完成的检测结果（用于显示）
         self.cap = None
+        self._owns_dispatcher = action_dispatcher is None
+        self.action_dispatcher = action_dispatcher or ActionDispatcher(
+            max_queue=config.action_queue_size,
+            max_age=config.action_max_age,
+            workers=config.action_workers,
+        )
+        self.gesture_merger = gesture_merger
+        # HighGUI不是线程安全的：多个视频源时不启动各自的显示线程，由创建方在主线程调用render_preview统一显示
+        self.external_display = external_display
         
         # Threading
         self.capture_thread = None
         self.processing_thread = None
         self.display_thread = None
         
-        # Queues for thread communication
-        self.frame_queue = Queue(maxsize=2)
-        self.result_queue = Queue(maxsize=10)
+        # 线程间通过预分配的帧缓冲交换图像，避免每帧分配新数组
+        self.frame_ring = self._create_frame_ring()
+        self._raw_frame: Optional[np.ndarray] = None  # 翻转前的采集缓冲
+        self._display_frame: Optional[np.ndarray] = None  # 显示线程绘制用的缓冲
         
         # Statistics
         self.frame_count = 0
         self.gesture_count = 0
         self.last_detection_time = 0
+        self.stage_counts = {'capture': 0, 'process': 0, 'presence': 0, 'detect': 0, 'display': 0}
+        self.duplicate_count = 0  # 被其他视频源抢先上报而丢弃的手势
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.source_exhausted = False
+        
+        # 检测调度: 有手时全速检测，无手时低频低分辨率检测
+        self.scheduler = DetectionScheduler(
+            active_interval=config.detection_interval,
+            idle_interval=config.idle_detection_interval,
+            idle_after=config.idle_after,
+            idle_scale=config.idle_detection_scale,
+            enabled=config.adaptive_detection,
+        )
+        
+        # 延迟统计: 采集->出队->推理->分类->动作执行
+        self.latency = latency or LatencyTracker(LATENCY_STAGES)
+        self.last_latency_log = 0.0
         
         # Callbacks
         self.on_gesture_detected: Optional[Callable[[GestureResult], None]] = None
@@ -56,21 +140,48 @@ class VideoProcessor:
         
     def initialize(self) -> bool:
         try:
-            # Initialize camera
-            self.cap = cv2.VideoCapture(self.config.camera_id)
-            if not self.cap.isOpened():
-                logger.error('Failed to open camera %d', self.config.camera_id)
-                return False
-            
-            # Set camera properties
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.height)
-            self.cap.set(cv2.CAP_PROP_FPS, self.config.fps)
+            if self.config.replay_path:
+                # 离线重放录制视频，时间戳由重放源提供
+                self.cap = ReplaySource(self.config.replay_path, fps=self.config.fps,
+                                        pacing=self.config.replay_pacing, loop=self.config.replay_loop)
+                if not self.cap.isOpened():
+                    logger.error('[%s] Failed to open replay source %s', self.source, self.config.replay_path)
+                    return False
+            else:
+                # Initialize camera
+                self.cap = cv2.VideoCapture(self.config.camera_id)
+                if not self.cap.isOpened():
+                    logger.error('[%s] Failed to open camera %d', self.source, self.config.camera_id)
+                    return False
+                
+                # Set camera properties
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.height)
+                self.cap.set(cv2.CAP_PROP_FPS, self.config.fps)
             
             # Initialize gesture detector (现在支持动态手势)
-            self.detector = MediaPipeGestureDetector()
+            definitions = self._load_gesture_definitions()
+            self.detector = MediaPipeGestureDetector(roi_tracking=self.config.roi_tracking,
+                                                     gesture_filter=self._create_gesture_filter(),
+                                                     gesture_cooldown=self.config.gesture_cooldown,
+                                                     landmark_filter=self._create_landmark_filter(),
+                                                     min_swipe_points=self.config.swipe_min_points,
+                                                     static_table=self._static_table(definitions),
+                                                     trajectory_recognizer=self._trajectory_recognizer(definitions))
+            if self._owns_pool and self.config.detection_workers > 0:
+                # 推理在工作进程中完成，本进程的检测器只负责按帧顺序分类和轨迹分析
+                self.detector_pool = DetectorPool(
+                    workers=self.config.detection_workers,
+                    detector_kwargs={'roi_tracking': self.config.roi_tracking},
+                    # 按采集分辨率预分配共享内存；实际帧更大时推理池会自动扩容
+                    frame_bytes=self.config.width * self.config.height * 3,
+                )
+                self.detector_pool.start()
+            elif self.detector_pool:
+                self._pool_client = self.detector_pool.register(self.source)
             
-            logger.info('Video processor initialized: %dx%d @ %dfps', self.config.width, self.config.height, self.config.fps)
+            logger.info('[%s] Video processor initialized: %dx%d @ %dfps',
+                        self.source, self.config.width, self.config.height, self.config.fps)
             return True
         except Exception as exc:
             logger.error('Failed to initialize video processor: %s', exc)
@@ -84,25 +195,34 @@ class VideoProcessor:
         if not self.initialize():
             return
         
+        self.frame_ring = self._create_frame_ring()
         self.running = True
         self.paused = False
+        self.source_exhausted = False
+        self.started_at = time.perf_counter()
+        self.stopped_at = None
+        self.last_latency_log = self.started_at
         
         # Start threads
-        self.capture_thread = threading.Thread(target=self._capture_frames, name='CaptureThread')
-        self.processing_thread = threading.Thread(target=self._process_frames, name='ProcessingThread')
-        if self.config.show_preview:
-            self.display_thread = threading.Thread(target=self._display_results, name='DisplayThread')
+        self.capture_thread = threading.Thread(target=self._capture_frames, name=f'CaptureThread-{self.source}')
+        self.processing_thread = threading.Thread(target=self._process_frames,
+                                                  name=f'ProcessingThread-{self.source}')
+        if self.config.show_preview and not self.external_display:
+            self.display_thread = threading.Thread(target=self._display_results, name=f'DisplayThread-{self.source}')
         
+        if self._owns_dispatcher:
+            self.action_dispatcher.start()
         self.capture_thread.start()
         self.processing_thread.start()
         if self.display_thread:
             self.display_thread.start()
         
-        logger.info('Video processor started')
+        logger.info('[%s] Video processor started', self.source)
     
     def stop(self):
-        logger.info('Stopping video processor...')
+        logger.info('[%s] Stopping video processor...', self.source)
         self.running = False
+        self.frame_ring.close()
         
         # Wait for threads to finish
         if self.capture_thread and self.capture_thread.is_alive():
@@ -111,15 +231,23 @@ class VideoProcessor:
             self.processing_thread.join(timeout=2)
         if self.display_thread and self.display_thread.is_alive():
             self.display_thread.join(timeout=2)
+        if self.stopped_at is None:
+            self.stopped_at = time.perf_counter()
+        if self._owns_dispatcher:
+            self.action_dispatcher.stop()
+        if self.detector_pool and self._owns_pool:
+            self.detector_pool.close()
         
         # Cleanup
         if self.cap:
             self.cap.release()
         if self.detector:
             self.detector.close()
-        cv2.destroyAllWindows()
+        if self.config.show_preview and not self.external_display:
+            cv2.destroyAllWindows()
         
-        logger.info('Video processor stopped')
+        logger.info('[%s] Video processor stopped, stage fps: %s, unprocessed frames: %d',
+                    self.source, self.get_stage_fps(), self.frame_ring.dropped())
     
     def pause(self):
         self.paused = True
@@ -129,119 +257,269 @@ class VideoProcessor:
         self.paused = False
         logger.info('Video processor resumed')
     
+    def _create_gesture_filter(self) -> Optional[GestureVoteFilter]:
+        if self.config.gesture_min_votes <= 1:
+            return None
+        return GestureVoteFilter(window=self.config.gesture_vote_window,
+                                 min_votes=self.config.gesture_min_votes,
+                                 hold_repeat=self.config.gesture_hold_repeat)
+    
+    def _create_landmark_filter(self) -> Optional[LandmarkFilter]:
+        if not self.config.landmark_smoothing:
+            return None
+        return LandmarkFilter(min_cutoff=self.config.smoothing_min_cutoff, beta=self.config.smoothing_beta)
+    
+    def _load_gesture_definitions(self):
+        if not self.config.gesture_definitions:
+            return None
+        # 延迟导入，只有配置了手势定义文件时才需要
+        from gestures.configurable_detector import ConfigurableGestureDetector
+        path = Path(self.config.gesture_definitions)
+        if not path.is_absolute():
+            path = Path(__file__).parent / path
+        return ConfigurableGestureDetector(str(path))
+    
+    def _static_table(self, definitions) -> Optional[StaticGestureTable]:
+        # 默认使用内置查找表；显式开启时才用定义文件中的静态手势，
+        # 定义文件没有静态手势（或加载失败）时仍保留内置表，不让空表屏蔽所有静态手势
+        if not self.config.definition_static_gestures or definitions is None or not definitions.static_gestures:
+            return None
+        logger.info('[%s] Loaded %d static gestures from %s',
+                    self.source, len(definitions.static_gestures), definitions.config_file)
+        return definitions.static_table
+    
+    def _trajectory_recognizer(self, definitions) -> Optional[TrajectoryTemplateRecognizer]:
+        recognizer = definitions.trajectory_recognizer if definitions is not None else None
+        if recognizer is not None:
+            logger.info('[%s] Loaded %d trajectory templates from %s',
+                        self.source, len(recognizer.templates), definitions.config_file)
+        return recognizer
+    
+    def _create_frame_ring(self) -> FrameRing:
+        # 重放时不丢帧，保证结果可复现
+        return FrameRing(size=self.config.frame_buffers, lossless=bool(self.config.replay_path),
+                         latest_only=self.config.latest_frame_only)
+    
     def _capture_frames(self):
         while self.running:
             if not self.paused:
-                ret, frame = self.cap.read()
-                if ret:
-                    if self.config.flip_horizontal:
-                        frame = cv2.flip(frame, 1)
-                    
-                    try:
-                        self.frame_queue.put(frame, timeout=0.1)
-                        self.frame_count += 1
-                    except:
-                        # Queue full, skip frame
-                        pass
+                slot = self.frame_ring.acquire_write(timeout=0.1)
+                if slot is None:
+                    # 无损模式下所有缓冲都未处理完
+                    continue
+                if self._read_into(slot):
+                    self.frame_ring.commit(slot, self._frame_timestamp(), time.perf_counter())
+                    self.stage_counts['capture'] += 1
+                    self.frame_count += 1
                 else:
-                    logger.error('Failed to capture frame')
+                    self.frame_ring.abort(slot)
+                    if self.config.replay_path:
+                        logger.info('[%s] Replay source exhausted after %d frames',
+                                    self.source, self.stage_counts['capture'])
+                        self.source_exhausted = True
+                    else:
+                        logger.error('[%s] Failed to capture frame', self.source)
                     break
             else:
                 time.sleep(0.1)
+    
+    def _read_into(self, slot: FrameSlot) -> bool:
+        """把下一帧读入slot的缓冲，水平翻转直接写入目标缓冲"""
+        if self.config.flip_horizontal:
+            ret, self._raw_frame = self.cap.read(self._raw_frame)
+            if not ret:
+                return False
+            cv2.flip(self._raw_frame, 1, dst=slot.ensure(self._raw_frame.shape, self._raw_frame.dtype))
+        else:
+            ret, frame = self.cap.read(slot.frame)
+            if not ret:
+                return False
+            # 分辨率变化时cv2会返回新分配的数组
+            slot.frame = frame
+        return True
         
     def _process_frames(self):
         while self.running:
             if not self.paused:
+                if self.detector_pool:
+                    try:
+                        self._collect_pooled()
+                    except RuntimeError as exc:
+                        logger.error('Detector pool failed: %s', exc)
+                        self.running = False
+                        break
+                slot = self.frame_ring.get(timeout=0.01 if self.detector_pool else 0.1)
+                if slot is None:
+                    if (self.source_exhausted and not self.frame_ring.pending()
+                            and not (self.detector_pool and self.detector_pool.pending(self._pool_client))):
+                        # 重放结束且缓冲和推理池都已处理完
+                        self.stopped_at = time.perf_counter()
+                        self.running = False
+                    continue
                 try:
-                    frame = self.frame_queue.get(timeout=0.1)
-                    current_time = time.time()
+                    frame, current_time, captured_at = slot.frame, slot.timestamp, slot.captured_at
+                    self.latency.record('queue_wait', time.perf_counter() - captured_at)
+                    self.stage_counts['process'] += 1
                     
-                    # Detect gestures at specified intervals
-                    if current_time - self.last_detection_time >= self.config.detection_interval:
-                        gesture_results = self.detector.detect_hands(frame)
-                        self.last_detection_time = current_time
-                        
-                        if gesture_results:
-                            for gesture_result in gesture_results:
-                                self._handle_gesture(gesture_result)
-                                self.gesture_count += 1
-                                
-                                if self.on_gesture_detected:
-                                    self.on_gesture_detected(gesture_result)
-                        
-                        # Put frame with results for display
-                        display_data = {
-                            'frame': frame,
-                            'gestures': gesture_results or []
-                        }
-                        
-                        try:
-                            self.result_queue.put(display_data, timeout=0.1)
-                        except:
-                            # Result queue full, skip
-                            pass
-                    else:
-                        # Still put frame for display without detection
-                        display_data = {
-                            'frame': frame,
-                            'gestures': []
-                        }
-                        try:
-                            self.result_queue.put(display_data, timeout=0.1)
-                        except:
-                            pass
+                    # Detect gestures at scheduled intervals
+                    display_gestures = []
+                    if self.scheduler.is_due(current_time):
+                        if self.detector_pool:
+                            self._submit_pooled(frame, current_time, captured_at)
+                        elif self._check_presence(frame, current_time):
+                            gesture_results = self.detector.detect_hands(frame, timestamp=current_time)
+                            classified_at = time.perf_counter()
+                            self.last_detection_time = current_time
+                            self.stage_counts['detect'] += 1
+                            self.scheduler.observe(current_time, self.detector.last_hand_count)
+                            timings = getattr(self.detector, 'last_timings', {})
+                            self.latency.record('inference', timings.get('inference'))
+                            self.latency.record('classify', timings.get('classify'))
+                            self._dispatch_gestures(gesture_results, captured_at, classified_at)
+                            display_gestures = gesture_results or []
+                    if self.detector_pool:
+                        # 推理结果滞后于当前帧，显示最近一次完成的结果
+                        display_gestures = self._pooled_gestures
+                    
+                    # Put frame with results for display
+                    self._publish_display(slot, display_gestures)
+                    self._maybe_log_latency()
                             
-                except Empty:
-                    continue
                 except Exception as exc:
                     logger.error('Error processing frame: %s', exc)
+                finally:
+                    self.frame_ring.release(slot)
             else:
                 time.sleep(0.1)
         
+    def _dispatch_gestures(self, gesture_results: Optional[List[GestureResult]],
+                           captured_at: float, classified_at: float):
+        for gesture_result in gesture_results or []:
+            if self.gesture_merger and not self.gesture_merger.accept(
+                    self.source, gesture_result.gesture_code, gesture_result.timestamp):
+                # 其他摄像头已经上报了同一手势
+                self.duplicate_count += 1
+                logger.debug('[%s] Dropping duplicate gesture %s', self.source, gesture_result.gesture_code)
+                continue
+            handle_start = time.perf_counter()
+            self._handle_gesture(gesture_result, captured_at, classified_at)
+            self.latency.record('handle', time.perf_counter() - handle_start)
+            self.gesture_count += 1
+            
+            if self.on_gesture_detected:
+                self.on_gesture_detected(gesture_result)
+        
+    def _submit_pooled(self, frame: np.ndarray, current_time: float, captured_at: float):
+        """把帧提交给推理进程池；空闲模式下提交缩小的存在检测帧"""
+        presence = self.scheduler.idle
+        image = self.scheduler.presence_frame(frame) if presence else frame
+        h, w = frame.shape[:2]
+        meta = (presence, current_time, captured_at, w, h)
+        # 重放时等待空闲槽，保证每个调度的帧都被检测；实时模式下池满则跳过本帧
+        while not self.detector_pool.submit(image, meta, timeout=0.5 if self.config.replay_path else 0.0,
+                                            client=self._pool_client):
+            if not self.config.replay_path or not self.running:
+                return
+        
+    def _collect_pooled(self):
+        """按提交顺序处理推理进程池返回的关键点"""
+        for result in self.detector_pool.collect(client=self._pool_client):
+            presence, current_time, captured_at, w, h = result.meta
+            if presence:
+                self.stage_counts['presence'] += 1
+                self.scheduler.observe(current_time, len(result.hands))
+                continue
+            
+            classify_start = time.perf_counter()
+            gesture_results = self.detector.classify_landmarks(result.hands, w, h, current_time, result.handedness)
+            classified_at = time.perf_counter()
+            self.last_detection_time = current_time
+            self.stage_counts['detect'] += 1
+            self.scheduler.observe(current_time, len(result.hands))
+            self.latency.record('inference', result.inference)
+            self.latency.record('classify', classified_at - classify_start)
+            self._dispatch_gestures(gesture_results, captured_at, classified_at)
+            self._pooled_gestures = gesture_results or []
+        
+    def _check_presence(self, frame: np.ndarray, current_time: float) -> bool:
+        """空闲模式下先在缩小帧上做存在检测，有手时才进行完整检测"""
+        if not self.scheduler.idle:
+            return True
+        hand_count = self.detector.count_hands(self.scheduler.presence_frame(frame))
+        self.stage_counts['presence'] += 1
+        self.scheduler.observe(current_time, hand_count)
+        return not self.scheduler.idle
+        
+    def _publish_display(self, slot: FrameSlot, gestures: list):
+        # 无预览窗口时没有消费者
+        if not self.config.show_preview:
+            return
+        # 显示线程只取最新结果，来不及显示的旧结果直接被替换
+        self.frame_ring.post_result(slot, gestures)
+        
     def _display_results(self):
         while self.running:
             if not self.paused:
                 try:
-                    display_data = self.result_queue.get(timeout=0.1)
-                    frame = display_data['frame']
-                    gestures = display_data['gestures']
-                    
-                    # Draw gesture information
-                    for i, gesture in enumerate(gestures):
-                        if gesture.bbox:
-                            x, y, w, h = gesture.bbox
-                            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                            
-                            # Draw gesture label
-                            label = f'{gesture.gesture_code}: {gesture.confidence:.2f}'
-                            cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                    
-                    # Draw statistics
-                    stats_text = f'Frames: {self.frame_count} | Gestures: {self.gesture_count}'
-                    cv2.putText(frame, stats_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    frame = self.render_preview(timeout=0.1)
+                    if frame is None:
+                        continue
                     
                     # Show preview window
-                    cv2.imshow('YOLO-LLM Agent - Gesture Detection', frame)
+                    cv2.imshow(self.window_title(), frame)
                     
                     # Handle key presses
-                    key = cv2.waitKey(1) & 0xFF
-                    if key == ord('q') or key == 27:  # 'q' or ESC
-                        logger.info('User requested stop')
-                        self.running = False
-                    elif key == ord(' '):  # Space to pause/resume
-                        if self.paused:
-                            self.resume()
-                        else:
-                            self.pause()
+                    self.handle_key(cv2.waitKey(1) & 0xFF)
                             
-                except Empty:
-                    continue
                 except Exception as exc:
                     logger.error('Error displaying results: %s', exc)
             else:
                 time.sleep(0.1)
+    
+    def render_preview(self, timeout: float = 0.1) -> Optional[np.ndarray]:
+        """取最新的处理结果并绘制手势框和统计信息，没有新结果时返回None；只能在显示所在的线程调用"""
+        result = self.frame_ring.take_result(timeout=timeout)
+        if result is None:
+            return None
+        slot, gestures = result
+        # 复制到显示线程自己的缓冲后再绘制，不修改处理线程持有的帧
+        try:
+            if self._display_frame is None or self._display_frame.shape != slot.frame.shape:
+                self._display_frame = np.empty_like(slot.frame)
+            np.copyto(self._display_frame, slot.frame)
+        finally:
+            self.frame_ring.release(slot)
+        frame = self._display_frame
         
-    def _handle_gesture(self, gesture_result: GestureResult):
+        # Draw gesture information
+        for i, gesture in enumerate(gestures):
+            if gesture.bbox:
+                x, y, w, h = gesture.bbox
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                
+                # Draw gesture label
+                label = f'{gesture.gesture_code}: {gesture.confidence:.2f}'
+                cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        
+        # Draw statistics
+        stats_text = f'Frames: {self.frame_count} | Gestures: {self.gesture_count}'
+        cv2.putText(frame, stats_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        self.stage_counts['display'] += 1
+        return frame
+    
+    def handle_key(self, key: int):
+        """处理预览窗口的按键"""
+        if key == ord('q') or key == 27:  # 'q' or ESC
+            logger.info('User requested stop')
+            self.running = False
+        elif key == ord(' '):  # Space to pause/resume
+            if self.paused:
+                self.resume()
+            else:
+                self.pause()
+        
+    def _handle_gesture(self, gesture_result: GestureResult,
+                        captured_at: Optional[float] = None, classified_at: Optional[float] = None):
         # 详细日志记录
         logger.info('[DEBUG] Detected gesture: %s', gesture_result.gesture_code)
         logger.info('[DEBUG] Available mappings: %s', list(self.gesture_mapping.keys()))
@@ -274,8 +552,26 @@ class VideoProcessor:
             logger.warning('[ERROR] No action type for gesture: %s', gesture_result.gesture_code)
             return
 
+        if self.config.dry_run:
+            logger.info('[DRY_RUN] Skipping action for gesture %s: %s - %s',
+                        gesture_result.gesture_code, action_type, action_value)
+            if self.on_action_executed:
+                self.on_action_executed(gesture_result.gesture_code, True, 'Dry run')
+            return
+
+        # 动作在独立线程中执行，处理线程只负责入队
+        gesture_code = gesture_result.gesture_code
+        self.action_dispatcher.submit(
+            matched_code,
+            lambda: self._execute_gesture_action(gesture_code, action_type, action_value, action_payload,
+                                                 captured_at, classified_at)
+        )
+
+    def _execute_gesture_action(self, gesture_code: str, action_type: str, action_value: str,
+                                action_payload: Optional[str],
+                                captured_at: Optional[float] = None, classified_at: Optional[float] = None):
         logger.info('[ACTION] Executing action for gesture %s: %s - %s',
-                     gesture_result.gesture_code, action_type, action_value)
+                     gesture_code, action_type, action_value)
 
         # 确保浏览器获得焦点并添加延迟
         import pyautogui
@@ -288,9 +584,16 @@ class VideoProcessor:
             pass  # 如果点击失败，继续执行
 
         try:
+            action_start = time.perf_counter()
+            if classified_at is not None:
+                self.latency.record('dispatch', action_start - classified_at)
             success, message = execute_action(action_type, action_value, action_payload)
+            action_end = time.perf_counter()
+            self.latency.record('action', action_end - action_start)
+            if captured_at is not None:
+                self.latency.record('end_to_end', action_end - captured_at)
             logger.info('[ACTION_RESULT] Execute result for %s: success=%s, message=%s',
-                         gesture_result.gesture_code, success, message)
+                         gesture_code, success, message)
 
             # 为浏览器操作添加响应延迟
             if success and action_type == 'hotkey':
@@ -298,11 +601,11 @@ class VideoProcessor:
 
         except Exception as exc:
             logger.exception('[ACTION_ERROR] Exception executing action for %s: %s',
-                              gesture_result.gesture_code, exc)
+                              gesture_code, exc)
             success, message = False, f'Exception: {exc}'
 
         if self.on_action_executed:
-            self.on_action_executed(gesture_result.gesture_code, success, message)
+            self.on_action_executed(gesture_code, success, message)
 
         if success:
             logger.info('[SUCCESS] Action executed successfully: %s', message)
@@ -313,12 +616,60 @@ class VideoProcessor:
         self.gesture_mapping = new_mapping
         logger.info('Updated gesture mapping with %d entries', len(new_mapping))
     
+    def apply_mapping_diff(self, upserts: Dict[str, Dict], removed: List[str]):
+        # 增量更新：单个键的赋值/删除是原子的，处理线程无需加锁
+        for code, action in upserts.items():
+            self.gesture_mapping[code] = action
+        for code in removed:
+            self.gesture_mapping.pop(code, None)
+        logger.info('Applied gesture mapping diff: %d updated, %d removed, %d entries',
+                    len(upserts), len(removed), len(self.gesture_mapping))
+    
+    def window_title(self) -> str:
+        title = 'YOLO-LLM Agent - Gesture Detection'
+        # 多个视频源时每个源一个预览窗口
+        return title if self.gesture_merger is None else f'{title} [{self.source}]'
+    
+    def _frame_timestamp(self) -> float:
+        # 重放时使用录制时间戳，保证检测和冷却逻辑可复现
+        if isinstance(self.cap, ReplaySource):
+            return self.cap.last_timestamp
+        return time.time()
+    
+    def _maybe_log_latency(self):
+        interval = self.config.latency_log_interval
+        if interval <= 0:
+            return
+        now = time.perf_counter()
+        if now - self.last_latency_log >= interval:
+            self.last_latency_log = now
+            logger.info('[LATENCY] p50/p95/p99 %s', self.latency.format_line())
+    
+    def get_stage_fps(self) -> Dict[str, float]:
+        if self.started_at is None:
+            return {stage: 0.0 for stage in self.stage_counts}
+        end = self.stopped_at if self.stopped_at is not None else time.perf_counter()
+        elapsed = max(end - self.started_at, 1e-6)
+        return {stage: round(count / elapsed, 2) for stage, count in self.stage_counts.items()}
+    
     def get_stats(self) -> Dict[str, Any]:
         return {
+            'source': self.source,
             'frame_count': self.frame_count,
             'gesture_count': self.gesture_count,
+            'duplicate_count': self.duplicate_count,
             'running': self.running,
             'paused': self.paused,
-            'mapping_count': len(self.gesture_mapping)
+            'mapping_count': len(self.gesture_mapping),
+            'stage_counts': dict(self.stage_counts),
+            'stage_fps': self.get_stage_fps(),
+            'latency': self.latency.summary(),
+            'actions': self.action_dispatcher.get_stats(),
+            'scheduler': self.scheduler.get_stats(),
+            'frames': self.frame_ring.get_stats(),
+            'detector_pool': self.detector_pool.get_stats() if self.detector_pool else None,
+            'roi': self.detector.roi_tracker.get_stats() if self.detector and self.detector.roi_tracker else None,
+            'gesture_filter': (self.detector.gesture_filter.get_stats()
+                               if self.detector and self.detector.gesture_filter else None),
         }
 
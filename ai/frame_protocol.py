@@ -0,0 +1,86 @@
+"""
+WebSocket 二进制帧协议
+客户端可以直接发送二进制消息代替 base64 data URL 文本，省去约33%的传输量和 base64/PIL 解码的多次拷贝。
+
+消息 = 12字节头 + 负载，头部为小端：
+    magic  2s  b"CF"
+    version u8  1
+    format  u8  FORMAT_*
+    width   u16 原始像素格式时必填，编码图像填0
+    height  u16 同上
+    frame_id u32 客户端自定义编号，原样写回响应，便于对应结果
+负载：
+    FORMAT_ENCODED  JPEG/PNG/WebP 文件字节，cv2.imdecode 直接解码为 BGR
+    FORMAT_BGR      width*height*3 字节 BGR，零拷贝包装为数组
+    FORMAT_I420     width*height*3/2 字节 YUV420 平面格式
+    FORMAT_NV12     width*height*3/2 字节 Y 平面 + UV 交错
+"""
+
+import struct
+
+import cv2
+import numpy as np
+
+MAGIC = b"CF"
+VERSION = 1
+HEADER = struct.Struct("<2sBBHHI")
+
+FORMAT_ENCODED = 0
+FORMAT_BGR = 1
+FORMAT_I420 = 2
+FORMAT_NV12 = 3
+
+_YUV_CONVERSIONS = {FORMAT_I420: cv2.COLOR_YUV2BGR_I420, FORMAT_NV12: cv2.COLOR_YUV2BGR_NV12}
+
+
+class FrameError(ValueError):
+    """二进制帧格式错误"""
+
+
+def decode_image(data) -> np.ndarray:
+    """把 JPEG/PNG 等编码图像字节解码为 (h, w, 3) BGR 数组"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if not buf.size:
+        raise FrameError("图像数据为空")
+    try:
+        image = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    except cv2.error as e:
+        raise FrameError(f"无法解码图像数据: {e}") from e
+    if image is None:
+        raise FrameError("无法解码图像数据")
+    return image
+
+
+def decode_frame(message: bytes):
+    """解析一条二进制消息，返回 (BGR图像, frame_id)"""
+    if len(message) < HEADER.size:
+        raise FrameError(f"消息长度 {len(message)} 小于帧头 {HEADER.size} 字节")
+    magic, version, fmt, width, height, frame_id = HEADER.unpack_from(message)
+    if magic != MAGIC or version != VERSION:
+        raise FrameError(f"不支持的帧头 magic={magic!r} version={version}")
+    payload = memoryview(message)[HEADER.size:]
+
+    if fmt == FORMAT_ENCODED:
+        return decode_image(payload), frame_id
+
+    if fmt == FORMAT_BGR:
+        expected = width * height * 3
+    elif fmt in _YUV_CONVERSIONS:
+        if width % 2 or height % 2:
+            raise FrameError("YUV420 帧的宽高必须为偶数")
+        expected = width * height * 3 // 2
+    else:
+        raise FrameError(f"未知的像素格式 {fmt}")
+    if not width or not height or len(payload) != expected:
+        raise FrameError(f"负载长度 {len(payload)} 与 {width}x{height} 格式 {fmt} 不符（应为 {expected}）")
+
+    if fmt == FORMAT_BGR:
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3), frame_id
+    yuv = np.frombuffer(payload, dtype=np.uint8).reshape(height * 3 // 2, width)
+    return cv2.cvtColor(yuv, _YUV_CONVERSIONS[fmt]), frame_id
+
+
+def encode_frame(payload: bytes, fmt: int = FORMAT_ENCODED, width: int = 0, height: int = 0,
+                 frame_id: int = 0) -> bytes:
+    """客户端组帧（也用于测试）"""
+    return HEADER.pack(MAGIC, VERSION, fmt, width, height, frame_id & 0xFFFFFFFF) + bytes(payload)
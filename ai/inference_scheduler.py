@@ -0,0 +1,207 @@
+"""
+推理微批调度
+各个请求/WebSocket帧把待推理的图像提交给调度器后 await 结果，不在事件循环中直接调用 model.predict。
+工作线程按类型（detect / analyze）把同时到达的请求合并为一批：凑满 max_batch 个，
+或最早的请求已等待 max_wait 秒就执行，一次 predict 处理整批，再把每个结果送回各自等待的协程。
+ultralytics 模型对象不是线程安全的，每个工作线程通过 handler_factory 取得自己的一组批处理函数（模型实例）。
+
+排队总数达到 max_queue 时新请求直接被拒绝（SchedulerFull），排队超过 max_queue_wait 秒的请求
+不再推理（SchedulerUnavailable），负载过高时服务快速失败而不是无限排队。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+class SchedulerRejected(Exception):
+    """请求未被推理，status_code 为对应的HTTP状态码"""
+    status_code = 503
+
+
+class SchedulerFull(SchedulerRejected):
+    status_code = 429
+
+
+class SchedulerUnavailable(SchedulerRejected):
+    status_code = 503
+
+
+class InferenceScheduler:
+    def __init__(self, handler_factory: Callable[[int], Dict[str, Callable[[List[Any]], List[Any]]]],
+                 workers: int = 1, max_batch: int = 8, max_wait: float = 0.01,
+                 max_queue: int = 32, max_queue_wait: float = 5.0):
+        # handler_factory(worker) 返回该工作线程的 类型 -> 批处理函数，输入列表与输出列表一一对应
+        self.handler_factory = handler_factory
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait  # 最早的请求最多等待多久(秒)凑批
+        self.max_queue = max(1, max_queue)  # 所有类型排队请求总数上限
+        self.max_queue_wait = max_queue_wait  # 排队超过该时长(秒)的请求直接失败，0为不限
+
+        # 0号工作线程的批处理函数在构造时创建，同时确定支持的类型
+        self._handlers: Dict[int, Dict[str, Callable]] = {0: handler_factory(0)}
+        self._queues: Dict[str, deque] = {kind: deque() for kind in self._handlers[0]}
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+
+        # Statistics
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.rejected = 0
+        self.expired = 0
+        self.busy_workers = 0
+        self._waits = deque(maxlen=500)  # 最近请求的排队时长(秒)
+        self._inference = deque(maxlen=200)  # 最近批次的推理时长(秒)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [threading.Thread(target=self._run, args=(worker,), name=f"inference-{worker}", daemon=True)
+                         for worker in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending = [entry for queue in self._queues.values() for entry in queue]
+            for queue in self._queues.values():
+                queue.clear()
+            self._queued = 0
+            self._cond.notify_all()
+        for _, _, future, loop in pending:
+            loop.call_soon_threadsafe(_resolve, future, None, SchedulerUnavailable("推理服务正在停止"))
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    async def submit(self, kind: str, item: Any) -> Any:
+        """提交一项推理并等待其结果，批处理函数抛出的异常会在这里重新抛出"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._cond:
+            if not self._running:
+                raise SchedulerUnavailable("推理服务未启动")
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerFull(f"推理队列已满（{self._queued} 个请求排队）")
+            self._queues[kind].append((time.monotonic(), item, future, loop))
+            self._queued += 1
+            self._cond.notify()
+        return await future
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._queued:
+                self._cond.wait()
+            if not self._running:
+                return None, []
+            # 先处理最早请求所在的类型，避免某一类型一直被插队
+            kind = min((k for k, q in self._queues.items() if q), key=lambda k: self._queues[k][0][0])
+            queue = self._queues[kind]
+            deadline = queue[0][0] + self.max_wait
+            while self._running and 0 < len(queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            # 等待期间可能已被其他工作线程取走
+            batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+            self._queued -= len(batch)
+            if batch:
+                self.busy_workers += 1
+            return kind, batch
+
+    def _run(self, worker: int):
+        handlers = self._handlers.get(worker)
+        if handlers is None:
+            handlers = self._handlers[worker] = self.handler_factory(worker)
+        while True:
+            kind, batch = self._next_batch()
+            if not batch:
+                if not self._running:
+                    break
+                continue
+            try:
+                self._execute(handlers[kind], batch)
+            finally:
+                with self._cond:
+                    self.busy_workers -= 1
+
+    def _execute(self, handler: Callable, batch: List[tuple]):
+        started = time.monotonic()
+        live = []
+        for entry in batch:
+            wait = started - entry[0]
+            self._waits.append(wait)
+            if self.max_queue_wait and wait > self.max_queue_wait:
+                # 等待方大多已超时放弃，推理也没有意义
+                with self._cond:
+                    self.expired += 1
+                entry[3].call_soon_threadsafe(_resolve, entry[2], None,
+                                              SchedulerUnavailable(f"排队 {wait:.1f}s 超过上限"))
+            elif not entry[2].done():
+                live.append(entry)
+        if not live:
+            return
+
+        try:
+            results = handler([item for _, item, _, _ in live])
+            error = None
+        except Exception as e:
+            results, error = [None] * len(live), e
+        self._inference.append(time.monotonic() - started)
+
+        with self._cond:
+            self.batches += 1
+            self.items += len(live)
+            self.max_batch_seen = max(self.max_batch_seen, len(live))
+        for (_, _, future, loop), result in zip(live, results):
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        inference = list(self._inference)
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy_workers,
+            "queue_depth": self._queued,
+            "queue_by_kind": {kind: len(queue) for kind, queue in self._queues.items()},
+            "max_queue": self.max_queue,
+            "wait_ms_mean": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_p95": round(_percentile(waits, 0.95) * 1000, 1),
+            "inference_ms_mean": round(sum(inference) / len(inference) * 1000, 1) if inference else 0.0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[Exception] = None):
+    # 等待方可能已断开（协程被取消）
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -0,0 +1,58 @@
+"""
+WebSocket 最新帧接收
+后台任务持续读取连接上的消息，只保留最新一条尚未处理的消息；处理跟不上客户端发送速度时
+旧消息直接丢弃（不解码），消息不会在套接字缓冲中堆积，结果的延迟不超过一次推理。
+"""
+
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class LatestFrameReceiver:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.received = 0
+        self.dropped = 0  # 累计被新消息覆盖而未处理的帧数
+
+        self._pending: Optional[Dict[str, Any]] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._receive_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _receive_loop(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                self.received += 1
+                if self._pending is not None:
+                    self.dropped += 1
+                self._pending = message
+                self._ready.set()
+        finally:
+            self._closed = True
+            self._ready.set()
+
+    async def next(self) -> Optional[Dict[str, Any]]:
+        """等待并取出最新一条未处理的 ASGI 消息，连接关闭且没有剩余消息时返回 None"""
+        while True:
+            if self._pending is None and self._closed:
+                return None
+            await self._ready.wait()
+            self._ready.clear()
+            message, self._pending = self._pending, None
+            if message is not None:
+                return message
@@ -1,10 +1,16 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket
+from fastapi import FastAPI, Request, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from ultralytics import YOLO
 from PIL import Image
-import io, requests, base64
+import io, os, requests, base64, binascii, asyncio
+import cv2
 import numpy as np
+import torch
 from collections import deque
+from inference_scheduler import InferenceScheduler, SchedulerRejected
+from frame_protocol import FrameError, decode_frame, decode_image
+from latest_frame import LatestFrameReceiver
 
 app = FastAPI()
 app.add_middleware(
@@ -68,51 +74,162 @@ gesture_recognizers = {}
 def health():
     import importlib.util
     deepface_ok = importlib.util.find_spec("deepface") is not None
-    return {"status": "ok", "deepface": deepface_ok}
+    return {"status": "ok", "deepface": deepface_ok, "scheduler": scheduler.get_stats()}
 
-model_det = YOLO("yolov8m.pt")
-model_pose = YOLO("yolov8m-pose.pt")
+DET_WEIGHTS = "yolov8m.pt"
+POSE_WEIGHTS = "yolov8m-pose.pt"
+model_det = YOLO(DET_WEIGHTS)
+model_pose = YOLO(POSE_WEIGHTS)
 
-def run_detect(image: Image.Image):
-    results = model_det.predict(image, imgsz=320, conf=0.30, verbose=False)
-    names = model_det.names
-    objects = []
+# --- 图像解码 ---
+# 推理流程统一使用 OpenCV 的 (h, w, 3) BGR uint8 数组，即 ultralytics 对 numpy 输入期望的格式
+# 解码和下载都是同步阻塞操作，协程中通过 asyncio.to_thread 在线程池执行，不阻塞事件循环（包括 /health）
+def load_image(img_bytes) -> np.ndarray:
+    """解码上传的图像字节，OpenCV 不支持的格式（如 GIF）回退到 PIL；两者都无法解码时抛出 FrameError"""
+    try:
+        return decode_image(img_bytes)
+    except FrameError:
+        pass
+    try:
+        rgb = np.asarray(Image.open(io.BytesIO(img_bytes)).convert("RGB"))
+    except Exception as e:
+        # PIL 对损坏或未知格式会抛出 UnidentifiedImageError、OSError、DecompressionBombError 等
+        raise FrameError(f"无法解码图像数据: {e}") from e
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+async def receive_frame(websocket: WebSocket):
+    """接收并解码一帧"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return await asyncio.to_thread(parse_message, message)
+
+def parse_message(message):
+    """解码一条 ASGI WebSocket 消息，返回 (BGR图像, frame_id)；文本帧为 base64 图像（可带 data URL 前缀），frame_id 为 None"""
+    if message.get("bytes") is not None:
+        return decode_frame(message["bytes"])
+    data = message.get("text") or ""
+    if data.startswith("data:image") and "," in data: data = data.split(",", 1)[1]
+    try:
+        img_bytes = base64.b64decode(data)
+    except binascii.Error as e:
+        raise FrameError(f"无效的 base64 数据: {e}") from e
+    return load_image(img_bytes), None
+
+def fetch_image(url: str) -> np.ndarray:
+    """下载并解码 URL 指向的图像"""
+    resp = requests.get(url, timeout=10)
+    resp.raise_for_status()
+    return load_image(resp.content)
+
+
+def detect_batch(images, det=model_det):
+    """一次 predict 处理一批图像，返回与输入对应的结果列表"""
+    results = det.predict(images, imgsz=320, conf=0.30, verbose=False)
+    names = det.names
+    return [{"objects": list({names[int(c)] for c in r.boxes.cls})} for r in results]
+
+def run_detect(image: np.ndarray):
+    return detect_batch([image])[0]
+
+
+# --- 共享预处理 ---
+# 检测和姿态模型使用同一输入尺寸，图像只解码、缩放、归一化一次，
+# 得到的张量直接送入两个模型（张量输入时 ultralytics 跳过自身的 letterbox 和转换）
+ANALYZE_IMGSZ = 480  # 长边缩放到该尺寸
+ANALYZE_STRIDE = 32  # 模型最大下采样倍数，输入宽高需为其整数倍
+ANALYZE_MODES = ("full", "pose")  # pose: 只运行姿态模型，人物框取自姿态结果，不识别其他物体
+
+def letterbox_shape(height: int, width: int, size: int = ANALYZE_IMGSZ):
+    """返回 (缩放比例, (缩放后高, 宽), (填充后高, 宽))；每边只填充到最近的 stride 倍数（矩形推理），不再补成正方形"""
+    scale = min(size / height, size / width)
+    nh, nw = int(round(height * scale)), int(round(width * scale))
+    padded = (-(-nh // ANALYZE_STRIDE) * ANALYZE_STRIDE, -(-nw // ANALYZE_STRIDE) * ANALYZE_STRIDE)
+    return scale, (nh, nw), padded
+
+def letterbox_tensor(image: np.ndarray, size: int = ANALYZE_IMGSZ, shape=None):
+    """把 BGR 图像等比缩放并填充为 (1, 3, H, W) 的 RGB 0-1 张量，返回 (张量, 缩放比例, (左填充, 上填充))
+
+    shape 为 (H, W)，默认取该图像自身的最小 stride 对齐尺寸；批处理时传入整批共同的尺寸以便拼接
+    """
+    img = image
+    h, w = img.shape[:2]
+    scale, (nh, nw), padded = letterbox_shape(h, w, size)
+    ph, pw = shape or padded
+    if (nh, nw) != (h, w):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = (ph - nh) // 2, (pw - nw) // 2
+    canvas = np.full((ph, pw, 3), 114, dtype=np.uint8)
+    canvas[top:top + nh, left:left + nw] = img
+    # BGR -> RGB 与 HWC -> CHW 合并为一次拷贝
+    chw = np.ascontiguousarray(canvas[:, :, ::-1].transpose(2, 0, 1))
+    tensor = torch.from_numpy(chw).unsqueeze(0).float().div_(255.0)
+    return tensor, scale, (left, top)
+
+def unletterbox(xy: np.ndarray, scale: float, pad, width: int, height: int) -> np.ndarray:
+    """把模型输入坐标系下的 (..., 2) 点还原到原图坐标"""
+    out = (xy - np.asarray(pad, dtype=np.float32)) / scale
+    out[..., 0] = out[..., 0].clip(0, width)
+    out[..., 1] = out[..., 1].clip(0, height)
+    return out
+
+def parse_boxes(results, names, scale, pad, width, height):
+    boxes = []
     for r in results:
-        for c in r.boxes.cls:
-            objects.append(names[int(c)])
-    return {"objects": list(set(objects))}
-
-
-def run_analyze(image: Image.Image, recognizer: SimpleGestureRecognizer = None):
-    # 检测
-    det_res = model_det.predict(image, imgsz=480, conf=0.30, verbose=False)
-    names = model_det.names
-    det_boxes = []
-    for r in det_res:
-        if r.boxes is None: continue
-        for i in range(len(r.boxes)):
-            cls_id = int(r.boxes.cls[i])
-            score = float(r.boxes.conf[i]) if r.boxes.conf is not None else 0.0
-            xyxy = r.boxes.xyxy[i].tolist()
-            det_boxes.append({"label": names.get(cls_id, str(cls_id)), "score": score, "box": [float(v) for v in xyxy]})
+        if r.boxes is None or not len(r.boxes): continue
+        cls_ids = r.boxes.cls.int().tolist()
+        scores = r.boxes.conf.tolist() if r.boxes.conf is not None else [0.0] * len(cls_ids)
+        xyxy = unletterbox(r.boxes.xyxy.cpu().numpy().reshape(-1, 2, 2), scale, pad, width, height).reshape(-1, 4)
+        for cls_id, score, box in zip(cls_ids, scores, xyxy.tolist()):
+            boxes.append({"label": names.get(cls_id, str(cls_id)), "score": float(score), "box": box})
+    return boxes
 
-    # 姿态
-    pose_res = model_pose.predict(image, imgsz=480, conf=0.30, verbose=False)
-    persons = []
-    pid = 1
+def parse_keypoints(results, scale, pad, width, height):
     all_keypoints = []
-    for r in pose_res:
+    for r in results:
         if getattr(r, 'keypoints', None) is None or r.keypoints is None: continue
-        kxy = r.keypoints.xy
-        kconf = r.keypoints.conf
-        num = kxy.shape[0]
-        for idx in range(num):
-            pts_xy = kxy[idx].tolist()
-            pts_conf = kconf[idx].tolist() if kconf is not None else [1.0]*len(pts_xy)
-            kp = [[float(x), float(y), float(cf)] for (x, y), cf in zip(pts_xy, pts_conf)]
-            persons.append({"id": pid, "keypoints": kp})
-            all_keypoints.append(kp) # 收集所有人的关键点
-            pid += 1
+        kxy = unletterbox(r.keypoints.xy.cpu().numpy(), scale, pad, width, height)
+        kconf = r.keypoints.conf.cpu().numpy() if r.keypoints.conf is not None else np.ones(kxy.shape[:2], dtype=np.float32)
+        for pts_xy, pts_conf in zip(kxy, kconf):
+            all_keypoints.append([[float(x), float(y), float(cf)] for (x, y), cf in zip(pts_xy.tolist(), pts_conf.tolist())])
+    return all_keypoints
+
+
+def analyze_batch(items, det=model_det, pose=model_pose):
+    """items 为 (image, mode) 列表；整批拼成一个张量，姿态和检测模型各 predict 一次，返回 (det_boxes, all_keypoints) 列表"""
+    # 各图像宽高比可能不同，整批填充到各自对齐尺寸的最大值才能拼接；同一来源的帧尺寸相同，不会多填充
+    shapes = [letterbox_shape(*image.shape[:2])[2] for image, _ in items]
+    shape = (max(h for h, _ in shapes), max(w for _, w in shapes))
+    prepared = [letterbox_tensor(image, shape=shape) for image, _ in items]
+    batch = torch.cat([tensor for tensor, _, _ in prepared])
+
+    # 姿态
+    pose_res = pose.predict(batch, conf=0.30, verbose=False)
+
+    # 检测（pose 模式的请求不需要）
+    full = [i for i, (_, mode) in enumerate(items) if mode != "pose"]
+    det_res = dict(zip(full, det.predict(batch[full], conf=0.30, verbose=False))) if full else {}
+
+    outputs = []
+    for i, ((image, mode), (_, scale, pad)) in enumerate(zip(items, prepared)):
+        height, width = image.shape[:2]
+        all_keypoints = parse_keypoints([pose_res[i]], scale, pad, width, height)  # 收集所有人的关键点
+        if mode == "pose":
+            # 姿态模型只有 person 一类，其人物框已足够，跳过检测模型
+            det_boxes = parse_boxes([pose_res[i]], pose.names, scale, pad, width, height)
+        else:
+            det_boxes = parse_boxes([det_res[i]], det.names, scale, pad, width, height)
+        outputs.append((det_boxes, all_keypoints))
+    return outputs
+
+
+def run_analyze(image: np.ndarray, recognizer: SimpleGestureRecognizer = None, mode: str = "full"):
+    return build_analysis(*analyze_batch([(image, mode)])[0], recognizer)
+
+
+def build_analysis(det_boxes, all_keypoints, recognizer: SimpleGestureRecognizer = None):
+    """由推理结果生成响应：手势识别（有状态，在请求协程中执行）和手腕-物体关系"""
+    persons = [{"id": pid, "keypoints": kp} for pid, kp in enumerate(all_keypoints, start=1)]
 
     # --- 手势识别 & 关系推断 ---
     actions = []
@@ -150,39 +267,87 @@ def run_analyze(image: Image.Image, recognizer: SimpleGestureRecognizer = None):
     return {"detections": det_boxes, "poses": persons, "actions": list(set(actions))}
 
 
+# --- 推理调度 ---
+# 并发请求按类型合并成批，在工作线程中推理，事件循环只负责收发
+def make_handlers(worker: int):
+    """每个工作线程使用自己的模型实例，0号线程复用已加载的模型"""
+    det, pose = (model_det, model_pose) if worker == 0 else (YOLO(DET_WEIGHTS), YOLO(POSE_WEIGHTS))
+    return {
+        "detect": lambda images: detect_batch(images, det),
+        "analyze": lambda items: analyze_batch(items, det, pose),
+    }
+
+scheduler = InferenceScheduler(
+    make_handlers,
+    workers=int(os.environ.get("AI_WORKERS", "1")),
+    max_batch=int(os.environ.get("AI_MAX_BATCH", "8")),
+    max_wait=float(os.environ.get("AI_MAX_WAIT_MS", "10")) / 1000.0,
+    max_queue=int(os.environ.get("AI_MAX_QUEUE", "32")),
+    max_queue_wait=float(os.environ.get("AI_MAX_QUEUE_WAIT", "5")),
+)
+
+@app.exception_handler(SchedulerRejected)
+async def scheduler_rejected(request: Request, exc: SchedulerRejected):
+    # 429: 队列已满，客户端应稍后重试；503: 服务未就绪或排队超时
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(FrameError)
+async def frame_error(request: Request, exc: FrameError):
+    # 上传的图像无法解码属于客户端错误
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.on_event("startup")
+def start_scheduler():
+    scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    scheduler.stop()
+
+async def detect_async(image: np.ndarray):
+    return await scheduler.submit("detect", image)
+
+async def analyze_async(image: np.ndarray, recognizer: SimpleGestureRecognizer = None, mode: str = "full"):
+    det_boxes, all_keypoints = await scheduler.submit("analyze", (image, mode))
+    return build_analysis(det_boxes, all_keypoints, recognizer)
+
+
 @app.post("/detect/file")
 async def detect_file(file: UploadFile = File(...)):
     img_bytes = await file.read()
-    image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    return run_detect(image)
+    image = await asyncio.to_thread(load_image, img_bytes)
+    return await detect_async(image)
+
+def check_mode(mode: str) -> str:
+    if mode not in ANALYZE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode 必须是 {', '.join(ANALYZE_MODES)} 之一")
+    return mode
 
 @app.post("/analyze/file")
-async def analyze_file(file: UploadFile = File(...)):
+async def analyze_file(file: UploadFile = File(...), mode: str = "full"):
+    check_mode(mode)
     img_bytes = await file.read()
-    image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+    image = await asyncio.to_thread(load_image, img_bytes)
     # HTTP 调用是无状态的，所以每次都创建新的识别器
-    return run_analyze(image, SimpleGestureRecognizer())
+    return await analyze_async(image, SimpleGestureRecognizer(), mode)
 
 # ... (emotion and url endpoints remain the same)
 @app.post("/detect/url")
 async def detect_url(url: str):
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        image = Image.open(io.BytesIO(resp.content)).convert("RGB")
-        return run_detect(image)
+        image = await asyncio.to_thread(fetch_image, url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return await detect_async(image)
 
 @app.post("/analyze/url")
-async def analyze_url(url: str):
+async def analyze_url(url: str, mode: str = "full"):
+    check_mode(mode)
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        image = Image.open(io.BytesIO(resp.content)).convert("RGB")
-        return run_analyze(image, SimpleGestureRecognizer())
+        image = await asyncio.to_thread(fetch_image, url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return await analyze_async(image, SimpleGestureRecognizer(), mode)
 
 @app.post("/emotion/file")
 async def emotion_file(file: UploadFile = File(...)):
@@ -240,11 +405,15 @@ async def ws_detect(websocket: WebSocket):
     await websocket.accept()
     try:
         while True:
-            data = await websocket.receive_text()
-            if data.startswith("data:image") and "," in data: data = data.split(",", 1)[1]
-            img_bytes = base64.b64decode(data)
-            image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-            result = run_detect(image)
+            # 文本帧（base64）或二进制帧（见 frame_protocol）
+            frame_id = None
+            try:
+                image, frame_id = await receive_frame(websocket)
+                result = await detect_async(image)
+            except (FrameError, SchedulerRejected) as e:
+                # 坏帧或服务过载时跳过这一帧，连接保持
+                result = {"error": str(e), "status": getattr(e, "status_code", 400)}
+            if frame_id is not None: result["frame_id"] = frame_id
             await websocket.send_json(result)
     except Exception as e:
         try: await websocket.send_json({"error": str(e)})
@@ -255,19 +424,39 @@ async def ws_analyze(websocket: WebSocket):
     client_id = f"{websocket.client.host}:{websocket.client.port}"
     gesture_recognizers[client_id] = SimpleGestureRecognizer()
     await websocket.accept()
+    # 连接时通过 ?mode=pose 选择只运行姿态模型
+    mode = websocket.query_params.get("mode", "full")
+    if mode not in ANALYZE_MODES:
+        await websocket.send_json({"error": f"mode 必须是 {', '.join(ANALYZE_MODES)} 之一"})
+        await websocket.close()
+        del gesture_recognizers[client_id]
+        return
+    # 后台接收，只分析最新一帧；客户端发送过快时旧帧被丢弃，结果不会越积越旧
+    receiver = LatestFrameReceiver(websocket)
+    receiver.start()
+    reported_drops = 0
     try:
         while True:
-            data = await websocket.receive_text()
-            if data.startswith("data:image") and "," in data: data = data.split(",", 1)[1]
-            img_bytes = base64.b64decode(data)
-            image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-            
+            message = await receiver.next()
+            if message is None: break
             recognizer = gesture_recognizers.get(client_id)
-            result = run_analyze(image, recognizer)
+            # 文本帧（base64）或二进制帧（见 frame_protocol）
+            frame_id = None
+            try:
+                image, frame_id = await asyncio.to_thread(parse_message, message)
+                result = await analyze_async(image, recognizer, mode)
+            except (FrameError, SchedulerRejected) as e:
+                # 坏帧或服务过载时跳过这一帧，连接保持
+                result = {"error": str(e), "status": getattr(e, "status_code", 400)}
+            if frame_id is not None: result["frame_id"] = frame_id
+            # dropped: 上次响应以来丢弃的帧数，dropped_total: 本连接累计
+            result["dropped"] = receiver.dropped - reported_drops
+            result["dropped_total"] = reported_drops = receiver.dropped
             await websocket.send_json(result)
     except Exception as e:
         try: await websocket.send_json({"error": str(e)})
         except: pass
     finally:
+        await receiver.close()
         if client_id in gesture_recognizers:
             del gesture_recognizers[client_id]
\ No newline at end of file
@@ -9,6 +9,7 @@ import org.springframework.web.bind.annotation.RequestMapping;
 import org.springframework.web.bind.annotation.RestController;
 
 import java.util.HashMap;
+import java.util.List;
 import java.util.Map;
 
 @RestController
@@ -29,6 +30,16 @@ public class AuditController {
         resp.put("logId", logId);
         return ResponseEntity.ok(resp);
     }
+
+    @PostMapping("/logs")
+    public ResponseEntity<Map<String, Object>> recordLogs(@RequestBody List<LogRequest> requests) {
+        List<Long> logIds = logService.recordLogs(requests);
+        Map<String, Object> resp = new HashMap<>();
+        resp.put("status", "ok");
+        resp.put("count", logIds.size());
+        resp.put("logIds", logIds);
+        return ResponseEntity.ok(resp);
+    }
 }
 
 
@@ -1,30 +1,48 @@
 package com.example.aiorchestrator.controller;
 
 import com.example.aiorchestrator.dto.ConfigResponseDto;
+import com.example.aiorchestrator.service.ConfigPushService;
 import com.example.aiorchestrator.service.ConfigService;
+import org.springframework.http.HttpStatus;
+import org.springframework.http.MediaType;
 import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.GetMapping;
 import org.springframework.web.bind.annotation.RequestMapping;
 import org.springframework.web.bind.annotation.RequestParam;
 import org.springframework.web.bind.annotation.RestController;
+import org.springframework.web.context.request.WebRequest;
+import org.springframework.web.servlet.mvc.method.annotation.SseEmitter;
 
 @RestController
 @RequestMapping("/api")
 public class ConfigController {
 
     private final ConfigService configService;
+    private final ConfigPushService configPushService;
 
-    public ConfigController(ConfigService configService) {
+    public ConfigController(ConfigService configService, ConfigPushService configPushService) {
         this.configService = configService;
+        this.configPushService = configPushService;
     }
 
     @GetMapping("/config")
     public ResponseEntity<ConfigResponseDto> getConfig(@RequestParam(required = false) String username,
                                                        @RequestParam(required = false) String application,
-                                                       @RequestParam(required = false, name = "os") String osType) {
+                                                       @RequestParam(required = false, name = "os") String osType,
+                                                       WebRequest webRequest) {
         ConfigResponseDto response = configService.fetchConfig(username, application, osType);
-        return ResponseEntity.ok(response);
+        // 配置未变化时返回304，agent轮询无需重新下载和解析
+        String etag = "\"" + response.getVersion() + "\"";
+        if (webRequest.checkNotModified(etag)) {
+            return ResponseEntity.status(HttpStatus.NOT_MODIFIED).eTag(etag).build();
+        }
+        return ResponseEntity.ok().eTag(etag).body(response);
     }
-}
-
 
+    @GetMapping(value = "/config/stream", produces = MediaType.TEXT_EVENT_STREAM_VALUE)
+    public SseEmitter streamConfig(@RequestParam(required = false) String username,
+                                   @RequestParam(required = false) String application,
+                                   @RequestParam(required = false, name = "os") String osType) {
+        return configPushService.subscribe(username, application, osType);
+    }
+}
@@ -0,0 +1,38 @@
+package com.example.aiorchestrator.dto;
+
+import java.util.ArrayList;
+import java.util.List;
+
+public class ConfigDiffDto {
+    private String version;
+    private List<GestureConfigDto> upserts = new ArrayList<>();
+    private List<String> removed = new ArrayList<>();
+
+    public String getVersion() {
+        return version;
+    }
+
+    public void setVersion(String version) {
+        this.version = version;
+    }
+
+    public List<GestureConfigDto> getUpserts() {
+        return upserts;
+    }
+
+    public void setUpserts(List<GestureConfigDto> upserts) {
+        this.upserts = upserts;
+    }
+
+    public List<String> getRemoved() {
+        return removed;
+    }
+
+    public void setRemoved(List<String> removed) {
+        this.removed = removed;
+    }
+
+    public boolean isEmpty() {
+        return upserts.isEmpty() && removed.isEmpty();
+    }
+}
@@ -7,6 +7,7 @@ public class ConfigResponseDto {
     private String application;
     private String osType;
     private List<GestureConfigDto> mappings;
+    private String version;
 
     public String getUsername() {
         return username;
@@ -39,6 +40,12 @@ public class ConfigResponseDto {
     public void setMappings(List<GestureConfigDto> mappings) {
         this.mappings = mappings;
     }
-}
 
+    public String getVersion() {
+        return version;
+    }
 
+    public void setVersion(String version) {
+        this.version = version;
+    }
+}
@@ -0,0 +1,159 @@
+package com.example.aiorchestrator.service;
+
+import com.example.aiorchestrator.dto.ConfigDiffDto;
+import com.example.aiorchestrator.dto.ConfigResponseDto;
+import com.example.aiorchestrator.dto.GestureConfigDto;
+import com.fasterxml.jackson.core.JsonProcessingException;
+import com.fasterxml.jackson.databind.ObjectMapper;
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+import org.springframework.scheduling.annotation.Scheduled;
+import org.springframework.stereotype.Service;
+import org.springframework.web.servlet.mvc.method.annotation.SseEmitter;
+
+import java.io.IOException;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Objects;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.CopyOnWriteArrayList;
+
+/**
+ * 配置推送服务：agent 通过 SSE 订阅配置，后端统一检测变更并只推送差异，
+ * 代替每个 agent 定时轮询 /api/config。
+ */
+@Service
+public class ConfigPushService {
+
+    private static final Logger log = LoggerFactory.getLogger(ConfigPushService.class);
+
+    private final ConfigService configService;
+    private final ObjectMapper objectMapper;
+
+    private final Map<String, Subscription> subscriptions = new ConcurrentHashMap<>();
+
+    public ConfigPushService(ConfigService configService, ObjectMapper objectMapper) {
+        this.configService = configService;
+        this.objectMapper = objectMapper;
+    }
+
+    public SseEmitter subscribe(String username, String application, String osType) {
+        String key = String.join("|", String.valueOf(username), String.valueOf(application), String.valueOf(osType));
+        ConfigResponseDto snapshot = configService.fetchConfig(username, application, osType);
+        SseEmitter emitter = new SseEmitter(0L);
+
+        // 在 compute 中登记连接，与 pushChanges 移除空订阅对同一 key 互斥：
+        // 连接要么加入仍在表中的订阅，要么创建新订阅，不会加到刚被移除的订阅上而收不到推送
+        Subscription subscription = subscriptions.compute(key, (k, existing) -> {
+            Subscription target = existing != null ? existing : new Subscription(username, application, osType);
+            synchronized (target) {
+                if (target.last == null) {
+                    target.last = snapshot;
+                }
+                try {
+                    // 控制器返回 emitter 之前的发送只缓存在内存中，不会在锁内阻塞
+                    emitter.send(SseEmitter.event().name("config").id(snapshot.getVersion()).data(snapshot));
+                    target.emitters.add(emitter);
+                } catch (IOException e) {
+                    emitter.completeWithError(e);
+                }
+            }
+            return target;
+        });
+
+        emitter.onCompletion(() -> subscription.emitters.remove(emitter));
+        emitter.onTimeout(() -> subscription.emitters.remove(emitter));
+        emitter.onError(e -> subscription.emitters.remove(emitter));
+        return emitter;
+    }
+
+    @Scheduled(fixedDelayString = "${config.push.check-interval-ms:5000}")
+    public void pushChanges() {
+        for (String key : subscriptions.keySet()) {
+            // 判空和移除在 computeIfPresent 中原子完成，不会与 subscribe 中的登记交错
+            Subscription subscription = subscriptions.computeIfPresent(key,
+                    (k, existing) -> existing.emitters.isEmpty() ? null : existing);
+            if (subscription == null) {
+                continue;
+            }
+            try {
+                checkSubscription(subscription);
+            } catch (Exception e) {
+                log.warn("Failed to push config changes for {}: {}", key, e.getMessage());
+            }
+        }
+    }
+
+    private void checkSubscription(Subscription subscription) {
+        ConfigResponseDto current = configService.fetchConfig(
+                subscription.username, subscription.application, subscription.osType);
+        synchronized (subscription) {
+            ConfigResponseDto previous = subscription.last;
+            if (previous != null && Objects.equals(previous.getVersion(), current.getVersion())) {
+                // 无变化时发送心跳，及时清理断开的连接
+                broadcast(subscription, SseEmitter.event().comment("keepalive"));
+                return;
+            }
+            ConfigDiffDto diff = diff(previous, current);
+            subscription.last = current;
+            if (!diff.isEmpty()) {
+                broadcast(subscription, SseEmitter.event().name("config-diff").id(diff.getVersion()).data(diff));
+            }
+        }
+    }
+
+    private void broadcast(Subscription subscription, SseEmitter.SseEventBuilder event) {
+        for (SseEmitter emitter : subscription.emitters) {
+            try {
+                emitter.send(event);
+            } catch (IOException | IllegalStateException e) {
+                subscription.emitters.remove(emitter);
+            }
+        }
+    }
+
+    private ConfigDiffDto diff(ConfigResponseDto previous, ConfigResponseDto current) {
+        Map<String, String> before = index(previous == null ? List.of() : previous.getMappings());
+        ConfigDiffDto diff = new ConfigDiffDto();
+        diff.setVersion(current.getVersion());
+        for (GestureConfigDto gesture : current.getMappings()) {
+            String json = toJson(gesture);
+            if (!json.equals(before.remove(gesture.getCode()))) {
+                diff.getUpserts().add(gesture);
+            }
+        }
+        diff.getRemoved().addAll(before.keySet());
+        return diff;
+    }
+
+    private Map<String, String> index(List<GestureConfigDto> mappings) {
+        Map<String, String> result = new LinkedHashMap<>();
+        for (GestureConfigDto gesture : mappings) {
+            result.put(gesture.getCode(), toJson(gesture));
+        }
+        return result;
+    }
+
+    private String toJson(GestureConfigDto gesture) {
+        try {
+            return objectMapper.writeValueAsString(gesture);
+        } catch (JsonProcessingException e) {
+            return String.valueOf(System.identityHashCode(gesture));
+        }
+    }
+
+    private static class Subscription {
+        private final String username;
+        private final String application;
+        private final String osType;
+        private final List<SseEmitter> emitters = new CopyOnWriteArrayList<>();
+        private ConfigResponseDto last;
+
+        private Subscription(String username, String application, String osType) {
+            this.username = username;
+            this.application = application;
+            this.osType = osType;
+        }
+    }
+}
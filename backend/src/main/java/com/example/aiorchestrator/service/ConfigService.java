@@ -5,9 +5,13 @@ import com.example.aiorchestrator.dto.ConfigMappingRow;
 import com.example.aiorchestrator.dto.ConfigResponseDto;
 import com.example.aiorchestrator.dto.GestureConfigDto;
 import com.example.aiorchestrator.mapper.ConfigMapper;
+import com.fasterxml.jackson.core.JsonProcessingException;
+import com.fasterxml.jackson.databind.ObjectMapper;
 import org.springframework.stereotype.Service;
+import org.springframework.util.DigestUtils;
 import org.springframework.util.StringUtils;
 
+import java.nio.charset.StandardCharsets;
 import java.util.ArrayList;
 import java.util.LinkedHashMap;
 import java.util.List;
@@ -17,9 +21,11 @@ import java.util.Map;
 public class ConfigService {
 
     private final ConfigMapper configMapper;
+    private final ObjectMapper objectMapper;
 
-    public ConfigService(ConfigMapper configMapper) {
+    public ConfigService(ConfigMapper configMapper, ObjectMapper objectMapper) {
         this.configMapper = configMapper;
+        this.objectMapper = objectMapper;
     }
 
     public ConfigResponseDto fetchConfig(String username, String applicationCode, String osType) {
@@ -58,8 +64,21 @@ public class ConfigService {
         response.setApplication(applicationCode);
         response.setOsType(normalizedOs);
         response.setMappings(new ArrayList<>(gestureMap.values()));
+        response.setVersion(computeVersion(response.getMappings()));
         return response;
     }
+
+    /**
+     * 根据映射内容生成版本号，内容不变则版本不变，供客户端条件请求(ETag)使用
+     */
+    private String computeVersion(List<GestureConfigDto> mappings) {
+        try {
+            byte[] json = objectMapper.writeValueAsString(mappings).getBytes(StandardCharsets.UTF_8);
+            return DigestUtils.md5DigestAsHex(json);
+        } catch (JsonProcessingException e) {
+            return Integer.toHexString(mappings.hashCode());
+        }
+    }
 }
 
 
@@ -9,9 +9,14 @@ import com.example.aiorchestrator.mapper.ApplicationMapper;
 import com.example.aiorchestrator.mapper.LogMapper;
 import com.example.aiorchestrator.mapper.UserMapper;
 import org.springframework.stereotype.Service;
+import org.springframework.transaction.annotation.Transactional;
 import org.springframework.util.StringUtils;
 
 import java.time.LocalDateTime;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
 
 @Service
 public class LogService {
@@ -29,9 +34,31 @@ public class LogService {
     }
 
     public Long recordLog(LogRequest request) {
+        return insertEntry(request,
+                resolveUserId(request.getUsername()),
+                resolveApplicationId(request.getApplication()));
+    }
+
+    @Transactional
+    public List<Long> recordLogs(List<LogRequest> requests) {
+        // 同一批次内缓存用户和应用ID，避免逐条查询
+        Map<String, Long> userIds = new HashMap<>();
+        Map<String, Long> applicationIds = new HashMap<>();
+        List<Long> ids = new ArrayList<>(requests.size());
+        for (LogRequest request : requests) {
+            Long userId = request.getUsername() == null ? null
+                    : userIds.computeIfAbsent(request.getUsername(), this::resolveUserId);
+            Long applicationId = request.getApplication() == null ? null
+                    : applicationIds.computeIfAbsent(request.getApplication(), this::resolveApplicationId);
+            ids.add(insertEntry(request, userId, applicationId));
+        }
+        return ids;
+    }
+
+    private Long insertEntry(LogRequest request, Long userId, Long applicationId) {
         LogEntry entry = new LogEntry();
-        entry.setUserId(resolveUserId(request.getUsername()));
-        entry.setApplicationId(resolveApplicationId(request.getApplication()));
+        entry.setUserId(userId);
+        entry.setApplicationId(applicationId);
         entry.setGestureCode(request.getGestureCode());
         entry.setActionType(request.getActionType());
         entry.setActionValue(request.getActionValue());